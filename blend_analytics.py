@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Compare a whole library of blends at once.
+
+Every .md in blends/ (plus any extra directories or blend files given) is
+parsed and resolved against resources.json on a process pool: each worker
+builds the blend_stats engine once and scores its share of the blends with
+one matrix product. The comparison table shows copies per resource type,
+the Imperium cost curve, faction balance (Imperium affiliations), set mix
+and mean DCH rating; a pairwise Jaccard table of the distinct items in each
+blend follows. Items are blend_similarity.blend_shingles(), so the overlap
+is the same number /api/blends/similar reports for a pair.
+
+Needs numpy (pip install numpy).
+
+Usage: python3 blend_analytics.py [dir-or-blend.md ...] [--workers N] [--json]
+"""
+import argparse
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from blend_codec import parse_blend_file
+from blend_similarity import blend_shingles
+from blend_stats import (BLENDS_DIR, RESOURCES_FILE, SECTION_TYPES, BlendStatsError, StatsCatalog,
+                         np)
+
+# Column headings of the resource types, in blend section order
+TYPE_LABELS = {'imperium': 'Imp', 'intrigue': 'Int', 'tleilax': 'Tlx', 'reserve': 'Res',
+               'tech': 'Tech', 'contracts': 'Ctr', 'leader': 'Ldr', 'sardaukar': 'Sdk',
+               'starter': 'Str', 'conflict': 'Cnf'}
+TYPE_COLUMNS = [(resource_type, TYPE_LABELS[resource_type]) for _, resource_type in SECTION_TYPES]
+# Imperium affiliations shown as faction balance
+FACTIONS = (('emperor', 'Emp'), ('spacing guild', 'Gld'), ('bene gesserit', 'BG'),
+            ('fremen', 'Frm'), ('unaffiliated', 'None'))
+MAX_COST = 10
+
+_engine = None  # per worker process
+
+
+def _init_worker(resources_file):
+    global _engine
+    _engine = StatsCatalog(resources_file).engine()
+
+
+def _analyze(paths):
+    """[(path, stats, item shingles)] of a chunk of blend files (runs in a worker)."""
+    blends = [parse_blend_file(path) for path in paths]
+    selections, unmatched = _engine.selection_matrix(blends)
+    results = _engine.selection_stats(selections, unmatched)
+    return [(path, stats, blend_shingles(blend))
+            for path, stats, blend in zip(paths, results, blends)]
+
+
+def find_blends(locations):
+    """Blend .md files in blends/ and the given directories/files, without duplicates."""
+    paths = []
+    seen = set()
+    for location in [BLENDS_DIR, *map(Path, locations)]:
+        if location == BLENDS_DIR and not location.is_dir():
+            continue
+        for path in sorted(location.glob('*.md')) if location.is_dir() else [location]:
+            resolved = path.resolve()
+            if resolved not in seen:
+                seen.add(resolved)
+                paths.append(path)
+    return paths
+
+
+def location_error(location):
+    """Why a blend file or directory given on the command line can't be read, or None."""
+    path = Path(location)
+    if not path.exists():
+        return f"{location}: no such file or directory"
+    if not os.access(path, os.R_OK | (os.X_OK if path.is_dir() else 0)):
+        return f"{location}: permission denied"
+    if not path.is_dir() and not path.is_file():
+        return f"{location}: not a blend file or directory"
+    return None
+
+
+def analyze_blends(paths, workers=None, resources_file=RESOURCES_FILE):
+    """[(path, stats, item shingles)] of every blend, scored on a process pool."""
+    if np is None:
+        raise BlendStatsError("Blend analytics need numpy (pip install numpy)", status=501)
+    if not paths:
+        return []
+    workers = max(1, min(workers or os.cpu_count() or 1, len(paths)))
+    # A few chunks per worker keeps them busy without a task per blend
+    size = math.ceil(len(paths) / (workers * 4))
+    chunks = [paths[i:i + size] for i in range(0, len(paths), size)]
+    with ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=(str(resources_file),)) as pool:
+        return [result for chunk in pool.map(_analyze, chunks) for result in chunk]
+
+
+def jaccard_matrix(item_sets):
+    """Pairwise |A ∩ B| / |A ∪ B| of the item sets (blend_shingles()) of each blend."""
+    ids = {item: index for index, item in enumerate(sorted(set().union(*item_sets)))}
+    present = np.zeros((len(item_sets), len(ids)))
+    for row, items in enumerate(item_sets):
+        present[row, [ids[item] for item in items]] = 1
+    shared = present @ present.T
+    sizes = np.diag(shared)
+    union = sizes[:, None] + sizes[None, :] - shared
+    return np.divide(shared, union, out=np.zeros_like(shared), where=union > 0)
+
+
+def summarize(stats):
+    """Comparison table fields of one blend's stats."""
+    types = stats['types']
+    imperium = types.get('imperium', {})
+    sets = {}
+    for type_stats in types.values():
+        for name, copies in type_stats.get('bySets', {}).items():
+            sets[name] = sets.get(name, 0) + copies
+    total = sum(sets.values())
+    costs = imperium.get('byCosts', {})
+    return {
+        'items': stats['totalItems'],
+        'sizes': {resource_type: types[resource_type]['total'] for resource_type in types},
+        'costCurve': [costs.get(str(cost), 0) for cost in range(MAX_COST)],
+        'meanCost': (round(sum(float(c) * n for c, n in costs.items()) / imperium['total'], 2)
+                     if imperium.get('total') else None),
+        'factions': {key: imperium.get('affiliation', {}).get(key, 0) for key, _ in FACTIONS},
+        'sets': {name: round(copies / total * 100, 1)
+                 for name, copies in sorted(sets.items(), key=lambda s: -s[1])} if total else {},
+        'imperiumRating': imperium.get('rating', {}).get('mean'),
+        'intrigueRating': types.get('intrigue', {}).get('rating', {}).get('mean'),
+        'unmatched': stats['unmatched'],
+    }
+
+
+def display_names(paths):
+    """File names, with the directory added where two blends share a name."""
+    names = [path.name for path in paths]
+    return [str(path) if names.count(path.name) > 1 else path.name for path in paths]
+
+
+def print_report(names, summaries, jaccard):
+    width = max(len(name) for name in names)
+    types = [(t, label) for t, label in TYPE_COLUMNS if any(t in s['sizes'] for s in summaries)]
+
+    print(f"{'Blend':<{width}} {'Items':>5} " + ' '.join(f"{label:>4}" for _, label in types)
+          + f"  {'Cost curve 0-9':<30} {'Mean':>4}  "
+          + ' '.join(f"{label:>4}" for _, label in FACTIONS) + f"  {'Rating':>6}  Sets")
+    for name, summary in zip(names, summaries):
+        curve = ' '.join(f"{n:2d}" for n in summary['costCurve'])
+        mean_cost = f"{summary['meanCost']:.2f}" if summary['meanCost'] is not None else '-'
+        rating = f"{summary['imperiumRating']:.2f}" if summary['imperiumRating'] is not None else '-'
+        sets = ', '.join(f"{name} {share:g}%" for name, share in list(summary['sets'].items())[:3])
+        print(f"{name:<{width}} {summary['items']:>5} "
+              + ' '.join(f"{summary['sizes'].get(t, 0):>4}" for t, _ in types)
+              + f"  {curve:<30} {mean_cost:>4}  "
+              + ' '.join(f"{summary['factions'][key]:>4}" for key, _ in FACTIONS)
+              + f"  {rating:>6}  {sets}")
+
+    print(f"\nJaccard overlap (distinct items)")
+    print(f"{'':<{width + 4}}" + ''.join(f"{i:>6}" for i in range(1, len(names) + 1)))
+    for i, name in enumerate(names):
+        print(f"{i + 1:>2}. {name:<{width}}" + ''.join(f"{value:6.2f}" for value in jaccard[i]))
+
+    unmatched = [(name, s['unmatched']) for name, s in zip(names, summaries) if s['unmatched']]
+    for name, items in unmatched:
+        print(f"⚠️  {name}: {len(items)} unmatched: {', '.join(items[:5])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare every blend in blends/ and other directories')
+    parser.add_argument('locations', nargs='*', help='extra directories or blend .md files')
+    parser.add_argument('--workers', type=int, help='worker processes (default: CPU count)')
+    parser.add_argument('--json', action='store_true', help='print the comparison as JSON')
+    args = parser.parse_args()
+    for location in args.locations:
+        error = location_error(location)
+        if error:
+            parser.error(error)
+
+    paths = find_blends(args.locations)
+    started = time.perf_counter()
+    results = analyze_blends(paths, args.workers)
+    elapsed = time.perf_counter() - started
+    if not results:
+        print("No blends found")
+        return 1
+
+    names = display_names([path for path, _, _ in results])
+    summaries = [summarize(stats) for _, stats, _ in results]
+    jaccard = jaccard_matrix([shingles for _, _, shingles in results])
+
+    if args.json:
+        print(json.dumps({
+            'blends': dict(zip(names, summaries)),
+            'jaccard': {name: dict(zip(names, (round(v, 4) for v in row.tolist())))
+                        for name, row in zip(names, jaccard)},
+        }, indent=2))
+        return 0
+    print_report(names, summaries, jaccard)
+    print(f"\n📊 {len(results)} blends in {elapsed:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
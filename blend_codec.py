@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Blend markdown reader and writer.
+
+A blend file is a title, optional Overview and Board sections, a
+"**Total Items:**" line and one section per resource type listing
+"- [N× ]Name (Source)" items, followed by the generator footer. parse_blend()
+reads it (line by line, same rules as parseBlendFile() in static/app.js)
+into a Blend; write_blend() streams a Blend back out, and a parsed file in
+the format the blend editor and generators write serializes to identical
+text. count_items() turns a list of item copies into (item, count) rows
+with a Counter.
+
+Usage: python3 blend_codec.py [--check] [blend.md ...]   (round-trip check)
+       python3 blend_codec.py --diff a.md b.md
+"""
+import argparse
+import io
+from collections import Counter
+from pathlib import Path
+
+BLENDS_DIR = Path(__file__).parent / "blends"
+
+OVERVIEW_SECTION = 'Overview'
+BOARD_SECTION = 'Board'
+# Overview subsections read by the blend editor, in the order it writes them
+OVERVIEW_FIELDS = ('Description', 'Leader Selection', 'House Rules')
+FOOTER = '---\n*Generated by Dune Imperium Blend Builder*\n'
+
+
+class Blend:
+    """Parsed blend: title, overview texts, board settings and item sections.
+
+    overview is {subsection: text} (None when the file has no Overview
+    section); sections is {section: [(item, count), ...]} in file order.
+    """
+
+    def __init__(self, name='', overview=None, board='imperium', additional_boards=(),
+                 family_atomics=False, sections=None, has_board=True, show_total=True,
+                 footer=True):
+        self.name = name
+        self.overview = overview
+        self.board = board
+        self.additional_boards = list(additional_boards)
+        self.family_atomics = family_atomics
+        self.sections = sections if sections is not None else {}
+        self.has_board = has_board
+        self.show_total = show_total
+        self.footer = footer
+
+    def __eq__(self, other):
+        return isinstance(other, Blend) and vars(self) == vars(other)
+
+    def __repr__(self):
+        return f"Blend({self.name!r}, {self.total_items()} items)"
+
+    @property
+    def description(self):
+        return (self.overview or {}).get('Description', '')
+
+    @property
+    def leader_selection(self):
+        return (self.overview or {}).get('Leader Selection', '')
+
+    @property
+    def house_rules(self):
+        return (self.overview or {}).get('House Rules', '')
+
+    def total_items(self):
+        """Physical copies across all sections."""
+        return sum(count for items in self.sections.values() for _, count in items)
+
+    def item_counts(self):
+        """{(section, item): count} with repeated rows summed."""
+        counts = Counter()
+        for section, items in self.sections.items():
+            for item, count in items:
+                counts[(section, item)] += count
+        return counts
+
+    def to_resources(self):
+        """The structure parseBlendFile() in static/app.js returns as `resources`."""
+        resources = {}
+        if self.overview is not None:
+            def stripped(text):
+                return '\n'.join(line.strip() for line in text.split('\n')).strip()
+            resources[OVERVIEW_SECTION] = {
+                'description': stripped(self.description),
+                'leaderSelection': stripped(self.leader_selection),
+                'houseRules': stripped(self.house_rules),
+            }
+        if self.has_board:
+            resources[BOARD_SECTION] = {
+                'mainBoard': self.board,
+                'additionalBoards': list(self.additional_boards),
+                'familyAtomics': self.family_atomics,
+            }
+        for section, items in self.sections.items():
+            resources[section] = [{'name': item, 'count': count} for item, count in items]
+        return resources
+
+
+def is_synonym_item(item):
+    """True for a "Name #N (Source)" item (one of several cards sharing a name)."""
+    return ' #' in item and '(' in item
+
+
+def count_items(items, synonyms_last=False):
+    """[(item, count)] of a list of item copies, sorted by item.
+
+    With synonyms_last, "#N" synonym items follow the other items (the order
+    the blend generators write).
+    """
+    counts = Counter(items)
+    if not synonyms_last:
+        return sorted(counts.items())
+    return sorted(counts.items(), key=lambda entry: (is_synonym_item(entry[0]), entry[0]))
+
+
+def parse_item(line):
+    """(item, count) of a resource line without its "- " prefix."""
+    if '×' in line:
+        count, _, item = line.partition('×')
+        if count.strip().isdigit():
+            return item.strip(), int(count)
+    elif line[:1].isdigit() and ' ' in line:
+        count, _, item = line.partition(' ')
+        if count.isdigit():
+            return item.strip(), int(count)
+    return line, 1
+
+
+def parse_blend(text):
+    """Parse blend markdown (a string or an iterable of lines) into a Blend."""
+    lines = text.splitlines() if isinstance(text, str) else text
+    blend = Blend(has_board=False, show_total=False, footer=False)
+    section = None
+    subsection = None
+
+    for raw_line in lines:
+        line = raw_line.strip()
+        if line.startswith('## '):
+            section = line[3:].strip()
+            subsection = None
+            if section == OVERVIEW_SECTION:
+                if blend.overview is None:
+                    blend.overview = {}
+            elif section == BOARD_SECTION:
+                blend.has_board = True
+            else:
+                blend.sections.setdefault(section, [])
+        elif line.startswith('### '):
+            subsection = line[4:].strip()
+        elif line.startswith('# ') and section is None:
+            blend.name = line[2:].strip()
+        elif line.startswith('**Total Items:**'):
+            blend.show_total = True
+        elif line.startswith('*Generated'):
+            blend.footer = True
+        elif section == OVERVIEW_SECTION:
+            # Overview text keeps its lines as written (the editor strips them)
+            if subsection:
+                raw_line = raw_line.rstrip('\r\n')
+                text = blend.overview.get(subsection)
+                if text:
+                    blend.overview[subsection] = f"{text}\n{raw_line}"
+                elif line:
+                    blend.overview[subsection] = raw_line
+        elif section == BOARD_SECTION:
+            if not line.startswith('- '):
+                continue
+            key, _, value = line[2:].partition(':')
+            key, value = key.strip(), value.strip()
+            if key == 'Main Board':
+                blend.board = value
+            elif key == 'Additional Boards':
+                blend.additional_boards = [b.strip() for b in value.split(',')]
+            elif key == 'Family Atomics':
+                blend.family_atomics = value.lower() == 'true'
+        elif section is not None and line and not line.startswith('**') and line != '---':
+            if line.startswith('- '):
+                line = line[2:].strip()
+            if line and not line.startswith('#'):
+                blend.sections[section].append(parse_item(line))
+
+    if blend.overview:
+        blend.overview = {key: text.rstrip() for key, text in blend.overview.items()}
+    return blend
+
+
+def write_blend(blend, out):
+    """Write a Blend as markdown to a text stream."""
+    write = out.write
+    write(f"# {blend.name}\n\n")
+
+    if blend.overview is not None:
+        write(f"## {OVERVIEW_SECTION}\n\n")
+        for subsection, text in blend.overview.items():
+            if text:
+                write(f"### {subsection}\n\n{text}\n\n")
+
+    if blend.has_board:
+        write(f"## {BOARD_SECTION}\n\n- Main Board: {blend.board}\n")
+        if blend.additional_boards:
+            write(f"- Additional Boards: {', '.join(blend.additional_boards)}\n")
+        if blend.family_atomics:
+            write("- Family Atomics: true\n")
+        write("\n")
+
+    if blend.show_total:
+        write(f"**Total Items:** {blend.total_items()}\n\n")
+
+    for section, items in blend.sections.items():
+        if not items:
+            continue
+        write(f"## {section}\n\n")
+        write(''.join(f"- {item}\n" if count == 1 else f"- {count}× {item}\n"
+                      for item, count in items))
+        write("\n")
+
+    if blend.footer:
+        write(FOOTER)
+
+
+def serialize_blend(blend):
+    """Blend markdown as a string."""
+    out = io.StringIO()
+    write_blend(blend, out)
+    return out.getvalue()
+
+
+def parse_blend_file(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return parse_blend(f)
+
+
+def write_blend_file(path, blend):
+    with open(path, 'w', encoding='utf-8') as f:
+        write_blend(blend, f)
+
+
+def diff_blends(old, new):
+    """{(section, item): (old count, new count)} for every item whose count differs."""
+    old_counts, new_counts = old.item_counts(), new.item_counts()
+    return {key: (old_counts.get(key, 0), new_counts.get(key, 0))
+            for key in old_counts.keys() | new_counts.keys()
+            if old_counts.get(key, 0) != new_counts.get(key, 0)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check or compare blend files')
+    parser.add_argument('blends', nargs='*', help='blend .md files (default: blends/*.md)')
+    parser.add_argument('--check', action='store_true', help='check that blends round-trip (default)')
+    parser.add_argument('--diff', action='store_true', help='show item count differences of two blends')
+    args = parser.parse_args()
+
+    if args.diff:
+        if len(args.blends) != 2:
+            parser.error('--diff needs two blend files')
+        changes = diff_blends(parse_blend_file(args.blends[0]), parse_blend_file(args.blends[1]))
+        for (section, item), (before, after) in sorted(changes.items()):
+            print(f"{section}: {item}: {before} -> {after}")
+        print(f"{len(changes)} items differ")
+        return 1 if changes else 0
+
+    paths = [Path(p) for p in args.blends] or sorted(BLENDS_DIR.glob('*.md'))
+    failed = 0
+    for path in paths:
+        text = path.read_text(encoding='utf-8')
+        blend = parse_blend(text)
+        if serialize_blend(blend) == text:
+            print(f"✅ {path.name}: {blend.total_items()} items")
+        elif parse_blend(serialize_blend(blend)) == blend:
+            print(f"🔄 {path.name}: same blend, formatting differs")
+        else:
+            failed += 1
+            print(f"❌ {path.name}: does not round-trip")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
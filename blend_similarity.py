@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Find similar blends with MinHash signatures and LSH buckets.
+
+Each blend is reduced to its distinct items ("type:normalized name"
+shingles) and a MinHash signature of NUM_PERM hash minima, which agree in
+about the fraction of slots that equals the Jaccard similarity of two
+blends. The signature is cut into BANDS bands; blends sharing any band
+bucket are the candidates of a query, so a lookup touches only the blends
+likely to be similar instead of every pair. Candidates are then rescored
+by the exact Jaccard similarity of their shingles. blend_analytics.py
+compares the same shingles, so its overlap table matches these scores.
+
+BlendSimilarity keeps the index of a BlendStore in step with its listing:
+only blends that were added, changed or deleted since the last sync are
+rehashed (the servers sync after /api/blend/save and /api/blend/upload).
+
+Usage: python3 blend_similarity.py [blend.md ...] [--limit N]
+"""
+import argparse
+import hashlib
+import random
+import threading
+import time
+
+from blend_codec import parse_blend
+from blend_stats import detect_resource_type
+from blend_store import BLENDS_DIR, BlendStore
+from card_names import normalize_name
+
+NUM_PERM = 128
+# 32 bands of 4 rows: blends become candidates from a Jaccard similarity of about 0.4
+BANDS = 32
+DEFAULT_LIMIT = 5
+MAX_LIMIT = 50
+
+_PRIME = (1 << 61) - 1
+
+
+class BlendSimilarityError(Exception):
+    """Unknown blend or bad query."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def blend_shingles(blend):
+    """Distinct "type:name" items of a parsed Blend."""
+    return frozenset(f"{detect_resource_type(section) or section.lower()}:{normalize_name(item)}"
+                     for section, items in blend.sections.items() for item, _ in items)
+
+
+def _hash(shingle):
+    return int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class MinHashIndex:
+    """MinHash signatures of named shingle sets, bucketed by LSH band."""
+
+    def __init__(self, num_perm=NUM_PERM, bands=BANDS, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(_PRIME)) for _ in range(num_perm)]
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._entries = {}   # name -> (shingles, signature or None when empty)
+        self._buckets = {}   # (band, band slice of a signature) -> {names}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def signature(self, shingles):
+        """Minimum of each hash permutation over the shingles (None for no shingles)."""
+        if not shingles:
+            return None
+        hashes = [_hash(shingle) for shingle in shingles]
+        return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in self._perms)
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [(band, signature[band * rows:(band + 1) * rows]) for band in range(self.bands)]
+
+    def add(self, name, shingles):
+        """Index (or reindex) a named shingle set."""
+        self.remove(name)
+        signature = self.signature(shingles)
+        self._entries[name] = (shingles, signature)
+        if signature is not None:
+            for key in self._band_keys(signature):
+                self._buckets.setdefault(key, set()).add(name)
+
+    def remove(self, name):
+        """Drop a name from the index; False if it was not indexed."""
+        entry = self._entries.pop(name, None)
+        if entry is None:
+            return False
+        if entry[1] is not None:
+            for key in self._band_keys(entry[1]):
+                bucket = self._buckets.get(key)
+                bucket.discard(name)
+                if not bucket:
+                    del self._buckets[key]
+        return True
+
+    def candidates(self, name):
+        """Names sharing at least one band bucket with an indexed name."""
+        signature = self._entries[name][1]
+        if signature is None:
+            return set()
+        found = set()
+        for key in self._band_keys(signature):
+            found.update(self._buckets.get(key, ()))
+        found.discard(name)
+        return found
+
+    def query(self, name, limit=DEFAULT_LIMIT):
+        """[(jaccard, estimate, other name)] of the most similar candidates, best first."""
+        shingles, signature = self._entries[name]
+        results = []
+        for other in self.candidates(name):
+            other_shingles, other_signature = self._entries[other]
+            estimate = sum(x == y for x, y in zip(signature, other_signature)) / len(signature)
+            jaccard = len(shingles & other_shingles) / len(shingles | other_shingles)
+            results.append((jaccard, estimate, other))
+        results.sort(key=lambda r: (-r[0], -r[1], r[2]))
+        return results[:limit]
+
+
+class BlendSimilarity:
+    """MinHashIndex of the blends in a BlendStore, synced with its listing (thread-safe)."""
+
+    def __init__(self, store, index=None):
+        self.store = store
+        self.index = index if index is not None else MinHashIndex()
+        self._lock = threading.Lock()
+        self._listing = None
+        self._versions = {}   # name -> (size, modified) when indexed
+
+    def sync(self):
+        """Rehash blends added or changed since the last sync and drop deleted ones."""
+        # The store hands out the same listing object until the directory changes
+        listing = self.store.listing('name')
+        if listing is self._listing:
+            return
+        with self._lock:
+            if listing is self._listing:
+                return
+            current = {entry['name']: (entry['size'], entry['modified']) for entry in listing}
+            for name in [name for name in self._versions if name not in current]:
+                del self._versions[name]
+                self.index.remove(name)
+            for name, version in current.items():
+                if self._versions.get(name) == version:
+                    continue
+                try:
+                    text = self.store.read(name)
+                except UnicodeDecodeError:
+                    text = None
+                if text is None:
+                    self.index.remove(name)
+                else:
+                    self.index.add(name, blend_shingles(parse_blend(text)))
+                self._versions[name] = version
+            self._listing = listing
+
+    def similar(self, name, limit=DEFAULT_LIMIT):
+        """[(jaccard, estimate, other name)] of the blends most similar to a stored blend."""
+        self.sync()
+        with self._lock:
+            if name not in self.index:
+                raise BlendSimilarityError(f"Blend not found: {name}", status=404)
+            return self.index.query(name, limit)
+
+
+def similar_blends(similarity, name, limit=None):
+    """Response body of /api/blends/similar?name=...&limit=..."""
+    if not name:
+        raise BlendSimilarityError("Missing blend name")
+    if not name.endswith('.md'):
+        name += '.md'
+    try:
+        limit = DEFAULT_LIMIT if limit in (None, '') else int(limit)
+    except ValueError:
+        raise BlendSimilarityError(f"Invalid limit: {limit!r}")
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    started = time.perf_counter()
+    results = similarity.similar(name, limit)
+    return {
+        'name': name,
+        'similar': [{'name': other, 'similarity': round(jaccard, 4), 'estimate': round(estimate, 4)}
+                    for jaccard, estimate, other in results],
+        'indexed': len(similarity.index),
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='List the most similar blends in blends/')
+    parser.add_argument('blends', nargs='*', help='blend file names (default: every blend)')
+    parser.add_argument('--limit', type=int, default=DEFAULT_LIMIT, help='similar blends per blend')
+    args = parser.parse_args()
+
+    similarity = BlendSimilarity(BlendStore(BLENDS_DIR))
+    started = time.perf_counter()
+    similarity.sync()
+    print(f"📚 Indexed {len(similarity.index)} blends in {time.perf_counter() - started:.2f}s")
+
+    names = args.blends or [entry['name'] for entry in similarity.store.listing('name')]
+    missing = 0
+    for name in names:
+        try:
+            results = similarity.similar(name, args.limit)
+        except BlendSimilarityError as e:
+            missing += 1
+            print(f"❌ {e}")
+            continue
+        print(f"\n{name}")
+        for jaccard, estimate, other in results:
+            print(f"   {jaccard:5.2f}  (est. {estimate:.2f})  {other}")
+        if not results:
+            print("   no similar blends")
+    return 1 if missing else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Blend statistics as one matrix product over resources.json.
+
+Every card in resources.json is a column of a feature matrix whose rows are
+the counted properties the stats panels show: copies per resource type, per
+persuasion_cost, per set (source/card_set), faction access and affiliation
+flags, mechanics, leader house and complexity, plus dch_rating sums for the
+mean rating. A blend becomes a vector of selected copies per card, so all
+of its distributions are `features @ counts`; scoring many blends stacks
+their vectors into a matrix and takes a single matrix product.
+
+Blend items are matched to cards the way the blend editor loads them
+("Name #N (Source)", "Name (Source)" or a bare name), with a fuzzy fallback
+(card_names.NameResolver) for misspellings. Served as /api/blend/stats;
+build_data.py also stores the official blends' stats in blends/baselines.json
+for the stats panels' baseline bars.
+
+Needs numpy (pip install numpy).
+
+Usage: python3 blend_stats.py [blend.md ...] [--json]   (default: blends/*.md)
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from blend_codec import parse_blend, parse_blend_file
+from card_names import NameResolver, catalog_entries
+
+RESOURCES_FILE = Path(__file__).parent / "resources.json"
+BLENDS_DIR = Path(__file__).parent / "blends"
+BASELINES_FILE = BLENDS_DIR / "baselines.json"
+BASELINES_FORMAT = 1
+
+ACCESS_FIELDS = ('green_access', 'purple_access', 'yellow_access', 'emperor_access',
+                 'spacing_guild_access', 'bene_gesserit_access', 'fremen_access', 'spy_access')
+AFFILIATION_FIELDS = ('emperor_affiliation', 'spacing_guild_affiliation',
+                      'bene_gesserit_affiliation', 'fremen_affiliation')
+# Mechanic columns counted by the stats panels
+MECHANIC_FIELDS = {
+    'imperium': ('tech', 'shipping', 'unload', 'infiltration', 'research', 'grafting', 'spies',
+                 'sandworms', 'contracts', 'sardaukar', 'trash', 'discard', 'draw'),
+    'intrigue': ('tech', 'shipping', 'research', 'spies', 'sandworms', 'contracts', 'sardaukar',
+                 'trash', 'discard', 'draw'),
+}
+# Distributions per resource type (the keys calculateBlendStats() in index.html uses)
+TYPE_DISTRIBUTIONS = {
+    'imperium': ('byCosts', 'bySets', 'mechanics', 'access', 'affiliation', 'rating'),
+    'intrigue': ('bySets', 'mechanics', 'rating'),
+    'reserve': ('byCosts', 'bySets'),
+    'leader': ('bySets', 'byHouse', 'byComplexity'),
+}
+DEFAULT_DISTRIBUTIONS = ('bySets',)
+
+# Blend section name keywords -> resource type, checked in order (detectResourceType())
+SECTION_TYPES = (('imperium', 'imperium'), ('intrigue', 'intrigue'), ('tleilax', 'tleilax'),
+                 ('reserve', 'reserve'), ('tech', 'tech'), ('contract', 'contracts'),
+                 ('leader', 'leader'), ('sardaukar', 'sardaukar'), ('starter', 'starter'),
+                 ('conflict', 'conflict'))
+
+
+class BlendStatsError(Exception):
+    """Stats unavailable (numpy missing) or unknown blend."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def detect_resource_type(section):
+    """Resource type of a blend section ("Tech Cards" -> 'tech'), or None."""
+    lower = section.lower()
+    for keyword, resource_type in SECTION_TYPES:
+        if keyword in lower:
+            return resource_type
+    return None
+
+
+def _has_x(value):
+    """Access/affiliation flag set (hasX() in index.html)."""
+    return value in (True, 'X', 'x', '1')
+
+
+def _flag(value):
+    """Mechanic flag set (anything but empty or zero, as the stats panels count it)."""
+    return value not in (None, '', 0, '0', '0.0')
+
+
+def _number(value):
+    if isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _label(field, suffix):
+    # 'spacing_guild_access' -> 'spacing guild' (the stats panels' display keys)
+    return field[:-len(suffix)].replace('_', ' ', 1)
+
+
+def card_features(resource_type, card):
+    """[(distribution, key, value)] a single copy of a card adds to its type's stats."""
+    features = [('total', None, 1.0)]
+    for distribution in TYPE_DISTRIBUTIONS.get(resource_type, DEFAULT_DISTRIBUTIONS):
+        if distribution == 'byCosts':
+            cost = _number(card.get('cost') or card.get('persuasion_cost')) or 0.0
+            features.append(('byCosts', f"{cost:g}", 1.0))
+        elif distribution == 'bySets':
+            features.append(('bySets', card.get('source') or card.get('card_set') or 'Unknown', 1.0))
+        elif distribution == 'mechanics':
+            features.extend(('mechanics', field, 1.0)
+                            for field in MECHANIC_FIELDS[resource_type] if _flag(card.get(field)))
+        elif distribution == 'access':
+            features.extend(('access', _label(field, '_access'), 1.0)
+                            for field in ACCESS_FIELDS if _has_x(card.get(field)))
+        elif distribution == 'affiliation':
+            affiliations = [_label(field, '_affiliation')
+                            for field in AFFILIATION_FIELDS if _has_x(card.get(field))]
+            features.extend(('affiliation', key, 1.0) for key in affiliations or ['unaffiliated'])
+        elif distribution == 'byHouse':
+            features.append(('byHouse', card.get('house') or 'Unknown', 1.0))
+        elif distribution == 'byComplexity':
+            complexity = card.get('complexity') or card.get('listed_complexity_level') or 'Unknown'
+            features.append(('byComplexity', str(complexity), 1.0))
+        elif distribution == 'rating':
+            rating = _number(card.get('dch_rating'))
+            if rating is not None:
+                features.append(('rating', 'sum', rating))
+                features.append(('rating', 'rated', 1.0))
+    return features
+
+
+class StatsEngine:
+    """Feature matrix of a {resource_type: [card, ...]} mapping (read-only once built).
+
+    matrix[f, c] is what one copy of card c adds to feature f; features[f]
+    is its (resource_type, distribution, key) label.
+    """
+
+    def __init__(self, resources):
+        if np is None:
+            raise BlendStatsError("Blend stats need numpy (pip install numpy)", status=501)
+        self.cards = []         # (blend name, resource_type, card) per column
+        self.features = []
+        self._feature_ids = {}
+        self._by_type = {}      # resource_type -> {blend name, "Name (Source)", name: column}
+        self._resolvers = {}    # resource_type -> NameResolver, built on first fuzzy lookup
+        self._fuzzy = {}        # (resource_type, item) -> column or None, fuzzy lookups done
+        self._lock = threading.Lock()
+
+        cells = []
+        for name, resource_type, card in catalog_entries(resources):
+            column = len(self.cards)
+            self.cards.append((name, resource_type, card))
+            names = self._by_type.setdefault(resource_type, {})
+            # "Name (Source)" and a bare name pick the first card by resource_id
+            base_name = card.get('objective') or card.get('name') or ''
+            source = card.get('source') or card.get('card_set') or ''
+            for key in (name, f"{base_name} ({source})", base_name):
+                names.setdefault(key, column)
+            for distribution, key, value in card_features(resource_type, card):
+                label = (resource_type, distribution, key)
+                feature = self._feature_ids.get(label)
+                if feature is None:
+                    feature = self._feature_ids[label] = len(self.features)
+                    self.features.append(label)
+                cells.append((feature, column, value))
+
+        self.matrix = np.zeros((len(self.features), len(self.cards)))
+        if cells:
+            rows, columns, values = zip(*cells)
+            self.matrix[list(rows), list(columns)] = values
+        self.column_types = [resource_type for _, resource_type, _ in self.cards]
+
+    def __len__(self):
+        return len(self.cards)
+
+    def _resolver(self, resource_type):
+        with self._lock:
+            resolver = self._resolvers.get(resource_type)
+            if resolver is None:
+                resolver = NameResolver(
+                    (name, column) for column, (name, card_type, _) in enumerate(self.cards)
+                    if resource_type is None or card_type == resource_type)
+                self._resolvers[resource_type] = resolver
+            return resolver
+
+    def column(self, section, item):
+        """Card column of a blend item in a section, or None."""
+        resource_type = detect_resource_type(section)
+        if resource_type is None:
+            return None
+        column = self._by_type.get(resource_type, {}).get(item)
+        if column is None:
+            key = (resource_type, item)
+            if key not in self._fuzzy:
+                match = self._resolver(resource_type).resolve(item)
+                if match is not None and match.score < 1.0:
+                    print(f"🔤 Fuzzy matched {section}: {item!r} -> {match.name!r} ({match.score:.2f})")
+                self._fuzzy[key] = match.value if match is not None else None
+            column = self._fuzzy[key]
+        return column
+
+    def selection_vector(self, blend):
+        """(copies per card column, ["Section: item" not matched to a card])."""
+        counts = np.zeros(len(self.cards))
+        unmatched = []
+        for section, items in blend.sections.items():
+            for item, count in items:
+                column = self.column(section, item)
+                if column is None:
+                    unmatched.append(f"{section}: {item}")
+                else:
+                    counts[column] += count
+        return counts, unmatched
+
+    def stats(self, blend):
+        """Distributions of one blend (see stats_many())."""
+        return self.stats_many([blend])[0]
+
+    def selection_matrix(self, blends):
+        """(cards x blends matrix of selected copies, [unmatched items] per blend)."""
+        selections = np.zeros((len(self.cards), len(blends)))
+        unmatched = []
+        for index, blend in enumerate(blends):
+            selections[:, index], missing = self.selection_vector(blend)
+            unmatched.append(missing)
+        return selections, unmatched
+
+    def stats_many(self, blends):
+        """Distributions of each blend, from one features x cards x blends product.
+
+        Each result is {'types': {resource_type: {'total', 'unique',
+        <distribution>: {key: copies}}}, 'totalItems', 'unmatched'}; imperium
+        and intrigue also get 'rating': {'mean', 'rated'} over the copies with
+        a dch_rating.
+        """
+        if not blends:
+            return []
+        return self.selection_stats(*self.selection_matrix(blends))
+
+    def selection_stats(self, selections, unmatched):
+        """stats_many() results of a selection_matrix()."""
+        totals = self.matrix @ selections
+        return [self._decode(totals[:, index], selections[:, index], unmatched[index])
+                for index in range(selections.shape[1])]
+
+    def _decode(self, totals, counts, unmatched):
+        result = {}
+        for feature in np.flatnonzero(totals):
+            resource_type, distribution, key = self.features[feature]
+            value = totals[feature].item()
+            stats = result.setdefault(resource_type, {'total': 0, 'unique': 0})
+            if distribution == 'total':
+                stats['total'] = int(value)
+            elif distribution == 'rating':
+                stats.setdefault('rating', {})[key] = value
+            else:
+                stats.setdefault(distribution, {})[key] = int(value)
+        for column in np.flatnonzero(counts):
+            result.setdefault(self.column_types[column], {'total': 0, 'unique': 0})['unique'] += 1
+        for stats in result.values():
+            rating = stats.get('rating')
+            if rating:
+                rated = rating.get('rated', 0)
+                stats['rating'] = {'mean': round(rating.get('sum', 0) / rated, 3) if rated else None,
+                                   'rated': int(rated)}
+        return {'types': result, 'totalItems': int(counts.sum()), 'unmatched': unmatched}
+
+
+class StatsCatalog:
+    """StatsEngine of resources.json, rebuilt when the file changes (thread-safe)."""
+
+    def __init__(self, resources_file=RESOURCES_FILE):
+        self.resources_file = Path(resources_file)
+        self._lock = threading.Lock()
+        self._signature = None
+        self._engine = None
+
+    def engine(self):
+        try:
+            stat = os.stat(self.resources_file)
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            signature = None
+        if signature == self._signature and self._engine is not None:
+            return self._engine
+        with self._lock:
+            if signature != self._signature or self._engine is None:
+                resources = {}
+                if signature is not None:
+                    with open(self.resources_file, 'r', encoding='utf-8') as f:
+                        resources = json.load(f)
+                self._engine = StatsEngine(resources)
+                self._signature = signature
+            return self._engine
+
+
+def blend_stats(catalog, blends):
+    """Response body of /api/blend/stats for {name: blend markdown}."""
+    started = time.perf_counter()
+    names = list(blends)
+    results = catalog.engine().stats_many([parse_blend(blends[name]) for name in names])
+    return {
+        'blends': dict(zip(names, results)),
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
+def blend_baselines(paths, resources_file=RESOURCES_FILE):
+    """{'format', 'blends': {filename: per-type stats}} of blend files."""
+    engine = StatsCatalog(resources_file).engine()
+    results = engine.stats_many([parse_blend_file(path) for path in paths])
+    return {
+        'format': BASELINES_FORMAT,
+        'blends': {Path(path).name: stats['types'] for path, stats in zip(paths, results)},
+    }
+
+
+def write_baselines(paths, output=BASELINES_FILE, resources_file=RESOURCES_FILE):
+    """Write the baseline stats of blend files (blends/baselines.json)."""
+    baselines = blend_baselines(paths, resources_file)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(baselines, f, ensure_ascii=False, separators=(',', ':'))
+    return baselines
+
+
+def summary_line(name, stats):
+    imperium = stats['types'].get('imperium', {})
+    rating = imperium.get('rating', {}).get('mean')
+    costs = imperium.get('byCosts', {})
+    mean_cost = (sum(float(cost) * copies for cost, copies in costs.items()) / imperium['total']
+                 if imperium.get('total') else 0)
+    return (f"{name:<40} {stats['totalItems']:>5} {imperium.get('total', 0):>9} "
+            f"{mean_cost:>9.2f} {rating if rating is not None else '-':>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compute blend statistics')
+    parser.add_argument('blends', nargs='*', help='blend .md files (default: blends/*.md)')
+    parser.add_argument('--json', action='store_true', help='print full stats as JSON')
+    args = parser.parse_args()
+
+    paths = [Path(p) for p in args.blends] or sorted(BLENDS_DIR.glob('*.md'))
+    engine = StatsCatalog().engine()
+    started = time.perf_counter()
+    results = engine.stats_many([parse_blend_file(path) for path in paths])
+    elapsed = (time.perf_counter() - started) * 1000
+
+    if args.json:
+        print(json.dumps({path.name: stats for path, stats in zip(paths, results)}, indent=2))
+        return
+    print(f"{'Blend':<40} {'Items':>5} {'Imperium':>9} {'Mean cost':>9} {'Rating':>7}")
+    for path, stats in zip(paths, results):
+        print(summary_line(path.name, stats))
+        if stats['unmatched']:
+            print(f"    ⚠️  {len(stats['unmatched'])} unmatched: {', '.join(stats['unmatched'][:5])}")
+    print(f"📊 {len(paths)} blends over {len(engine)} cards x {len(engine.features)} features "
+          f"in {elapsed:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+In-memory store of the blend .md files served by the local servers.
+
+The directory listing is cached and revalidated with a single stat() of the
+blends directory (its mtime changes whenever a file is created, renamed or
+deleted), so /api/blends does not glob and stat every file per request.
+File contents are cached too and revalidated against the file's own
+mtime/size, which also catches blends rewritten in place. Writes go to a
+temporary file in the same directory that is renamed over the target
+(commit() does this for uploads streamed to disk by request_body.py), and
+update the cache in the same step.
+"""
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+BLENDS_DIR = Path(__file__).parent / "blends"
+
+
+def is_valid_blend_name(filename):
+    """True for a plain file name inside the blends directory (no paths or dotfiles)."""
+    return (bool(filename) and os.path.basename(filename) == filename
+            and not filename.startswith('.') and '\0' not in filename)
+
+
+class BlendStore:
+    """Cached listing and contents of a blends directory (thread-safe)."""
+
+    def __init__(self, directory=BLENDS_DIR, suffix='.md'):
+        self.directory = Path(directory)
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        self._dir_mtime = None
+        self._entries = {}     # filename -> (size, mtime)
+        self._listings = {}    # name key -> cached listing
+        self._contents = {}    # filename -> (mtime_ns, size, text)
+
+    # Listing
+
+    def listing(self, name_key='filename'):
+        """Sorted [{name_key, 'size', 'modified'}] of the blend files.
+
+        The returned list is shared between callers and must not be modified.
+        """
+        with self._lock:
+            self._revalidate()
+            listing = self._listings.get(name_key)
+            if listing is None:
+                listing = [{name_key: name, 'size': size, 'modified': mtime}
+                           for name, (size, mtime) in sorted(self._entries.items())]
+                self._listings[name_key] = listing
+            return listing
+
+    def _revalidate(self):
+        dir_mtime = self._stat_dir()
+        if dir_mtime == self._dir_mtime and dir_mtime is not None:
+            return
+
+        entries = {}
+        if dir_mtime is not None:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.name.endswith(self.suffix) or not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                    entries[entry.name] = (stat.st_size, stat.st_mtime)
+        self._dir_mtime = dir_mtime
+        self._entries = entries
+        self._listings.clear()
+        for name in list(self._contents):
+            if name not in entries:
+                del self._contents[name]
+
+    def _set_entry(self, filename, stat):
+        """Record a file we just wrote or found changed (lock held)."""
+        if filename.endswith(self.suffix):
+            self._entries[filename] = (stat.st_size, stat.st_mtime)
+            self._listings.clear()
+
+    # Contents
+
+    def read(self, filename):
+        """Text of a blend file, or None if it does not exist."""
+        if not is_valid_blend_name(filename):
+            return None
+        path = self.directory / filename
+        try:
+            stat = os.stat(path)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+
+        with self._lock:
+            cached = self._contents.get(filename)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            text = f.read().decode('utf-8')
+
+        with self._lock:
+            self._contents[filename] = (stat.st_mtime_ns, stat.st_size, text)
+            if self._dir_mtime is not None and filename in self._entries:
+                # Rewritten in place: the directory mtime did not change
+                self._set_entry(filename, stat)
+        return text
+
+    def exists(self, filename):
+        return is_valid_blend_name(filename) and (self.directory / filename).is_file()
+
+    def write(self, filename, content):
+        """Atomically write a blend (str or bytes) and update the cache."""
+        if not is_valid_blend_name(filename):
+            raise ValueError(f"Invalid filename: {filename!r}")
+        data = content.encode('utf-8') if isinstance(content, str) else content
+
+        self.directory.mkdir(exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=f".{filename}.", suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        try:
+            text = content if isinstance(content, str) else data.decode('utf-8')
+        except UnicodeDecodeError:
+            text = None
+        return self.commit(filename, tmp_path, text)
+
+    def commit(self, filename, tmp_path, text=None):
+        """Atomically move a fully written temp file (in this directory) into place.
+
+        text, if given, is the file's decoded content and is cached.
+        """
+        if not is_valid_blend_name(filename):
+            os.unlink(tmp_path)
+            raise ValueError(f"Invalid filename: {filename!r}")
+
+        before = self._stat_dir()
+        try:
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.directory / filename)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        stat = os.stat(self.directory / filename)
+        with self._lock:
+            self._update_dir_mtime(before)
+            self._set_entry(filename, stat)
+            if text is None:
+                self._contents.pop(filename, None)
+            else:
+                self._contents[filename] = (stat.st_mtime_ns, stat.st_size, text)
+        return filename
+
+    def delete(self, filename):
+        """Delete a blend; False if it did not exist."""
+        if not is_valid_blend_name(filename):
+            return False
+        before = self._stat_dir()
+        try:
+            os.unlink(self.directory / filename)
+        except FileNotFoundError:
+            return False
+        with self._lock:
+            self._update_dir_mtime(before)
+            self._contents.pop(filename, None)
+            if self._entries.pop(filename, None) is not None:
+                self._listings.clear()
+        return True
+
+    def _stat_dir(self):
+        try:
+            return os.stat(self.directory).st_mtime_ns
+        except OSError:
+            return None
+
+    def _update_dir_mtime(self, before):
+        """Adopt the directory mtime after our own change (lock held).
+
+        Only when the cached listing was current just before the change;
+        otherwise something else changed the directory too and the next
+        listing rescans it.
+        """
+        if self._dir_mtime is None or before != self._dir_mtime:
+            self._dir_mtime = None
+            return
+        self._dir_mtime = self._stat_dir()
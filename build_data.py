@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Build all data files from the Excel spreadsheet in one pass.
+Reads the workbook once and produces resources.json, every generated
+blend .md, blends/index.json and blends/baselines.json (precomputed stats
+of the official blends, the baselines of the stats panels; needs numpy).
+A manifest of per-sheet content hashes is kept so outputs whose input
+sheets did not change are skipped. build_manifest.json is a local build
+cache (gitignored): without it every output is rebuilt, so CI should cache
+it between runs.
+
+Usage: python3 build_data.py [--force]
+"""
+import argparse
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+import blend_stats
+import extract_blends_from_excel_inventory as blends
+import generate_resources_json as resources_gen
+from inventory import EXCEL_PATH, load_inventory
+
+ROOT_DIR = Path(__file__).parent
+BLENDS_DIR = ROOT_DIR / "blends"
+MANIFEST_PATH = resources_gen.MANIFEST_PATH
+BASELINES_PATH = BLENDS_DIR / "baselines.json"
+
+# Only include official/public blends for GitHub Pages
+# Personal blends (like house blends) should not be in this list
+# They will still be available locally via the /api/blends endpoint
+OFFICIAL_BLENDS = [
+    'Anttis_Basic_House_Blend.md',
+    'Anttis_House_Blend.md',
+    'Base_Imperium.md',
+    'Base_Uprising.md',
+    'Merakons_House_Blend.md',
+    'TragicJonsons_House_Blend.md',
+    'Uprising_Bloodlines_Community.md',
+]
+
+
+def file_hash(path):
+    """SHA-256 of a file's bytes, or None if it does not exist."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def code_files():
+    """Generator sources: this script and every repo module it has imported.
+
+    A change to any of them invalidates every output.
+    """
+    root = ROOT_DIR.resolve()
+    paths = {Path(__file__).resolve()}
+    for module in list(sys.modules.values()):
+        path = getattr(module, '__file__', None)
+        if path and Path(path).resolve().parent == root:
+            paths.add(Path(path).resolve())
+    return sorted(path.name for path in paths)
+
+
+def combine_hashes(parts):
+    """Combine (label, hash) pairs into one order-sensitive key."""
+    digest = hashlib.sha256()
+    for label, value in parts:
+        digest.update(f"{label}={value}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def resources_outputs(resource_types):
+    """resources.json plus its compact copy, per-type shards and precompressed siblings."""
+    output_path = resources_gen.OUTPUT_PATH
+    return ([output_path]
+            + resources_gen.compact_outputs(output_path)
+            + resources_gen.shard_outputs(resource_types, output_path))
+
+
+def write_blends_index(blends_dir=BLENDS_DIR):
+    """Write blends/index.json listing the official blends that exist."""
+    # Filter to only existing files
+    blend_files = [{'filename': f} for f in OFFICIAL_BLENDS if (blends_dir / f).exists()]
+
+    with open(blends_dir / 'index.json', 'w') as f:
+        json.dump(blend_files, f, indent=2)
+
+    print(f"✅ Updated index with {len(blend_files)} official blends")
+    print(f"   (Personal blends are only available via local server)")
+
+
+def write_blend_baselines(blends_dir=BLENDS_DIR, output=BASELINES_PATH):
+    """Write blends/baselines.json with the stats of the official blends that exist."""
+    paths = [blends_dir / f for f in OFFICIAL_BLENDS if (blends_dir / f).exists()]
+    try:
+        blend_stats.write_baselines(paths, output)
+    except blend_stats.BlendStatsError as e:
+        # The page falls back to counting the base blends itself
+        print(f"⚠️  Skipping blend baselines: {e}")
+        Path(output).unlink(missing_ok=True)
+        return
+    print(f"✅ Wrote baselines for {len(paths)} blends to {Path(output).name}")
+
+
+class Target:
+    """A group of output files rebuilt together from a set of input sheets."""
+
+    def __init__(self, name, outputs, sheets, build, extra_inputs=None):
+        self.name = name
+        self.outputs = [Path(p) for p in outputs]
+        self.sheets = sheets
+        self.build = build
+        self.extra_inputs = extra_inputs
+
+    def input_key(self, sheet_hashes, code_hash):
+        parts = [('code', code_hash)]
+        parts += [(f"sheet:{name}", sheet_hashes.get(name)) for name in self.sheets]
+        if self.extra_inputs:
+            parts += list(self.extra_inputs())
+        return combine_hashes(parts)
+
+    def is_fresh(self, manifest, key):
+        """True if every output exists unmodified and was built from the same inputs."""
+        for output in self.outputs:
+            entry = manifest['outputs'].get(self.rel(output))
+            if not entry or entry.get('inputs') != key:
+                return False
+            if entry.get('hash') != file_hash(output):
+                return False
+        return True
+
+    def record(self, manifest, key):
+        for output in self.outputs:
+            manifest['outputs'][self.rel(output)] = {
+                'inputs': key,
+                'hash': file_hash(output),
+            }
+
+    @staticmethod
+    def rel(path):
+        try:
+            return str(Path(path).relative_to(ROOT_DIR))
+        except ValueError:
+            return str(path)
+
+
+def build(force=False, excel_path=EXCEL_PATH):
+    """Build every stale output; returns the list of rebuilt target names."""
+    inventory = load_inventory(excel_path)
+    manifest = resources_gen.load_manifest(MANIFEST_PATH)
+
+    sheet_hashes = {name: inventory[name].fingerprint() for name in inventory.sheetnames}
+    code_hash = combine_hashes((name, file_hash(ROOT_DIR / name)) for name in code_files())
+
+    changed_sheets = [name for name in inventory.sheetnames
+                      if manifest['sheets'].get(name) != sheet_hashes[name]]
+    if manifest['sheets']:
+        print(f"Changed sheets: {', '.join(changed_sheets) if changed_sheets else 'none'}")
+
+    # resources.json is needed in memory by the base blends; generated or
+    # loaded lazily so an up-to-date file is not parsed unless required
+    state = {'resources': None}
+
+    def get_resources():
+        if state['resources'] is None:
+            with open(resources_gen.OUTPUT_PATH, 'r', encoding='utf-8') as f:
+                state['resources'] = json.load(f)
+        return state['resources']
+
+    def build_resources():
+        # Only sheets whose fingerprint changed are re-normalized
+        state['resources'] = resources_gen.generate_resources_json(
+            inventory, incremental=not force, manifest=manifest)
+
+    blend_sheets = [s for s in blends.RESOURCE_SHEETS if s in inventory]
+    base_sheets = [s for s in blend_sheets if s not in blends.BASE_BLEND_SKIP_SHEETS]
+
+    def official_blends_present():
+        # The index only depends on which official blends exist
+        return [(f"exists:{name}", (BLENDS_DIR / name).exists()) for name in OFFICIAL_BLENDS]
+
+    def baseline_inputs():
+        # Stats depend on the blends and resources.json built above, not on sheets
+        parts = [(f"blend:{name}", file_hash(BLENDS_DIR / name)) for name in OFFICIAL_BLENDS]
+        parts.append(('resources', file_hash(resources_gen.OUTPUT_PATH)))
+        parts.append(('code:blend_stats.py', file_hash(ROOT_DIR / 'blend_stats.py')))
+        parts.append(('numpy', blend_stats.np is not None))
+        return parts
+
+    targets = [
+        Target('resources.json', resources_outputs([name.lower() for name in inventory.sheetnames]),
+               list(inventory.sheetnames), build_resources),
+        Target('house blends',
+               [BLENDS_DIR / "Merakons_House_Blend.md", BLENDS_DIR / "TragicJonsons_House_Blend.md"],
+               blend_sheets, lambda: blends.create_house_blends(inventory)),
+        Target('base blends',
+               [BLENDS_DIR / "Base_Imperium.md", BLENDS_DIR / "Base_Uprising.md"],
+               base_sheets,
+               lambda: blends.create_base_blends(inventory, blends.RESOURCE_SHEETS, get_resources())),
+        Target('blends/index.json', [BLENDS_DIR / 'index.json'], [], write_blends_index,
+               extra_inputs=official_blends_present),
+        Target('blends/baselines.json', [BASELINES_PATH], [], write_blend_baselines,
+               extra_inputs=baseline_inputs),
+    ]
+
+    BLENDS_DIR.mkdir(exist_ok=True)
+    rebuilt = []
+    for target in targets:
+        key = target.input_key(sheet_hashes, code_hash)
+
+        if not force and target.is_fresh(manifest, key):
+            print(f"⏭️  {target.name} is up to date")
+            continue
+
+        print(f"\n🔨 Building {target.name}...")
+        target.build()
+        target.record(manifest, key)
+        rebuilt.append(target.name)
+
+    manifest['sheets'] = sheet_hashes
+    resources_gen.save_manifest(manifest, MANIFEST_PATH)
+    return rebuilt
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--force', action='store_true',
+                        help='rebuild every output even if its inputs did not change')
+    parser.add_argument('--excel', default=str(EXCEL_PATH),
+                        help='path to the inventory workbook')
+    args = parser.parse_args()
+
+    rebuilt = build(force=args.force, excel_path=args.excel)
+    if rebuilt:
+        print(f"\n✅ Rebuilt: {', '.join(rebuilt)}")
+    else:
+        print("\n✅ Everything up to date")
+
+
+if __name__ == '__main__':
+    main()
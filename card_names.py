@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Fuzzy card-name resolution with a trigram index and edit distance.
+
+Names are normalized (case, accents, punctuation, "…" vs "..."), so most
+alternate spellings match exactly. Other names are looked up in a trigram
+index: every indexed name sharing trigrams with the query is scored by
+trigram overlap, and the best few are rescored by edit distance. This
+resolves typos on either side ("Ruthless Leadeship", "Ornitopter") without
+a hand-maintained corrections table. A fuzzy match is rejected when its
+numbers differ ("Harvest 3+ Spice" is not "Harvest 4+ Spice"), when it only
+adds or drops a plural "s" ("Sardaukar Legions" is not "Sardaukar Legion"),
+or when it does not clearly beat the runner-up. resolve_all() loops over the
+unique names of a batch, answering exact matches from a dict.
+
+Usage: python3 card_names.py [blend.md ...]   (report blend lines that do
+not exactly match a card in resources.json, with the best candidates)
+"""
+import argparse
+import json
+import re
+import unicodedata
+from collections import Counter
+from pathlib import Path
+
+from blend_codec import parse_blend_file
+
+RESOURCES_FILE = Path(__file__).parent / "resources.json"
+BLENDS_DIR = Path(__file__).parent / "blends"
+
+# Lowest score (edit similarity, 0-1) accepted by resolve()
+DEFAULT_MIN_SCORE = 0.8
+# Score a fuzzy match must beat the next distinct candidate by
+MIN_MARGIN = 0.05
+# Trigram-overlap candidates rescored by edit distance
+RESCORE_CANDIDATES = 8
+
+_PUNCTUATION_RE = re.compile(r"[^a-z0-9 ]+")
+# Digits and roman numerals: names differing in these are different cards
+_NUMBER_RE = re.compile(r"\b(?:\d+|[ivx]+)\b")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_name(name):
+    """Comparable form of a card name: lowercase ASCII words separated by single spaces."""
+    text = unicodedata.normalize('NFKD', str(name)).replace('…', '...')
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    text = text.replace("'", '').replace('’', '')
+    return _SPACE_RE.sub(' ', _PUNCTUATION_RE.sub(' ', text)).strip()
+
+
+def distinguishable(a, b):
+    """True if two different normalized names may not be taken for each other:
+    their numbers differ, or they only differ by a plural "s"."""
+    if _NUMBER_RE.findall(a) != _NUMBER_RE.findall(b):
+        return True
+    singular = lambda text: [w[:-1] if w.endswith('s') and len(w) > 3 else w for w in text.split()]
+    return singular(a) == singular(b)
+
+
+def trigrams(text):
+    """Set of character trigrams of a normalized name (padded so short names get some)."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, max_distance=None):
+    """Levenshtein distance; stops early (returning max_distance + 1) once it is exceeded."""
+    if len(a) < len(b):
+        a, b = b, a
+    if max_distance is not None and len(a) - len(b) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        current = [i]
+        for j, cb in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (ca != cb)))
+        if max_distance is not None and min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+class Candidate:
+    """A scored match: indexed name, its value and similarity (1.0 = same normalized name)."""
+
+    __slots__ = ('name', 'value', 'score', 'distance')
+
+    def __init__(self, name, value, score, distance):
+        self.name = name
+        self.value = value
+        self.score = score
+        self.distance = distance
+
+    def __repr__(self):
+        return f"Candidate({self.name!r}, score={self.score:.2f})"
+
+
+class NameResolver:
+    """Trigram index over card names for exact, fuzzy and bulk lookups."""
+
+    def __init__(self, names=(), min_score=DEFAULT_MIN_SCORE):
+        """names: card names, or (name, value) pairs; value defaults to the name."""
+        self.min_score = min_score
+        self._names = []          # [(name, normalized, value)]
+        self._exact = {}          # normalized -> id of the first such name
+        self._trigrams = []       # trigram count of each name
+        self._postings = {}       # trigram -> [ids]
+        for item in names:
+            if isinstance(item, tuple):
+                self.add(*item)
+            else:
+                self.add(item)
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, name, value=None):
+        normalized = normalize_name(name)
+        name_id = len(self._names)
+        self._names.append((name, normalized, name if value is None else value))
+        self._exact.setdefault(normalized, name_id)
+        grams = trigrams(normalized)
+        self._trigrams.append(len(grams))
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(name_id)
+
+    def candidates(self, name, limit=5):
+        """Best matches for a name, highest score first."""
+        return self._candidates(normalize_name(name), limit)
+
+    def resolve(self, name):
+        """Exact match, else the best fuzzy match scoring at least min_score
+        and MIN_MARGIN above the runner-up, or None."""
+        return self._resolve(normalize_name(name))
+
+    def resolve_all(self, names):
+        """{name: resolve(name)} for a batch of names.
+
+        Not a vectorized pass: each unique normalized name is resolved once,
+        in a plain loop.
+        """
+        resolved = {}
+        by_normalized = {}
+        for name in names:
+            if name in resolved:
+                continue
+            normalized = normalize_name(name)
+            if normalized not in by_normalized:
+                by_normalized[normalized] = self._resolve(normalized)
+            resolved[name] = by_normalized[normalized]
+        return resolved
+
+    def _resolve(self, normalized):
+        name_id = self._exact.get(normalized)
+        if name_id is not None:
+            name, _, value = self._names[name_id]
+            return Candidate(name, value, 1.0, 0)
+        candidates = [(c, normalize_name(c.name))
+                      for c in self._candidates(normalized, RESCORE_CANDIDATES)]
+        candidates = [(c, other) for c, other in candidates
+                      if not distinguishable(normalized, other)]
+        if not candidates or candidates[0][0].score < self.min_score:
+            return None
+        best, best_normalized = candidates[0]
+        runner_up = next((c for c, other in candidates[1:] if other != best_normalized), None)
+        if runner_up is not None and best.score - runner_up.score < MIN_MARGIN:
+            return None
+        return best
+
+    def _candidates(self, normalized, limit):
+        if not normalized:
+            return []
+        grams = trigrams(normalized)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+        if not shared:
+            return []
+
+        # Dice coefficient over trigrams picks the names worth an edit distance
+        size = len(grams)
+        overlap = sorted(((2 * count / (size + self._trigrams[name_id]), name_id)
+                          for name_id, count in shared.items()), reverse=True)
+        results = []
+        for dice, name_id in overlap[:max(limit, RESCORE_CANDIDATES)]:
+            name, other, value = self._names[name_id]
+            longest = max(len(normalized), len(other))
+            distance = edit_distance(normalized, other)
+            score = 1 - distance / longest
+            results.append((score, dice, -name_id, Candidate(name, value, score, distance)))
+        results.sort(reverse=True, key=lambda r: r[:3])
+        return [r[3] for r in results[:limit]]
+
+
+def catalog_entries(resources):
+    """("Name (Source)", resource_type, card) of every card, as written in blends.
+
+    Distinct cards sharing a name and source get "#N" suffixes in
+    resource_id order, like the blend editor does.
+    """
+    entries = []
+    for resource_type, items in resources.items():
+        groups = {}
+        for card in items:
+            name = card.get('objective') or card.get('name') or ''
+            source = card.get('source') or card.get('card_set') or ''
+            groups.setdefault((name.lower(), source.lower()), []).append((name, source, card))
+        for group in groups.values():
+            group.sort(key=lambda entry: entry[2].get('resource_id') or 0)
+            for index, (name, source, card) in enumerate(group, start=1):
+                suffix = f" #{index}" if len(group) > 1 else ''
+                entries.append((f"{name}{suffix} ({source})", resource_type, card))
+    return entries
+
+
+def catalog_names(resources):
+    """("Name (Source)", resource_type) of every card, as written in blends."""
+    return [(name, resource_type) for name, resource_type, _ in catalog_entries(resources)]
+
+
+def catalog_resolver(resources_file=RESOURCES_FILE):
+    """Resolver over the blend names of every card in resources.json."""
+    with open(resources_file, 'r', encoding='utf-8') as f:
+        return NameResolver(catalog_names(json.load(f)))
+
+
+def check_blend(path, resolver):
+    """Blend items without an exact card match: [(item, [candidates])]."""
+    blend = parse_blend_file(path)
+    items = [item for entries in blend.sections.values() for item, _ in entries]
+    problems = []
+    for name, match in resolver.resolve_all(items).items():
+        if match is None or match.score < 1.0:
+            problems.append((name, resolver.candidates(name, 3)))
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check blend card names against resources.json')
+    parser.add_argument('blends', nargs='*', help='blend .md files (default: blends/*.md)')
+    args = parser.parse_args()
+
+    resolver = catalog_resolver()
+    paths = [Path(p) for p in args.blends] or sorted(BLENDS_DIR.glob('*.md'))
+    unmatched = 0
+    for path in paths:
+        problems = check_blend(path, resolver)
+        unmatched += len(problems)
+        if not problems:
+            print(f"✅ {path.name}")
+            continue
+        print(f"⚠️  {path.name}: {len(problems)} names without an exact match")
+        for name, candidates in problems:
+            suggestions = ', '.join(f"{c.name} [{c.score:.2f}]" for c in candidates) or 'none'
+            print(f"    {name} -> {suggestions}")
+    return 1 if unmatched else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
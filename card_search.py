@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Indexed card search over resources.json (/api/cards/search in server_dual.py).
+
+At load time every card gets an id and inverted indexes are built for:
+- name tokens and ability text tokens (agent/reveal/passive abilities, effects)
+- resource type, card_set, source and faction board access
+- persuasion_cost (sorted, for exact and range filters)
+
+Token lookups are prefix matches against a sorted vocabulary ("atre" finds
+"Atreides"), and filters are set intersections starting from the smallest
+posting set, so queries stay well under a millisecond. The index is rebuilt
+when resources.json changes on disk.
+
+Usage: python3 card_search.py [query] [--type imperium] [--access fremen] ...
+"""
+import argparse
+import bisect
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from pathlib import Path
+
+RESOURCES_FILE = Path(__file__).parent / "resources.json"
+
+ACCESS_FACTIONS = ('green', 'purple', 'yellow', 'emperor', 'spacing_guild',
+                   'bene_gesserit', 'fremen', 'spy')
+# Card text searched by the ability= parameter
+ABILITY_FIELDS = ('agent_ability', 'reveal_ability', 'passive_ability', 'acquisition_bonus',
+                  'effect', 'plot_effect', 'combat_effect', 'endgame_effect', 'leader_ability',
+                  'signet_ring_ability', 'starting_effect', 'scheme_ability', 'reward')
+# Fields copied into search results when present
+RESULT_FIELDS = ('resource_type', 'name', 'source', 'card_set', 'resource_id', 'count',
+                 'persuasion_cost', 'specimen_cost', 'spice_cost', 'reveal_persuasion',
+                 'reveal_swords') + ABILITY_FIELDS
+
+DEFAULT_LIMIT = 25
+MAX_LIMIT = 200
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+class CardSearchError(Exception):
+    """Invalid search parameters."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def normalize(text):
+    """Lowercase ASCII form of card text (accents removed, apostrophes dropped)."""
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return text.lower().replace("'", '').replace('’', '')
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(normalize(text))
+
+
+def _has(value):
+    return value not in (None, '')
+
+
+def _has_x(value):
+    """True for an 'X'-marked cell (faction access), like the editor's table filters."""
+    return isinstance(value, str) and value.strip().lower() == 'x'
+
+
+def _number(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _split(value):
+    """'a, b' -> ['a', 'b'] (normalized, '-' and ' ' become '_')."""
+    return [normalize(v).strip().replace('-', '_').replace(' ', '_')
+            for v in (value or '').split(',') if v.strip()]
+
+
+class TokenIndex:
+    """Inverted index from tokens to card ids with prefix lookups."""
+
+    def __init__(self):
+        self.postings = {}
+        self.vocabulary = []
+
+    def add(self, card_id, text):
+        for token in tokenize(text):
+            self.postings.setdefault(token, set()).add(card_id)
+
+    def freeze(self):
+        self.vocabulary = sorted(self.postings)
+
+    def lookup(self, token, prefix=True):
+        """Ids of cards with `token` (or, with prefix, any token starting with it)."""
+        if not prefix:
+            return self.postings.get(token, set())
+        start = bisect.bisect_left(self.vocabulary, token)
+        matches = []
+        for word in self.vocabulary[start:]:
+            if not word.startswith(token):
+                break
+            matches.append(self.postings[word])
+        if len(matches) == 1:
+            return matches[0]
+        return set().union(*matches)
+
+    def search(self, text, prefix=True):
+        """Ids of cards matching every token of `text`, or None if it has no tokens."""
+        tokens = tokenize(text)
+        if not tokens:
+            return None
+        return _intersect([self.lookup(token, prefix) for token in tokens])
+
+
+def _intersect(sets):
+    sets = sorted(sets, key=len)
+    result = set(sets[0])
+    for s in sets[1:]:
+        if not result:
+            break
+        result &= s
+    return result
+
+
+class CardIndex:
+    """Search indexes over a {resource_type: [card, ...]} mapping (read-only once built)."""
+
+    def __init__(self, resources=None):
+        self.cards = []
+        self.sort_names = []  # normalized name of each card, for ranking
+        self.names = TokenIndex()
+        self.abilities = TokenIndex()
+        self.by_type = {}
+        self.by_set = {}
+        self.by_source = {}
+        self.by_access = {faction: set() for faction in ACCESS_FACTIONS}
+        self.costs = []       # sorted persuasion_cost values
+        self.cost_ids = []    # card id for each entry of costs
+        self.type_order = {}
+        self._build(resources or {})
+
+    def _build(self, resources):
+        costs = []
+        for type_rank, (resource_type, items) in enumerate(resources.items()):
+            self.type_order[resource_type] = type_rank
+            for card in items:
+                card_id = len(self.cards)
+                self.cards.append(card)
+                self.sort_names.append(' '.join(tokenize(card.get('name', ''))))
+                self.names.add(card_id, card.get('name', ''))
+                for field in ABILITY_FIELDS:
+                    if _has(card.get(field)):
+                        self.abilities.add(card_id, card[field])
+                self.by_type.setdefault(resource_type, set()).add(card_id)
+                if _has(card.get('card_set')):
+                    self.by_set.setdefault(normalize(card['card_set']), set()).add(card_id)
+                if _has(card.get('source')):
+                    source = normalize(card['source']).replace(' ', '_')
+                    self.by_source.setdefault(source, set()).add(card_id)
+                for faction in ACCESS_FACTIONS:
+                    if _has_x(card.get(f'{faction}_access')):
+                        self.by_access[faction].add(card_id)
+                cost = _number(card.get('persuasion_cost'))
+                if cost is not None:
+                    costs.append((cost, card_id))
+        self.names.freeze()
+        self.abilities.freeze()
+        costs.sort()
+        self.costs = [cost for cost, _ in costs]
+        self.cost_ids = [card_id for _, card_id in costs]
+
+    # Querying
+
+    def search(self, q=None, ability=None, types=None, sets=None, sources=None, access=None,
+               min_cost=None, max_cost=None, prefix=True, limit=DEFAULT_LIMIT, offset=0):
+        """Cards matching every given filter, best name matches first.
+
+        q matches name tokens, ability matches card text tokens; types, sets,
+        sources and access are lists (a card needs one of the types/sets/
+        sources and all of the access factions). Returns {'total', 'results'}.
+        """
+        candidates = []
+        for text, index in ((q, self.names), (ability, self.abilities)):
+            if text and text.strip():
+                # Text without any searchable token (e.g. "!!!") matches nothing
+                ids = index.search(text, prefix)
+                candidates.append(ids if ids is not None else set())
+        for values, postings in ((types, self.by_type), (sets, self.by_set),
+                                 (sources, self.by_source)):
+            if values:
+                candidates.append(set().union(*(postings.get(v, set()) for v in values)))
+        for faction in access or ():
+            if faction not in self.by_access:
+                raise CardSearchError(f"Unknown faction access: {faction}. "
+                                      f"Valid: {', '.join(ACCESS_FACTIONS)}")
+            candidates.append(self.by_access[faction])
+        if min_cost is not None or max_cost is not None:
+            lo = 0 if min_cost is None else bisect.bisect_left(self.costs, min_cost)
+            hi = len(self.costs) if max_cost is None else bisect.bisect_right(self.costs, max_cost)
+            candidates.append(set(self.cost_ids[lo:hi]))
+
+        if candidates:
+            ids = _intersect(candidates)
+        else:
+            ids = range(len(self.cards))
+
+        query = ' '.join(tokenize(q)) if q else ''
+        ranked = sorted(ids, key=lambda card_id: self._rank(card_id, query))
+        return {
+            'total': len(ranked),
+            'results': [self.summary(card_id) for card_id in ranked[offset:offset + limit]],
+        }
+
+    def _rank(self, card_id, query):
+        card = self.cards[card_id]
+        name = self.sort_names[card_id]
+        if not query or name == query:
+            match = 0
+        elif name.startswith(query):
+            match = 1
+        else:
+            match = 2
+        return (match, self.type_order.get(card.get('resource_type'), 0), name, card_id)
+
+    def summary(self, card_id):
+        """Compact search result for a card (non-empty fields only)."""
+        card = self.cards[card_id]
+        result = {field: card[field] for field in RESULT_FIELDS if _has(card.get(field))}
+        access = [f for f in ACCESS_FACTIONS if _has_x(card.get(f'{f}_access'))]
+        if access:
+            result['access'] = access
+        return result
+
+
+class CardCatalog:
+    """CardIndex of resources.json, rebuilt when the file changes (thread-safe)."""
+
+    def __init__(self, resources_file=RESOURCES_FILE):
+        self.resources_file = Path(resources_file)
+        self._lock = threading.Lock()
+        self._signature = None
+        self._index = CardIndex()
+
+    def index(self):
+        """Current index; a rebuilt index replaces the old one, so readers never see a partial build."""
+        try:
+            stat = os.stat(self.resources_file)
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            signature = None
+        if signature == self._signature:
+            return self._index
+        with self._lock:
+            if signature != self._signature:
+                resources = {}
+                if signature is not None:
+                    with open(self.resources_file, 'r', encoding='utf-8') as f:
+                        resources = json.load(f)
+                self._index = CardIndex(resources)
+                self._signature = signature
+            return self._index
+
+    def search(self, **kwargs):
+        return self.index().search(**kwargs)
+
+
+def _int_param(params, name, default=None, minimum=None, maximum=None):
+    value = params.get(name, [None])[0]
+    if value in (None, ''):
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise CardSearchError(f"{name} must be an integer")
+    if minimum is not None:
+        number = max(number, minimum)
+    if maximum is not None:
+        number = min(number, maximum)
+    return number
+
+
+def search_params(params):
+    """Keyword arguments for CardIndex.search() from parsed query parameters.
+
+    Accepts q, ability, type, set, source, access (comma-separated lists),
+    cost, min_cost, max_cost, prefix=0 (exact tokens), limit and offset.
+    """
+    def first(name):
+        return params.get(name, [None])[0]
+
+    cost = _int_param(params, 'cost')
+    min_cost = _int_param(params, 'min_cost', cost)
+    max_cost = _int_param(params, 'max_cost', cost)
+    return {
+        'q': first('q'),
+        'ability': first('ability'),
+        'types': _split(first('type')),
+        'sets': _split(first('set')),
+        'sources': _split(first('source')),
+        'access': _split(first('access')),
+        'min_cost': min_cost,
+        'max_cost': max_cost,
+        'prefix': first('prefix') not in ('0', 'false', 'no'),
+        'limit': _int_param(params, 'limit', DEFAULT_LIMIT, 1, MAX_LIMIT),
+        'offset': _int_param(params, 'offset', 0, 0),
+    }
+
+
+def search_cards(catalog, params):
+    """Run a /api/cards/search query (parsed query parameters) against a catalog."""
+    started = time.perf_counter()
+    result = catalog.search(**search_params(params))
+    result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 3)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Search cards in resources.json')
+    parser.add_argument('q', nargs='?', help='name tokens (prefix match)')
+    parser.add_argument('--ability', help='ability/effect text tokens')
+    parser.add_argument('--type', help='resource types, comma-separated')
+    parser.add_argument('--set', help='card sets, comma-separated')
+    parser.add_argument('--source', help='sources, comma-separated')
+    parser.add_argument('--access', help='required faction access, comma-separated')
+    parser.add_argument('--cost', help='persuasion cost')
+    parser.add_argument('--min-cost', help='minimum persuasion cost')
+    parser.add_argument('--max-cost', help='maximum persuasion cost')
+    parser.add_argument('--limit', default=str(DEFAULT_LIMIT), help='maximum results')
+    args = parser.parse_args()
+
+    params = {name: [value] for name, value in vars(args).items() if value is not None}
+    result = search_cards(CardCatalog(), params)
+    print(f"🔎 {result['total']} cards ({result['elapsed_ms']} ms)")
+    for card in result['results']:
+        print(f"  [{card.get('resource_type')}] {card.get('name')} ({card.get('source', '')})")
+
+
+if __name__ == '__main__':
+    main()
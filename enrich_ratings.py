@@ -2,14 +2,34 @@
 """
 Fetch card ratings from dunecardshub.com and write them to the Excel spreadsheet.
 Adds columns: DCH Rating (1-5), DCH Votes, DCH Tier (S/A/B/C/D)
+
+Rating pages are fetched concurrently over a pooled session with retries and
+recorded in .cache/dch_ratings/; re-runs revalidate them with ETag /
+Last-Modified and --offline replays them without network access.
 """
-import requests
+import argparse
 import json
-import openpyxl
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from urllib.parse import urlsplit
+
+import openpyxl
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from card_names import NameResolver
 
 EXCEL_PATH = Path(__file__).parent / "Dune_Imperium_Card_Inventory.xlsx"
 BASE_URL = "https://dunecardshub.com"
+RATINGS_PATH = "/api/cards/rating"
+PAGE_SIZE = 100
+DEFAULT_FETCH_WORKERS = 8
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36"
+# Recorded API pages, replayed on re-runs and with --offline
+CACHE_DIR = Path(__file__).parent / ".cache" / "dch_ratings"
 
 EXPANSION_MAP = {
     "Dune: Imperium": ["Base", "Imperium"],
@@ -26,35 +46,108 @@ TYPE_TO_SHEET = {
     "intrigue": "Intrigue",
 }
 
+# Columns written to the Imperium and Intrigue sheets
+RATING_COLUMNS = ("DCH Rating", "DCH Votes", "DCH Tier")
+
 # Map rating number → tier letter (5=S, 4=A, 3=B, 2=C, 1=D)
 RATING_TO_TIER = {5: "S", 4: "A", 3: "B", 2: "C", 1: "D"}
 
-# Name corrections: maps our Excel names (lowercased) → API names (lowercased)
-NAME_CORRECTIONS = {
-    "ruthless leadership": "ruthless leadeship",       # API typo
-    "full-scale assault": "full-scale assult",         # API typo
-    "to the victor…": "to the victory...",
-    "change allegiences": "change allegiances",        # Excel typo
-    "ornithopter": "ornitopter",                       # API alternate spelling
-    "corner the market": "corner the marker",          # API alternate spelling
-}
+# Spelling differences between our Excel names and API names (typos on either
+# side, "…" vs "...") are resolved by card_names.NameResolver
+
+
+class PageCache:
+    """Rating API pages stored on disk with their ETag/Last-Modified validators.
+
+    Pages are kept per API host (cache_dir/<host>/page-N.json), so a run against
+    a local stub does not overwrite the pages recorded from the real site.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, base_url=BASE_URL):
+        host = urlsplit(base_url).netloc or "local"
+        self.directory = Path(cache_dir) / re.sub(r"[^A-Za-z0-9.-]", "_", host)
+
+    def path(self, page):
+        return self.directory / f"page-{page}.json"
+
+    def load(self, page):
+        """{'etag', 'last_modified', 'data'} of a stored page, or None."""
+        try:
+            with open(self.path(page), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
 
+    def store(self, page, data, etag=None, last_modified=None):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path(page)
+        tmp_path = path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"etag": etag, "last_modified": last_modified, "data": data}, f)
+        os.replace(tmp_path, path)
 
-def fetch_all_ratings():
-    headers = {"User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36"}
-    all_cards = []
-    page = 1
-    while True:
-        r = requests.get(
-            f"{BASE_URL}/api/cards/rating?limit=100&page={page}",
-            headers=headers, verify=False, timeout=20
-        )
+
+def create_session(workers=DEFAULT_FETCH_WORKERS, retries=3, backoff=0.5):
+    """Session with a connection pool for `workers` threads and retry/backoff on
+    connection errors and 429/5xx responses."""
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=backoff,
+                  status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=frozenset(["GET"]))
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+def fetch_page(session, base_url, page, cache, offline=False):
+    """One page of ratings, revalidated against (or, offline, replayed from) the cache."""
+    cached = cache.load(page)
+    if offline:
+        if cached is None:
+            raise RuntimeError(f"Page {page} is not in the cache ({cache.directory})")
+        return cached["data"]
+
+    headers = {}
+    if cached and cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    if cached and cached.get("last_modified"):
+        headers["If-Modified-Since"] = cached["last_modified"]
+    try:
+        r = session.get(f"{base_url}{RATINGS_PATH}?limit={PAGE_SIZE}&page={page}",
+                        headers=headers, verify=False, timeout=20)
+        if r.status_code == 304 and cached:
+            return cached["data"]
+        r.raise_for_status()
         data = r.json()
-        all_cards.extend(data["data"])
-        print(f"  Fetched page {page}/{data['pagination']['totalPages']}")
-        if not data["pagination"]["hasNextPage"]:
-            break
-        page += 1
+    except (requests.RequestException, ValueError) as e:
+        if cached is None:
+            raise
+        print(f"  Page {page}: {e}; using cached copy")
+        return cached["data"]
+    cache.store(page, data, r.headers.get("ETag"), r.headers.get("Last-Modified"))
+    return data
+
+
+def fetch_all_ratings(base_url=BASE_URL, workers=DEFAULT_FETCH_WORKERS, cache_dir=CACHE_DIR,
+                      offline=False):
+    """All rated cards: page 1 gives totalPages, the rest are fetched concurrently."""
+    base_url = base_url.rstrip("/")
+    cache = PageCache(cache_dir, base_url)
+    with create_session(workers) as session:
+        first = fetch_page(session, base_url, 1, cache, offline)
+        total_pages = first["pagination"]["totalPages"]
+        pages = {1: first}
+        print(f"  Fetched page 1/{total_pages}")
+        if total_pages > 1:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(fetch_page, session, base_url, page, cache, offline): page
+                           for page in range(2, total_pages + 1)}
+                for future in as_completed(futures):
+                    pages[futures[future]] = future.result()
+                    print(f"  Fetched page {futures[future]}/{total_pages}")
+    all_cards = [c for page in sorted(pages) for c in pages[page]["data"]]
     print(f"  Total cards fetched: {len(all_cards)}")
     return all_cards
 
@@ -80,37 +173,50 @@ def build_lookup(all_cards):
     return lookup
 
 
-def add_columns_to_sheet(ws, sheet_name, lookup, api_type):
-    """Add DCH Rating, DCH Votes, DCH Tier columns to a sheet."""
-    headers = [cell.value for cell in ws[1]]
+def build_name_resolvers(all_cards):
+    """API card names (lowercased) per API type, for fuzzy matching Excel names."""
+    names = {}
+    for c in all_cards:
+        card = c["card"]
+        names.setdefault(card["type"], set()).add(card["name"].strip().lower())
+    return {api_type: NameResolver(sorted(type_names)) for api_type, type_names in names.items()}
 
-    # Determine column indices for new columns (add if not present)
-    new_cols = ["DCH Rating", "DCH Votes", "DCH Tier"]
-    col_indices = {}
-    for col_name in new_cols:
-        if col_name in headers:
-            col_indices[col_name] = headers.index(col_name) + 1
-        else:
-            next_col = len(headers) + 1
-            ws.cell(row=1, column=next_col, value=col_name)
-            col_indices[col_name] = next_col
-            headers.append(col_name)
-            print(f"  Added column '{col_name}' at position {next_col}")
+
+def _cell(row, index):
+    value = row[index] if index is not None and index < len(row) else None
+    return None if value == "" else value
+
+
+def compute_sheet_ratings(rows, sheet_name, lookup, api_type, resolver):
+    """Rating values for a sheet's rows; only rows whose values differ are returned.
+
+    rows: cell values (header row first), e.g. from a read-only worksheet.
+    Returns (changes, missing_columns): {row_idx: (rating, votes, tier)} and
+    the rating columns the sheet does not have yet.
+    """
+    rows = iter(rows)
+    headers = list(next(rows, ()))
+    missing_columns = [c for c in RATING_COLUMNS if c not in headers]
+    rating_cols = [headers.index(c) if c in headers else None for c in RATING_COLUMNS]
 
     name_col_idx = 0  # First column is the name
 
     # Find Source column index
     source_col_idx = headers.index("Source") if "Source" in headers else None
 
-    matched = 0
+    rows = [(row_idx, row) for row_idx, row in enumerate(rows, start=2) if _cell(row, name_col_idx)]
+    # Resolve all Excel names against the API names in one batch
+    resolved = resolver.resolve_all(str(row[name_col_idx]).strip().lower() for _, row in rows)
+
+    changes = {}
+    unchanged = 0
     unmatched = []
+    fuzzy = []
 
-    for row_idx, row in enumerate(ws.iter_rows(min_row=2, values_only=False), start=2):
-        raw_name = row[name_col_idx].value
-        if not raw_name:
-            continue
+    for row_idx, row in rows:
+        raw_name = row[name_col_idx]
         card_name = str(raw_name).strip().lower()
-        source_val = str(row[source_col_idx].value).strip() if source_col_idx is not None and row[source_col_idx].value else ""
+        source_val = str(_cell(row, source_col_idx) or "").strip()
 
         # Map source to API expansion
         api_expansions = []
@@ -118,12 +224,12 @@ def add_columns_to_sheet(ws, sheet_name, lookup, api_type):
             if source_val in excel_sources:
                 api_expansions.append(api_exp)
 
-        # Apply name corrections if needed
-        corrected_name = NAME_CORRECTIONS.get(card_name, card_name)
+        match = resolved.get(card_name)
+        corrected_name = match.name if match else card_name
 
-        # Try to match with expansion, then without
+        # Try the exact name before the fuzzy match, each with expansion, then without
         rating_data = None
-        for name_try in [corrected_name, card_name]:
+        for name_try in dict.fromkeys([card_name, corrected_name]):
             for api_exp in api_expansions:
                 rating_data = lookup.get((name_try, api_type, api_exp))
                 if rating_data:
@@ -133,39 +239,99 @@ def add_columns_to_sheet(ws, sheet_name, lookup, api_type):
             if rating_data:
                 break
 
-        if rating_data:
-            ws.cell(row=row_idx, column=col_indices["DCH Rating"]).value = rating_data["rating"]
-            ws.cell(row=row_idx, column=col_indices["DCH Votes"]).value = rating_data["votes"]
-            ws.cell(row=row_idx, column=col_indices["DCH Tier"]).value = rating_data["tier"]
-            matched += 1
-        else:
+        if not rating_data:
             unmatched.append(f"{raw_name!r} [{source_val}]")
+            continue
+        if name_try != card_name:
+            fuzzy.append(f"{raw_name!r} -> {corrected_name!r} ({match.score:.2f})")
 
-    print(f"  {sheet_name}: matched {matched}, unmatched {len(unmatched)}")
+        values = (rating_data["rating"], rating_data["votes"], rating_data["tier"])
+        current = tuple(_cell(row, col) for col in rating_cols)
+        if current == tuple(None if v == "" else v for v in values):
+            unchanged += 1
+        else:
+            changes[row_idx] = values
+
+    matched = len(changes) + unchanged
+    print(f"  {sheet_name}: matched {matched} ({len(changes)} changed, {unchanged} unchanged), "
+          f"unmatched {len(unmatched)}")
+    if fuzzy:
+        print(f"  Fuzzy matched names:")
+        for f in fuzzy:
+            print(f"    {f}")
     if unmatched:
         print(f"  Unmatched cards:")
         for u in unmatched:
             print(f"    {u}")
+    return changes, missing_columns
+
+
+def apply_rating_updates(ws, changes):
+    """Write computed rating values to a sheet in one pass, adding missing columns."""
+    headers = [cell.value for cell in ws[1]]
+    col_indices = {}
+    for col_name in RATING_COLUMNS:
+        if col_name in headers:
+            col_indices[col_name] = headers.index(col_name) + 1
+        else:
+            next_col = len(headers) + 1
+            ws.cell(row=1, column=next_col, value=col_name)
+            col_indices[col_name] = next_col
+            headers.append(col_name)
+            print(f"  Added column '{col_name}' at position {next_col}")
+
+    columns = [col_indices[c] for c in RATING_COLUMNS]
+    for row_idx in sorted(changes):
+        for column, value in zip(columns, changes[row_idx]):
+            ws.cell(row=row_idx, column=column).value = value
 
 
 def main():
-    print("Fetching ratings from dunecardshub.com...")
-    all_cards = fetch_all_ratings()
+    parser = argparse.ArgumentParser(description="Add dunecardshub.com ratings to the Excel inventory")
+    parser.add_argument("--base-url", default=BASE_URL, help=f"ratings API (default: {BASE_URL})")
+    parser.add_argument("--workers", type=int, default=DEFAULT_FETCH_WORKERS,
+                        help=f"concurrent page requests (default: {DEFAULT_FETCH_WORKERS})")
+    parser.add_argument("--cache-dir", type=Path, default=CACHE_DIR, help="recorded page cache")
+    parser.add_argument("--offline", action="store_true", help="replay pages from the cache only")
+    parser.add_argument("--dry-run", action="store_true", help="report changes without saving")
+    args = parser.parse_args()
+
+    print(f"Fetching ratings from {args.base_url}...")
+    all_cards = fetch_all_ratings(args.base_url, max(1, args.workers), args.cache_dir, args.offline)
     lookup = build_lookup(all_cards)
+    resolvers = build_name_resolvers(all_cards)
 
-    print(f"\nLoading Excel: {EXCEL_PATH}")
-    wb = openpyxl.load_workbook(EXCEL_PATH)
+    # Compute every sheet's changes from a (fast) read-only pass first
+    print(f"\nReading Excel: {EXCEL_PATH}")
+    wb = openpyxl.load_workbook(EXCEL_PATH, read_only=True)
+    updates = {}
+    try:
+        for api_type, sheet_name in TYPE_TO_SHEET.items():
+            if sheet_name not in wb.sheetnames:
+                print(f"  Sheet '{sheet_name}' not found, skipping")
+                continue
+            print(f"\nProcessing sheet: {sheet_name}")
+            changes, missing_columns = compute_sheet_ratings(
+                wb[sheet_name].iter_rows(values_only=True), sheet_name, lookup, api_type,
+                resolvers.get(api_type) or NameResolver())
+            if changes or missing_columns:
+                updates[sheet_name] = changes
+    finally:
+        wb.close()
 
-    for api_type, sheet_name in TYPE_TO_SHEET.items():
-        if sheet_name not in wb.sheetnames:
-            print(f"  Sheet '{sheet_name}' not found, skipping")
-            continue
-        print(f"\nProcessing sheet: {sheet_name}")
-        ws = wb[sheet_name]
-        add_columns_to_sheet(ws, sheet_name, lookup, api_type)
+    if not updates:
+        print(f"\n✅ Ratings unchanged, not saving {EXCEL_PATH.name}")
+        return
+    if args.dry_run:
+        print(f"\nDry run: {sum(len(c) for c in updates.values())} rows would change")
+        return
 
+    # Only now load the workbook for editing, and apply all updates in one pass
+    wb = openpyxl.load_workbook(EXCEL_PATH)
+    for sheet_name, changes in updates.items():
+        apply_rating_updates(wb[sheet_name], changes)
     wb.save(EXCEL_PATH)
-    print(f"\nSaved: {EXCEL_PATH}")
+    print(f"\nSaved: {EXCEL_PATH} ({sum(len(c) for c in updates.values())} rows updated)")
 
 
 if __name__ == "__main__":
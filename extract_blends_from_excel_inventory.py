@@ -4,11 +4,35 @@ Regenerate all blend files in the new simplified format
 Format: "- count× name" for all resource types
 """
 import json
-import openpyxl
 from pathlib import Path
-from collections import Counter
 from urllib.parse import quote
 
+from blend_codec import OVERVIEW_FIELDS, Blend, count_items, write_blend_file
+from inventory import load_inventory, parse_count
+
+BLENDS_DIR = Path(__file__).parent / "blends"
+
+# Resource type configurations (worksheet -> blend section)
+RESOURCE_SHEETS = {
+    'Imperium': 'Imperium Cards',
+    'Intrigue': 'Intrigue Cards',
+    'Tleilax': 'Tleilax Cards',
+    'Reserve': 'Reserve Cards',
+    'Tech': 'Tech Tiles',
+    'Contracts': 'Contracts',
+    'Leader': 'Leaders',
+    'Sardaukar': 'Sardaukar',
+    'Starter': 'Starter Cards',
+    'Conflict': 'Conflict Cards'
+}
+
+# Sheets left out of the base game blends
+# Sardaukar - physical tokens that come with the game regardless
+# Tech - not part of base game card selections
+# Contracts - only in Imperium base game, not in base blends
+BASE_BLEND_SKIP_SHEETS = ['Sardaukar', 'Tech', 'Contracts']
+
+
 def generate_dune_card_hub_url(card_name, resource_type, expansion):
     """Generate a dunecardshub.com search URL for a card."""
     # Map resource types to dunecardshub.com types
@@ -42,79 +66,28 @@ def generate_dune_card_hub_url(card_name, resource_type, expansion):
 
     return url
 
-def get_starter_cards_for_source(source):
+def get_starter_cards_for_source(source, inventory=None):
     """Get all starter cards for a specific source (Imperium or Uprising)."""
-    excel_path = Path(__file__).parent / "Dune_Imperium_Card_Inventory.xlsx"
-    wb = openpyxl.load_workbook(excel_path, data_only=True)
-
-    if 'Starter' not in wb.sheetnames:
-        return []
-
-    ws = wb['Starter']
-    headers = [cell.value for cell in ws[1]]
-    name_col = headers[0] if headers else "Card Name"
-
-    starter_cards = []
-    for row in ws.iter_rows(min_row=2, values_only=True):
-        row_dict = dict(zip(headers, row))
-        resource_name = str(row_dict.get(name_col, '')).strip()
-        if not resource_name:
-            continue
-
-        # Get source and normalize
-        card_source = str(row_dict.get("Source", "Imperium")).strip()
-        if card_source == "Base":
-            card_source = "Imperium"
-
-        # Only include cards from the specified source
-        if card_source != source:
-            continue
-
-        # Normalize name
-        resource_name = resource_name.replace('(Base)', '(Imperium)')
-
-        # Remove source suffix if present
-        source_suffix = f"({card_source})"
-        if resource_name.endswith(source_suffix):
-            resource_name = resource_name[:-len(source_suffix)].strip()
+    if inventory is None:
+        inventory = load_inventory()
+    return inventory.starter_cards(source)
 
-        # Add with source
-        resource_name_with_source = f"{resource_name} ({card_source})"
+def regenerate_all_blends(inventory=None, all_resources=None):
+    """Regenerate all blends from an inventory parsed once (loaded if not given)."""
+    if inventory is None:
+        inventory = load_inventory()
 
-        # Get count
-        count = row_dict.get("Count") or row_dict.get("Count per Player") or 1
-        try:
-            item_count = int(float(count)) if count else 1
-        except (ValueError, TypeError):
-            item_count = 1
+    create_house_blends(inventory)
 
-        # Add the appropriate number of copies
-        for _ in range(item_count):
-            starter_cards.append(resource_name_with_source)
+    # Create Base Imperium and Base Uprising
+    create_base_blends(inventory, RESOURCE_SHEETS, all_resources)
 
-    return starter_cards
 
-def regenerate_all_blends():
-    excel_path = Path(__file__).parent / "Dune_Imperium_Card_Inventory.xlsx"
-    blends_dir = Path(__file__).parent / "blends"
+def create_house_blends(inventory):
+    """Create Merakon's and TragicJonson's blends from their Excel count columns."""
+    blends_dir = BLENDS_DIR
     blends_dir.mkdir(exist_ok=True)
-
-    print(f"Loading {excel_path}")
-    wb = openpyxl.load_workbook(excel_path, data_only=True)
-
-    # Resource type configurations
-    resource_sheets = {
-        'Imperium': 'Imperium Cards',
-        'Intrigue': 'Intrigue Cards',
-        'Tleilax': 'Tleilax Cards',
-        'Reserve': 'Reserve Cards',
-        'Tech': 'Tech Tiles',
-        'Contracts': 'Contracts',
-        'Leader': 'Leaders',
-        'Sardaukar': 'Sardaukar',
-        'Starter': 'Starter Cards',
-        'Conflict': 'Conflict Cards'
-    }
+    resource_sheets = RESOURCE_SHEETS
 
     # For custom blends (Merakon and TragicJonson)
     merakon_resources = {sheet: [] for sheet in resource_sheets.values()}
@@ -150,15 +123,12 @@ def regenerate_all_blends():
 
     # Process each worksheet
     for sheet_name, display_name in resource_sheets.items():
-        if sheet_name not in wb.sheetnames:
+        if sheet_name not in inventory:
             print(f"  Skipping {sheet_name} (not found)")
             continue
 
-        ws = wb[sheet_name]
-        headers = [cell.value for cell in ws[1]]
-
-        # Find name column (first column usually)
-        name_col = headers[0] if headers else "Card Name"
+        table = inventory[sheet_name]
+        headers = table.headers
 
         # Find blend columns if they exist
         merakon_col = "Count in Merakon's House Blend"
@@ -167,50 +137,25 @@ def regenerate_all_blends():
         merakon_idx = headers.index(merakon_col) if merakon_col in headers else None
         tragic_idx = headers.index(tragic_col) if tragic_col in headers else None
 
-        for row in ws.iter_rows(min_row=2, values_only=True):
-            row_dict = dict(zip(headers, row))
-            # Properly handle None values - convert to empty string, not "None"
-            resource_name_raw = row_dict.get(name_col, '')
-            if resource_name_raw is None:
-                continue
-            resource_name = str(resource_name_raw).strip()
-            if not resource_name or resource_name.upper() == 'NONE':
+        for record in table.records():
+            # Name, source and count are normalized by the inventory
+            resource_name = record.name
+            if resource_name.upper() == 'NONE':
                 continue
 
             # Skip Intrigue cards with Twisted = X
             if sheet_name == 'Intrigue':
-                twisted = row_dict.get('Twisted', '')
+                twisted = record.get('Twisted', '')
                 if twisted and str(twisted).strip().upper() == 'X':
                     continue
 
-            # Normalize card names: replace (Base) with (Imperium)
-            resource_name = resource_name.replace('(Base)', '(Imperium)')
-
-            # Get source
-            source = str(row_dict.get("Source", "Imperium")).strip()
-            # Normalize Base to Imperium
-            if source == "Base":
-                source = "Imperium"
-
-            # Check if the card name already has the source in parentheses
-            # If so, remove it to avoid duplication
-            source_suffix = f"({source})"
-            if resource_name.endswith(source_suffix):
-                # Remove the suffix from the name
-                resource_name = resource_name[:-len(source_suffix)].strip()
-
-            # Now add the source in parentheses
-            resource_name_with_source = f"{resource_name} ({source})"
+            source = record.source
+            resource_name_with_source = record.name_with_source
 
             # Add to Merakon's blend if count exists OR special handling
             merakon_count = 0
             if merakon_idx is not None:
-                merakon_val = row_dict.get(merakon_col, 0)
-                if merakon_val and str(merakon_val).strip() not in ['', '0', '0.0']:
-                    try:
-                        merakon_count = int(float(merakon_val))
-                    except (ValueError, TypeError):
-                        merakon_count = 0
+                merakon_count = parse_count(record.get(merakon_col), default=0)
 
             # Add based on Excel count
             if merakon_count > 0:
@@ -222,29 +167,13 @@ def regenerate_all_blends():
                     merakon_resources[display_name].append(resource_name_with_source)
             # Special handling for Reserve, Starter, Conflict, Contracts - add all Uprising ones
             elif sheet_name in ['Reserve', 'Starter', 'Conflict', 'Contracts'] and source == "Uprising":
-                # Get count from appropriate column
-                if sheet_name == 'Starter':
-                    count = row_dict.get("Count") or row_dict.get("Count per Player") or 1
-                else:
-                    count = row_dict.get("Count") or 1
-                try:
-                    item_count = int(float(count)) if count else 1
-                except (ValueError, TypeError):
-                    item_count = 1
-                for _ in range(item_count):
+                for _ in range(record.count):
                     merakon_resources[display_name].append(resource_name_with_source)
 
             # Add to TragicJonson's blend if count exists
             if tragic_idx is not None:
-                tragic_count = row_dict.get(tragic_col, 0)
-                if tragic_count and str(tragic_count).strip() not in ['', '0', '0.0']:
-                    try:
-                        count = int(float(tragic_count))
-                        if count > 0:
-                            for _ in range(count):
-                                tragic_resources[display_name].append(resource_name_with_source)
-                    except (ValueError, TypeError):
-                        pass
+                for _ in range(parse_count(record.get(tragic_col), default=0)):
+                    tragic_resources[display_name].append(resource_name_with_source)
 
     # Add manual leaders to Merakon's blend
     for leader_name, leader_source in merakon_manual_leaders.items():
@@ -259,7 +188,8 @@ def regenerate_all_blends():
             filepath, "Merakon's House Blend", merakon_resources,
             description="https://boardgamegeek.com/thread/3213458/merakons-house-blend",
             board="uprising",
-            leader_selection="Deal four leaders to each player. Everyone picks a leader simultaneously."
+            leader_selection="Deal four leaders to each player. Everyone picks a leader simultaneously.",
+            inventory=inventory
         )
         total = sum(len(items) for items in merakon_resources.values())
         print(f"✓ Created Merakon's House Blend with {total} total items")
@@ -270,38 +200,33 @@ def regenerate_all_blends():
         create_multi_resource_blend_file(
             filepath, "TragicJonson's House Blend", tragic_resources,
             description="https://observablehq.com/@mrcorvus/dune-imperium-deck-builder",
-            board="uprising"
+            board="uprising",
+            inventory=inventory
         )
         total = sum(len(items) for items in tragic_resources.values())
         print(f"✓ Created TragicJonson's House Blend with {total} total items")
 
-    # Create Base Imperium and Base Uprising
-    create_base_blends(wb, resource_sheets)
-
 
-def create_base_blends(wb, resource_sheets):
+def create_base_blends(inventory, resource_sheets=RESOURCE_SHEETS, all_resources=None):
     """Create Base Imperium and Base Uprising blends."""
-    # Load resources.json to get resource IDs for synonym handling
-    resources_json_path = Path(__file__).parent / 'resources.json'
-    with open(resources_json_path, 'r', encoding='utf-8') as f:
-        all_resources = json.load(f)
+    # Resource IDs for synonym handling come from resources.json, unless the
+    # caller already has the generated resources in memory
+    if all_resources is None:
+        resources_json_path = Path(__file__).parent / 'resources.json'
+        with open(resources_json_path, 'r', encoding='utf-8') as f:
+            all_resources = json.load(f)
 
     base_imperium_resources = {}
     base_uprising_resources = {}
 
     for sheet_name, display_name in resource_sheets.items():
-        if sheet_name not in wb.sheetnames:
+        if sheet_name not in inventory:
             continue
 
-        # Skip Sardaukar - they are physical tokens that come with the game regardless
-        # Skip Tech - not part of base game card selections
-        # Skip Contracts - only in Imperium base game, not in base blends
-        if sheet_name in ['Sardaukar', 'Tech', 'Contracts']:
+        if sheet_name in BASE_BLEND_SKIP_SHEETS:
             continue
 
-        ws = wb[sheet_name]
-        headers = [cell.value for cell in ws[1]]
-        name_col = headers[0] if headers else "Card Name"
+        table = inventory[sheet_name]
 
         base_imperium_items = []
         base_uprising_items = []
@@ -322,38 +247,13 @@ def create_base_blends(wb, resource_sheets):
                     resource_lookup[key] = []
                 resource_lookup[key].append(resource_id)
 
-        for row in ws.iter_rows(min_row=2, values_only=True):
-            row_dict = dict(zip(headers, row))
-            # Properly handle None values - convert to empty string, not "None"
-            resource_name_raw = row_dict.get(name_col, '')
-            if resource_name_raw is None:
-                continue
-            resource_name = str(resource_name_raw).strip()
-            if not resource_name or resource_name.upper() == 'NONE':
+        for record in table.records():
+            # Name, source and count are normalized by the inventory
+            resource_name = record.name
+            if resource_name.upper() == 'NONE':
                 continue
-
-            # Normalize card names: replace (Base) with (Imperium)
-            resource_name = resource_name.replace('(Base)', '(Imperium)')
-
-            source = str(row_dict.get("Source", "Imperium")).strip()
-            # Normalize Base to Imperium
-            if source == "Base":
-                source = "Imperium"
-
-            # Check if the card name already has the source in parentheses
-            # If so, remove it to avoid duplication
-            source_suffix = f"({source})"
-            if resource_name.endswith(source_suffix):
-                # Remove the suffix from the name
-                resource_name = resource_name[:-len(source_suffix)].strip()
-
-            # Handle different count column names (Starter uses "Count per Player")
-            count = row_dict.get("Count") or row_dict.get("Count per Player") or 1
-
-            try:
-                item_count = int(float(count)) if count else 1
-            except (ValueError, TypeError):
-                item_count = 1
+            source = record.source
+            item_count = record.count
 
             # Check if this is a synonym (multiple resources with same name+source)
             lookup_key = f"{resource_name}|{source}"
@@ -386,99 +286,43 @@ def create_base_blends(wb, resource_sheets):
 
     # Save Base Imperium (uses imperium board)
     if base_imperium_resources:
-        filepath = Path(__file__).parent / "blends" / "Base_Imperium.md"
+        filepath = BLENDS_DIR / "Base_Imperium.md"
         create_multi_resource_blend_file(filepath, "Base Imperium", base_imperium_resources,
-                                        "Dune: Imperium base game", board="imperium")
+                                        "Dune: Imperium base game", board="imperium",
+                                        inventory=inventory)
         total = sum(len(items) for items in base_imperium_resources.values())
         print(f"✓ Created Base Imperium with {total} total items")
 
     # Save Base Uprising (uses uprising board)
     if base_uprising_resources:
-        filepath = Path(__file__).parent / "blends" / "Base_Uprising.md"
+        filepath = BLENDS_DIR / "Base_Uprising.md"
         create_multi_resource_blend_file(filepath, "Base Uprising", base_uprising_resources,
-                                        "Dune: Imperium - Uprising base game", board="uprising")
+                                        "Dune: Imperium - Uprising base game", board="uprising",
+                                        inventory=inventory)
         total = sum(len(items) for items in base_uprising_resources.values())
         print(f"✓ Created Base Uprising with {total} total items")
 
 
-def create_multi_resource_blend_file(filepath, blend_name, resources_by_type, description="", board="imperium", additional_boards=None, leader_selection="", house_rules=""):
+def create_multi_resource_blend_file(filepath, blend_name, resources_by_type, description="", board="imperium", additional_boards=None, leader_selection="", house_rules="", inventory=None):
     """Create a blend file with multiple resource types in simplified format."""
     # Auto-add Starter cards based on board
     if 'Starter Cards' not in resources_by_type or not resources_by_type['Starter Cards']:
         # Add starter cards based on board
         starter_source = "Imperium" if board == "imperium" else "Uprising"
-        resources_by_type['Starter Cards'] = get_starter_cards_for_source(starter_source)
-
-    md = f"# {blend_name}\n\n"
-
-    # Add Overview section if any overview fields are provided
-    if description or leader_selection or house_rules:
-        md += "## Overview\n\n"
-        if description:
-            md += "### Description\n\n"
-            md += f"{description}\n\n"
-        if leader_selection:
-            md += "### Leader Selection\n\n"
-            md += f"{leader_selection}\n\n"
-        if house_rules:
-            md += "### House Rules\n\n"
-            md += f"{house_rules}\n\n"
-
-    # Add board selection
-    md += f"## Board\n\n"
-    md += f"- Main Board: {board}\n"
-    if additional_boards:
-        md += f"- Additional Boards: {', '.join(additional_boards)}\n"
-    md += "\n"
-
-
-    total_items = sum(len(items) for items in resources_by_type.values())
-    md += f"**Total Items:** {total_items}\n\n"
-
-    # Add each resource type section
-    for resource_type, items in resources_by_type.items():
-        if not items:
-            continue
-
-        md += f"## {resource_type}\n\n"
-
-        # Separate synonym items (with #) from regular items
-        synonym_items = []
-        regular_items = []
-        for item in items:
-            if ' #' in item and item.count('(') > 0:
-                # This is a synonym item - keep it separate
-                synonym_items.append(item)
-            else:
-                regular_items.append(item)
-
-        # Count occurrences for regular items only
-        item_counts = Counter(regular_items)
-
-        # Sort by name and output regular items
-        for item_name in sorted(item_counts.keys()):
-            count = item_counts[item_name]
-            if count == 1:
-                md += f"- {item_name}\n"
-            else:
-                # Multiple copies - use count× format
-                md += f"- {count}× {item_name}\n"
-
-        # Output synonym items individually (no grouping)
-        for item_name in sorted(set(synonym_items)):
-            # Count how many of this specific synonym variant
-            count = synonym_items.count(item_name)
-            if count == 1:
-                md += f"- {item_name}\n"
-            else:
-                md += f"- {count}× {item_name}\n"
-
-        md += "\n"
-
-    md += "---\n*Generated by Dune Imperium Blend Builder*\n"
-
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(md)
+        resources_by_type['Starter Cards'] = get_starter_cards_for_source(starter_source, inventory)
+
+    overview = {field: text for field, text in
+                zip(OVERVIEW_FIELDS, (description, leader_selection, house_rules)) if text}
+    blend = Blend(
+        blend_name,
+        overview=overview or None,
+        board=board,
+        additional_boards=additional_boards or (),
+        # Synonym items ("Name #N (Source)") are listed after the regular items
+        sections={resource_type: count_items(items, synonyms_last=True)
+                  for resource_type, items in resources_by_type.items() if items},
+    )
+    write_blend_file(filepath, blend)
 
 
 if __name__ == '__main__':
@@ -2,125 +2,386 @@
 """
 Generate resources.json from Excel spreadsheet.
 Run this whenever the Excel file is updated.
+
+With --incremental only the worksheets whose cell values changed since the
+last run are re-normalized and spliced into the existing resources.json;
+the per-sheet fingerprints live in build_manifest.json, shared with
+build_data.py. Every output is serialized in full but only rewritten when
+its bytes change.
+
+Alongside resources.json a compact columnar copy (resources.compact.json)
+is written for the browser, with precompressed .gz and .br siblings, and
+the same data is sharded per resource type into data/resources/ with a
+manifest.json of counts and hashes so the editor can load tabs lazily.
 """
-import openpyxl
+import argparse
+import gzip
+import hashlib
 import json
 from pathlib import Path
 
+from inventory import load_inventory
 
-def generate_resources_json():
-    """Load all resource types from Excel and save as JSON."""
-    excel_path = Path(__file__).parent / "Dune_Imperium_Card_Inventory.xlsx"
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
-    if not excel_path.exists():
-        raise FileNotFoundError(f"Could not find: {excel_path}")
+OUTPUT_PATH = Path(__file__).parent / 'resources.json'
+# Build manifest (see build_data.py): per-sheet fingerprints of the inventory
+# that produced resources.json, plus build_data's output hashes
+MANIFEST_PATH = Path(__file__).parent / 'build_manifest.json'
 
-    print(f"Loading {excel_path}")
-    wb = openpyxl.load_workbook(excel_path, data_only=True)
+# Source -> card_set used for color coding
+CARD_SET_MAPPING = {
+    "Imperium": "base",
+    "Base": "base",
+    "Rise of Ix": "ix",
+    "Ix": "ix",
+    "Immortality": "immortality",
+    "Uprising": "uprising",
+    "Bloodlines": "bloodlines",
+    "Promo": "promo"
+}
 
-    all_resources = {}
 
-    for sheet_name in wb.sheetnames:
-        ws = wb[sheet_name]
-        headers = [cell.value for cell in ws[1]]
+def build_sheet_resources(table):
+    """Normalize one worksheet into resource dicts with row-order resource IDs."""
+    sheet_name = table.name
+    headers = table.headers
+
+    # Output key of every column except the name column (first column), with
+    # dict(zip(headers, row)) semantics: a repeated header keeps its last column
+    name_col = headers[0] if headers else None
+    columns = [(index, key.lower().replace(' ', '_').replace('-', '_').replace('?', ''))
+               for key, index in {h: i for i, h in enumerate(headers)}.items()
+               if key and key != name_col]
+    resource_type = sheet_name.lower()
 
-        resources = []
-        for row in ws.iter_rows(min_row=2, values_only=True):
-            if not row[0]:
-                continue
+    resources = []
+    for record in table.records():
+        values = record.values
 
-            row_dict = dict(zip(headers, row))
+        # Name is normalized by the inventory: (Base) -> (Imperium), no "(Source)" suffix
+        resource = {
+            'resource_type': resource_type,
+            'name': record.name,
+            'selected': 0
+        }
 
-            # Get the name from first column
-            name_col = headers[0]
-            resource_name = str(row_dict.get(name_col, '')).strip()
-            if not resource_name:
-                continue
+        # Add all columns as properties
+        for index, col_key in columns:
+            value = values[index] if index < len(values) else None
+            # Store value as-is, converting to string only if needed
+            if value is None or value == '':
+                resource[col_key] = ''
+            elif isinstance(value, (int, float)):
+                resource[col_key] = value
+            else:
+                resource[col_key] = str(value)
 
-            # Normalize card names: replace (Base) with (Imperium)
-            resource_name = resource_name.replace("(Base)", "(Imperium)")
+        # Skip Intrigue cards with Twisted = X
+        if sheet_name.lower() == 'intrigue' and resource.get('twisted', '').strip().upper() == 'X':
+            continue
 
-            # Get source early to check for duplication
-            source = str(row_dict.get('Source', 'Imperium')).strip()
-            if source == 'Base':
+        # Add source/set mapping for color coding
+        # Sardaukar are from Bloodlines expansion
+        if sheet_name.lower() == 'sardaukar':
+            source = 'Bloodlines'
+            resource['source'] = 'Bloodlines'
+        else:
+            # Other sheets without Source column default to Imperium
+            source = resource.get('source', '')
+            if not source:
+                source = 'Imperium'
+                resource['source'] = 'Imperium'
+            elif source == 'Base':
                 source = 'Imperium'
+                resource['source'] = 'Imperium'
 
-            # Check if the card name already has the source in parentheses
-            source_suffix = f"({source})"
-            if resource_name.endswith(source_suffix):
-                resource_name = resource_name[:-len(source_suffix)].strip()
-
-            # Create resource object
-            resource = {
-                'resource_type': sheet_name.lower(),
-                'name': resource_name,
-                'selected': 0
-            }
-
-            # Add all columns as properties
-            for key, value in row_dict.items():
-                if key and key != name_col:  # Include all columns except the name column
-                    col_key = key.lower().replace(' ', '_').replace('-', '_').replace('?', '')
-                    # Store value as-is, converting to string only if needed
-                    if value is None or value == '':
-                        resource[col_key] = ''
-                    elif isinstance(value, (int, float)):
-                        resource[col_key] = value
-                    else:
-                        resource[col_key] = str(value)
-
-            # Skip Intrigue cards with Twisted = X
-            if sheet_name.lower() == 'intrigue' and resource.get('twisted', '').strip().upper() == 'X':
-                continue
-
-            # Add source/set mapping for color coding
-            # Sardaukar are from Bloodlines expansion
-            if sheet_name.lower() == 'sardaukar':
-                source = 'Bloodlines'
-                resource['source'] = 'Bloodlines'
-            else:
-                # Other sheets without Source column default to Imperium
-                source = resource.get('source', '')
-                if not source:
-                    source = 'Imperium'
-                    resource['source'] = 'Imperium'
-                elif source == 'Base':
-                    source = 'Imperium'
-                    resource['source'] = 'Imperium'
-
-            card_set_mapping = {
-                "Imperium": "base",
-                "Base": "base",
-                "Rise of Ix": "ix",
-                "Ix": "ix",
-                "Immortality": "immortality",
-                "Uprising": "uprising",
-                "Bloodlines": "bloodlines",
-                "Promo": "promo"
-            }
-            resource['card_set'] = card_set_mapping.get(source, str(source).lower() if source else 'base')
-
-            resources.append(resource)
-
-        # Assign stable IDs based on original Excel row order (not sorting)
-        # This ensures each row gets a unique ID regardless of content
-        for idx, resource in enumerate(resources):
-            resource['resource_id'] = idx
+        resource['card_set'] = CARD_SET_MAPPING.get(source, str(source).lower() if source else 'base')
+
+        resources.append(resource)
 
+    # Assign stable IDs based on original Excel row order (not sorting)
+    # This ensures each row gets a unique ID regardless of content
+    for idx, resource in enumerate(resources):
+        resource['resource_id'] = idx
+
+    return resources
+
+
+def build_resources(inventory):
+    """Normalize every worksheet of the inventory, keyed by resource type."""
+    all_resources = {}
+    for sheet_name in inventory.sheetnames:
+        resources = build_sheet_resources(inventory[sheet_name])
         all_resources[sheet_name.lower()] = resources
         print(f"Loaded {len(resources)} items from {sheet_name}")
+    return all_resources
+
+
+def encode_column(values):
+    """Encode one column: constant, sparse (non-empty cells only) or dense list."""
+    first = values[0]
+    if all(type(v) is type(first) and v == first for v in values):
+        return {'c': first}
+    filled = [i for i, v in enumerate(values) if v != '']
+    if len(filled) * 2 < len(values):
+        return {'i': filled, 'v': [values[i] for i in filled]}
+    return values
+
+
+def build_compact_payload(all_resources):
+    """Columnar form of resources.json: one shared key table per resource type.
+
+    Each type maps to {"n": count, "k": [keys], "c": [columns]} where a column
+    is a dense list, {"c": value} for a constant, or {"i": [rows], "v": [values]}
+    with empty ('') cells dropped. decodeCompactResources() in static/app.js
+    restores the original objects.
+    """
+    types = {}
+    for resource_type, resources in all_resources.items():
+        keys = list(resources[0]) if resources else []
+        columns = [encode_column([r.get(key, '') for r in resources]) for key in keys]
+        types[resource_type] = {'n': len(resources), 'k': keys, 'c': columns}
+    return {'format': 1, 'types': types}
+
+
+def compact_path_for(output_path):
+    """resources.json -> resources.compact.json"""
+    return Path(output_path).with_suffix('.compact.json')
+
+
+def compact_outputs(output_path=OUTPUT_PATH):
+    """Paths of the compact payload and its precompressed siblings."""
+    compact_path = compact_path_for(output_path)
+    outputs = [compact_path, Path(f"{compact_path}.gz")]
+    if brotli is not None:
+        outputs.append(Path(f"{compact_path}.br"))
+    return outputs
+
+
+def write_if_changed(path, data):
+    """Write bytes unless the file already holds them; True if written."""
+    path = Path(path)
+    try:
+        if path.read_bytes() == data:
+            return False
+    except OSError:
+        pass
+    with open(path, 'wb') as f:
+        f.write(data)
+    return True
+
+
+def write_precompressed(path, data):
+    """Write .gz (and .br when brotli is installed) siblings of a file's bytes."""
+    path = Path(path)
+    # mtime=0 keeps the .gz byte-identical between builds
+    with open(f"{path}.gz", 'wb') as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(f"{path}.br", 'wb') as f:
+            f.write(brotli.compress(data, quality=11))
+
+
+def write_compact_resources(all_resources, output_path=OUTPUT_PATH):
+    """Write resources.compact.json with its precompressed siblings."""
+    compact_path = compact_path_for(output_path)
+    data = json.dumps(build_compact_payload(all_resources), separators=(',', ':'),
+                      ensure_ascii=False).encode('utf-8')
+    if (not write_if_changed(compact_path, data)
+            and all(p.exists() for p in compact_outputs(output_path))):
+        print(f"✅ {compact_path} is unchanged")
+        return
+    write_precompressed(compact_path, data)
+    siblings = '.gz, .br' if brotli is not None else '.gz'
+    print(f"✅ Generated {compact_path} ({len(data) // 1024} KB, {siblings})")
+
+
+def shards_dir_for(output_path):
+    """resources.json -> data/resources/ next to it"""
+    return Path(output_path).parent / 'data' / 'resources'
+
+
+def shard_outputs(resource_types, output_path=OUTPUT_PATH):
+    """Paths of the shard manifest and every per-type shard with its siblings."""
+    shards_dir = shards_dir_for(output_path)
+    outputs = [shards_dir / 'manifest.json']
+    for resource_type in resource_types:
+        shard_path = shards_dir / f"{resource_type}.json"
+        outputs += [shard_path, Path(f"{shard_path}.gz")]
+        if brotli is not None:
+            outputs.append(Path(f"{shard_path}.br"))
+    return outputs
 
-    # Write JSON file
-    output_path = Path(__file__).parent / 'resources.json'
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(all_resources, f, indent=2)
 
-    print(f"\n✅ Generated {output_path}")
+def write_resource_shards(all_resources, output_path=OUTPUT_PATH):
+    """Write one compact shard per resource type plus manifest.json.
+
+    Shards whose bytes did not change are left untouched. Stale shards of
+    resource types that no longer exist are removed.
+    """
+    shards_dir = shards_dir_for(output_path)
+    shards_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest = {'format': 1, 'types': {}}
+    written = 0
+    for resource_type, resources in all_resources.items():
+        shard_path = shards_dir / f"{resource_type}.json"
+        data = json.dumps(build_compact_payload({resource_type: resources}),
+                          separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        manifest['types'][resource_type] = {
+            'file': shard_path.name,
+            'count': len(resources),
+            'bytes': len(data),
+            'hash': hashlib.sha256(data).hexdigest()[:16],
+        }
+        siblings = [Path(p) for p in shard_outputs([resource_type], output_path)[1:]]
+        if shard_path.exists() and shard_path.read_bytes() == data and all(p.exists() for p in siblings):
+            continue
+        with open(shard_path, 'wb') as f:
+            f.write(data)
+        write_precompressed(shard_path, data)
+        written += 1
+
+    for stale in shards_dir.glob('*.json*'):
+        base_name = stale.name.split('.json')[0]
+        if stale.name != 'manifest.json' and base_name not in all_resources:
+            stale.unlink()
+
+    write_if_changed(shards_dir / 'manifest.json',
+                     (json.dumps(manifest, indent=2) + '\n').encode('utf-8'))
+    print(f"✅ Generated {shards_dir} ({written} of {len(all_resources)} shards rewritten)")
+
+
+def write_resources_json(all_resources, output_path=OUTPUT_PATH):
+    """Write resources.json and its derived files (those whose bytes changed) and print a summary."""
+    if write_if_changed(output_path, json.dumps(all_resources, indent=2).encode('utf-8')):
+        print(f"\n✅ Generated {output_path}")
+    else:
+        print(f"\n✅ {output_path} is unchanged")
+    write_compact_resources(all_resources, output_path)
+    write_resource_shards(all_resources, output_path)
     print(f"Total resource types: {len(all_resources)}")
     total_items = sum(len(resources) for resources in all_resources.values())
     print(f"Total items: {total_items}")
 
 
-if __name__ == '__main__':
-    generate_resources_json()
+def _file_hash(path):
+    path = Path(path)
+    if not path.exists():
+        return None
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def _normalizer_version():
+    """Hash of this module: a change to the normalization invalidates every sheet."""
+    return _file_hash(__file__)
+
+
+def load_manifest(path=MANIFEST_PATH):
+    """Load the build manifest (empty if missing or unreadable)."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    manifest.setdefault('sheets', {})
+    manifest.setdefault('outputs', {})
+    return manifest
+
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    """Write the build manifest."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def record_build(manifest, sheet_fingerprints, output_path=OUTPUT_PATH):
+    """Record in the manifest which sheet contents the current resources.json was built from."""
+    manifest['sheets'] = sheet_fingerprints
+    manifest['resources'] = {
+        'normalizer': _normalizer_version(),
+        'output_hash': _file_hash(output_path),
+    }
+
 
+def update_resources_json(inventory, manifest, output_path=OUTPUT_PATH):
+    """Re-normalize only changed sheets and splice them into resources.json.
+
+    Unchanged sheets keep their existing arrays verbatim, so their
+    resource_id values (assigned from row order) stay stable. Falls back to a
+    full rebuild if resources.json was edited or the normalizer changed.
+    The manifest (see load_manifest) is updated but not saved.
+    Returns (all_resources, changed_sheet_names).
+    """
+    fingerprints = {name: inventory[name].fingerprint() for name in inventory.sheetnames}
+    previous = manifest.get('resources', {})
+
+    existing = None
+    if (previous.get('normalizer') == _normalizer_version()
+            and previous.get('output_hash') is not None
+            and previous.get('output_hash') == _file_hash(output_path)):
+        with open(output_path, 'r', encoding='utf-8') as f:
+            existing = json.load(f)
+    previous_sheets = manifest.get('sheets', {}) if existing is not None else {}
+
+    all_resources = {}
+    changed = []
+    for sheet_name in inventory.sheetnames:
+        resource_type = sheet_name.lower()
+        if (previous_sheets.get(sheet_name) == fingerprints[sheet_name]
+                and resource_type in existing):
+            all_resources[resource_type] = existing[resource_type]
+            continue
+        resources = build_sheet_resources(inventory[sheet_name])
+        all_resources[resource_type] = resources
+        changed.append(sheet_name)
+        print(f"Loaded {len(resources)} items from {sheet_name}")
+
+    if (existing is None or changed or list(existing) != list(all_resources)
+            or not all(p.exists() for p in compact_outputs(output_path))
+            or not all(p.exists() for p in shard_outputs(all_resources, output_path))):
+        write_resources_json(all_resources, output_path)
+        if existing is not None:
+            print(f"Re-normalized {len(changed)} of {len(fingerprints)} sheets")
+    else:
+        print(f"✅ {output_path} is up to date")
+
+    record_build(manifest, fingerprints, output_path)
+    return all_resources, changed
+
+
+def generate_resources_json(inventory=None, incremental=False, manifest=None):
+    """Load all resource types from Excel and save as JSON.
+
+    manifest is the build manifest to update; by default build_manifest.json
+    is loaded and saved here.
+    """
+    if inventory is None:
+        inventory = load_inventory()
+    save = manifest is None
+    if save:
+        manifest = load_manifest()
+
+    if incremental:
+        all_resources, _ = update_resources_json(inventory, manifest)
+    else:
+        all_resources = build_resources(inventory)
+        write_resources_json(all_resources)
+        record_build(manifest, {name: inventory[name].fingerprint() for name in inventory.sheetnames})
+
+    if save:
+        save_manifest(manifest)
+    return all_resources
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate resources.json from the Excel inventory.')
+    parser.add_argument('--incremental', action='store_true',
+                        help='only re-normalize sheets whose cell values changed')
+    args = parser.parse_args()
+    generate_resources_json(incremental=args.incremental)
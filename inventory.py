@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Loaded-once model of the Dune Imperium card inventory spreadsheet.
+The workbook is parsed a single time; generators receive the resulting
+Inventory with per-sheet row tables and precomputed starter card lists.
+
+The workbook is streamed in openpyxl's read-only mode, and each sheet's
+rows become compact CardRow records (__slots__) whose card name, source
+and count are normalized once, so generators do not rebuild a dict per row
+or repeat the same string clean-up.
+"""
+import hashlib
+import json
+import openpyxl
+from pathlib import Path
+
+EXCEL_PATH = Path(__file__).parent / "Dune_Imperium_Card_Inventory.xlsx"
+
+
+def normalize_source(source):
+    """Card source as used in blends: blank or "Base" -> "Imperium"."""
+    source = str(source).strip() if source is not None else ''
+    if not source or source == 'Base':
+        return 'Imperium'
+    return source
+
+
+def normalize_card_name(name, source):
+    """Card name without a redundant "(Source)" suffix; "(Base)" becomes "(Imperium)"."""
+    name = str(name).strip().replace('(Base)', '(Imperium)')
+    source_suffix = f"({source})"
+    if name.endswith(source_suffix):
+        name = name[:-len(source_suffix)].strip()
+    return name
+
+
+def parse_count(value, default=1):
+    """Integer copy count of a cell ("2", 2.0, ...); default if blank or invalid."""
+    try:
+        return int(float(value)) if value else default
+    except (ValueError, TypeError):
+        return default
+
+
+class CardRow:
+    """One worksheet row with its normalized card name, source and copy count.
+
+    values is the row's raw cell tuple; get() reads other columns by header.
+    """
+
+    __slots__ = ('table', 'values', 'name', 'source', 'count')
+
+    def __init__(self, table, values, name, source, count):
+        self.table = table
+        self.values = values
+        self.name = name
+        self.source = source
+        self.count = count
+
+    @property
+    def name_with_source(self):
+        """"Name (Source)" as written in blend files."""
+        return f"{self.name} ({self.source})"
+
+    def get(self, header, default=None):
+        """Cell value of a column (like dict.get on the row; None for an empty cell)."""
+        index = self.table.columns.get(header)
+        if index is None:
+            return default
+        return self.values[index] if index < len(self.values) else None
+
+
+class SheetTable:
+    """Header row and value rows of a single worksheet."""
+
+    def __init__(self, name, headers, rows):
+        self.name = name
+        self.headers = headers
+        self.rows = rows
+        self.columns = {}
+        for index, header in enumerate(headers):
+            self.columns.setdefault(header, index)
+        self._records = None
+
+    @property
+    def name_col(self):
+        """Name column header (first column usually)."""
+        return self.headers[0] if self.headers else "Card Name"
+
+    def records(self):
+        """CardRow records of the rows with a card name (built once)."""
+        if self._records is None:
+            source_idx = self.columns.get('Source')
+            count_idx = self.columns.get('Count')
+            per_player_idx = self.columns.get('Count per Player')
+            records = []
+            for values in self.rows:
+                raw_name = values[0] if values else None
+                if raw_name is None or not str(raw_name).strip():
+                    continue
+                source = normalize_source(_value(values, source_idx))
+                count = parse_count(_value(values, count_idx) or _value(values, per_player_idx))
+                records.append(CardRow(self, values, normalize_card_name(raw_name, source),
+                                       source, count))
+            self._records = records
+        return self._records
+
+    def dicts(self):
+        """Iterate rows as header -> value dicts."""
+        headers = self.headers
+        for row in self.rows:
+            yield dict(zip(headers, row))
+
+    def fingerprint(self):
+        """SHA-256 of the sheet's cell values (headers and rows, in order)."""
+        digest = hashlib.sha256()
+        digest.update(json.dumps(self.headers, default=str).encode('utf-8'))
+        for row in self.rows:
+            digest.update(b'\n')
+            digest.update(json.dumps(row, default=str).encode('utf-8'))
+        return digest.hexdigest()
+
+
+class Inventory:
+    """All worksheets of the inventory, parsed once."""
+
+    def __init__(self, path, sheets):
+        self.path = Path(path)
+        self.sheets = sheets
+        self.sheetnames = list(sheets)
+        self._starter_cards = build_starter_cards(sheets.get('Starter'))
+
+    def __contains__(self, sheet_name):
+        return sheet_name in self.sheets
+
+    def __getitem__(self, sheet_name):
+        return self.sheets[sheet_name]
+
+    def starter_cards(self, source):
+        """Starter cards ("Name (Source)", one entry per copy) for a source."""
+        return list(self._starter_cards.get(source, []))
+
+
+def _value(values, index):
+    return values[index] if index is not None and index < len(values) else None
+
+
+def build_starter_cards(table):
+    """Precompute starter card lists keyed by source (Imperium or Uprising)."""
+    starter_cards = {}
+    if table is None:
+        return starter_cards
+
+    for record in table.records():
+        # Add the appropriate number of copies
+        starter_cards.setdefault(record.source, []).extend([record.name_with_source] * record.count)
+
+    return starter_cards
+
+
+def load_inventory(excel_path=EXCEL_PATH):
+    """Parse the inventory workbook once into an Inventory."""
+    excel_path = Path(excel_path)
+    if not excel_path.exists():
+        raise FileNotFoundError(f"Could not find: {excel_path}")
+
+    print(f"Loading {excel_path}")
+    # Read-only mode streams rows from the file instead of building cell objects
+    wb = openpyxl.load_workbook(excel_path, data_only=True, read_only=True)
+
+    sheets = {}
+    try:
+        for ws in wb.worksheets:
+            rows = ws.iter_rows(values_only=True)
+            headers = list(next(rows, ()))
+            sheets[ws.title] = SheetTable(ws.title, headers, list(rows))
+    finally:
+        wb.close()
+
+    return Inventory(excel_path, sheets)
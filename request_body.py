@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Streaming parsers for blend upload/save request bodies.
+
+Bodies are fed to the parsers in fixed-size chunks and the blend content is
+written straight to a temporary file next to its destination, so memory use
+does not grow with the upload; the caller renames the file into place once
+the whole body has been received. Bodies larger than max_bytes are refused.
+
+- MultipartFileParser: the first file part of a multipart/form-data body
+- JSONFieldParser: a flat JSON object such as {"filename": ..., "content": ...},
+  with one (large) string field streamed to the file
+"""
+import asyncio
+import codecs
+import json
+import os
+import re
+import socket
+import tempfile
+
+# Largest request body accepted by default (blends are a few KB)
+DEFAULT_MAX_BODY_BYTES = 1024 * 1024
+# Size of the reads from the client socket
+CHUNK_SIZE = 64 * 1024
+# Largest multipart part header block and in-memory JSON field
+MAX_PART_HEADER_BYTES = 16 * 1024
+MAX_FIELD_CHARS = 4096
+
+_FILENAME_RE = re.compile(r'filename="([^"]*)"')
+_BOUNDARY_RE = re.compile(r'boundary=(?:"([^"]+)"|([^;\s]+))', re.IGNORECASE)
+
+_JSON_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f',
+                 'n': '\n', 'r': '\r', 't': '\t'}
+_WHITESPACE = ' \t\r\n'
+
+
+class RequestBodyError(ValueError):
+    """Malformed request body."""
+    status = 400
+
+
+class RequestBodyTooLarge(RequestBodyError):
+    """Request body larger than the configured limit."""
+    status = 413
+
+    def __init__(self, max_bytes):
+        super().__init__(f"Request body too large (limit {max_bytes} bytes)")
+
+
+class _SpoolFile:
+    """Temporary file in the destination directory, removed unless kept."""
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(dir=directory, prefix='.upload-', suffix='.tmp')
+        self.file = os.fdopen(fd, 'wb')
+
+    def write(self, data):
+        self.file.write(data)
+
+    def close(self):
+        self.file.close()
+
+    def discard(self):
+        self.file.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+class _BodyParser:
+    """Common size accounting and cleanup for the streaming parsers."""
+
+    def __init__(self, temp_dir, max_bytes=DEFAULT_MAX_BODY_BYTES):
+        self.temp_dir = temp_dir
+        self.max_bytes = max_bytes
+        self.received = 0
+        self.spool = None
+
+    def feed(self, data):
+        self.received += len(data)
+        if self.max_bytes is not None and self.received > self.max_bytes:
+            raise RequestBodyTooLarge(self.max_bytes)
+        self._feed(data)
+
+    def discard(self):
+        """Remove the temporary file (after an error or if it is not used)."""
+        if self.spool is not None:
+            self.spool.discard()
+            self.spool = None
+
+
+class MultipartFileParser(_BodyParser):
+    """Stream the first file part of a multipart/form-data body to a temp file.
+
+    close() returns (filename, temp_path).
+    """
+
+    def __init__(self, content_type, temp_dir, max_bytes=DEFAULT_MAX_BODY_BYTES):
+        super().__init__(temp_dir, max_bytes)
+        match = _BOUNDARY_RE.search(content_type or '')
+        if 'multipart/form-data' not in (content_type or '') or not match:
+            raise RequestBodyError('Invalid content type')
+        boundary = (match.group(1) or match.group(2)).encode('latin-1')
+        # Every delimiter, including the first, is preceded by CRLF
+        self.delimiter = b'\r\n--' + boundary
+        self.buffer = bytearray(b'\r\n')
+        self.state = 'preamble'
+        self.filename = None
+        self.writing = False
+
+    def _feed(self, data):
+        self.buffer += data
+        buffer = self.buffer
+        keep = len(self.delimiter) - 1
+
+        while True:
+            if self.state == 'preamble' or self.state == 'data':
+                index = buffer.find(self.delimiter)
+                if index < 0:
+                    # Hold back a possible partial delimiter
+                    safe = max(0, len(buffer) - keep)
+                    if self.writing and safe:
+                        self.spool.write(bytes(buffer[:safe]))
+                    del buffer[:safe]
+                    return
+                if self.writing:
+                    self.spool.write(bytes(buffer[:index]))
+                    self.spool.close()
+                    self.writing = False
+                    self.state = 'done'
+                    del buffer[:]
+                    return
+                del buffer[:index + len(self.delimiter)]
+                self.state = 'delimiter'
+
+            elif self.state == 'delimiter':
+                if len(buffer) < 2:
+                    return
+                if buffer[:2] == b'--':
+                    self.state = 'done'
+                    del buffer[:]
+                    return
+                if buffer[:2] != b'\r\n':
+                    raise RequestBodyError('Malformed multipart body')
+                del buffer[:2]
+                self.state = 'headers'
+
+            elif self.state == 'headers':
+                index = buffer.find(b'\r\n\r\n')
+                if index < 0:
+                    if len(buffer) > MAX_PART_HEADER_BYTES:
+                        raise RequestBodyError('Multipart headers too large')
+                    return
+                headers = bytes(buffer[:index]).decode('utf-8', errors='ignore')
+                del buffer[:index + 4]
+                match = _FILENAME_RE.search(headers)
+                if match:
+                    self.filename = match.group(1)
+                    self.spool = _SpoolFile(self.temp_dir)
+                    self.writing = True
+                self.state = 'data'
+
+            else:
+                # Epilogue (or parts after the file) is ignored
+                del buffer[:]
+                return
+
+    def close(self):
+        if self.filename is None or self.state != 'done':
+            self.discard()
+            raise RequestBodyError('No file found in request')
+        return self.filename, self.spool.path
+
+
+class JSONFieldParser(_BodyParser):
+    """Incrementally parse a flat JSON object, streaming one string field to a file.
+
+    Only string, number, boolean and null values are supported. close()
+    returns (fields, temp_path); temp_path is None when the streamed field
+    was absent. Other string fields are kept in memory (up to MAX_FIELD_CHARS).
+    """
+
+    def __init__(self, temp_dir, stream_field='content', max_bytes=DEFAULT_MAX_BODY_BYTES):
+        super().__init__(temp_dir, max_bytes)
+        self.stream_field = stream_field
+        self.fields = {}
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.pending = ''       # unprocessed text (an incomplete escape or literal)
+        self.state = 'start'
+        self.key = None
+        self.sink = None        # list of str chunks, or the spool file
+        self.sink_chars = 0
+        self.after_string = None
+        self.high_surrogate = None
+        self.literal = ''
+
+    def _feed(self, data):
+        try:
+            text = self.decoder.decode(data)
+        except UnicodeDecodeError:
+            raise RequestBodyError('Request body is not valid UTF-8')
+        self._parse(self.pending + text)
+
+    def _parse(self, text):
+        i, n = 0, len(text)
+        self.pending = ''
+        while i < n:
+            state = self.state
+
+            if state == 'string':
+                i = self._parse_string(text, i)
+                if i < 0:
+                    return
+                continue
+
+            if state == 'literal':
+                start = i
+                while i < n and text[i] not in ',}' and text[i] not in _WHITESPACE:
+                    i += 1
+                self.literal += text[start:i]
+                if len(self.literal) > 64:
+                    raise RequestBodyError('Invalid JSON value')
+                if i == n:
+                    return
+                try:
+                    self.fields[self.key] = json.loads(self.literal)
+                except ValueError:
+                    raise RequestBodyError('Invalid JSON value')
+                self.state = 'after_value'
+                continue
+
+            char = text[i]
+            i += 1
+            if char in _WHITESPACE:
+                continue
+
+            if state == 'start':
+                if char != '{':
+                    raise RequestBodyError('Expected a JSON object')
+                self.state = 'key_or_end'
+            elif state in ('key_or_end', 'key'):
+                if char == '}' and state == 'key_or_end':
+                    self.state = 'done'
+                elif char == '"':
+                    self._begin_string([])
+                    self.after_string = 'colon'
+                else:
+                    raise RequestBodyError('Expected a JSON string key')
+            elif state == 'colon':
+                if char != ':':
+                    raise RequestBodyError("Expected ':' in JSON object")
+                self.state = 'value'
+            elif state == 'value':
+                if char == '"':
+                    if self.key == self.stream_field:
+                        self.discard()
+                        self.spool = _SpoolFile(self.temp_dir)
+                        self._begin_string(self.spool)
+                    else:
+                        self._begin_string([])
+                    self.after_string = 'after_value'
+                elif char in '-0123456789tfn':
+                    self.literal = char
+                    self.state = 'literal'
+                else:
+                    raise RequestBodyError('Nested JSON values are not supported')
+            elif state == 'after_value':
+                if char == ',':
+                    self.state = 'key'
+                elif char == '}':
+                    self.state = 'done'
+                else:
+                    raise RequestBodyError("Expected ',' or '}' in JSON object")
+            elif state == 'done':
+                raise RequestBodyError('Extra data after JSON object')
+
+    def _begin_string(self, sink):
+        self.sink = sink
+        self.sink_chars = 0
+        self.high_surrogate = None
+        self.state = 'string'
+
+    def _emit(self, chunk):
+        if not chunk:
+            return
+        if self.high_surrogate is not None:
+            # A lone high surrogate escape
+            self.high_surrogate = None
+            self._emit('\ufffd')
+        if isinstance(self.sink, list):
+            self.sink_chars += len(chunk)
+            if self.sink_chars > MAX_FIELD_CHARS:
+                raise RequestBodyError('JSON field too long')
+            self.sink.append(chunk)
+        else:
+            self.sink.write(chunk.encode('utf-8'))
+
+    def _parse_string(self, text, i):
+        """Consume string characters from text[i:]; returns the next index, or -1 at end of input."""
+        n = len(text)
+        while i < n:
+            quote = text.find('"', i)
+            backslash = text.find('\\', i, quote if quote >= 0 else n)
+            if backslash >= 0:
+                self._emit(text[i:backslash])
+                if backslash + 1 >= n:
+                    self.pending = text[backslash:]
+                    return -1
+                escape = text[backslash + 1]
+                if escape == 'u':
+                    if backslash + 6 > n:
+                        self.pending = text[backslash:]
+                        return -1
+                    try:
+                        code = int(text[backslash + 2:backslash + 6], 16)
+                    except ValueError:
+                        raise RequestBodyError('Invalid JSON escape')
+                    self._emit_code_unit(code)
+                    i = backslash + 6
+                elif escape in _JSON_ESCAPES:
+                    self._emit(_JSON_ESCAPES[escape])
+                    i = backslash + 2
+                else:
+                    raise RequestBodyError('Invalid JSON escape')
+                continue
+            if quote < 0:
+                self._emit(text[i:])
+                return -1
+            self._emit(text[i:quote])
+            self._end_string()
+            return quote + 1
+        return -1 if self.state == 'string' else i
+
+    def _emit_code_unit(self, code):
+        if 0xD800 <= code <= 0xDBFF:
+            if self.high_surrogate is not None:
+                self._emit('\ufffd')
+            self.high_surrogate = code
+        elif 0xDC00 <= code <= 0xDFFF:
+            if self.high_surrogate is None:
+                self._emit('\ufffd')
+            else:
+                high, self.high_surrogate = self.high_surrogate, None
+                self._emit(chr(0x10000 + ((high - 0xD800) << 10) + (code - 0xDC00)))
+        else:
+            self._emit(chr(code))
+
+    def _end_string(self):
+        if self.high_surrogate is not None:
+            self.high_surrogate = None
+            self._emit('\ufffd')
+        if isinstance(self.sink, list):
+            value = ''.join(self.sink)
+            if self.after_string == 'colon':
+                self.key = value
+            else:
+                self.fields[self.key] = value
+        else:
+            self.sink.close()
+        self.sink = None
+        self.state = self.after_string
+
+    def close(self):
+        try:
+            self._parse(self.pending + self.decoder.decode(b'', final=True))
+        except UnicodeDecodeError:
+            self.discard()
+            raise RequestBodyError('Request body is not valid UTF-8')
+        except RequestBodyError:
+            self.discard()
+            raise
+        if self.state != 'done':
+            self.discard()
+            raise RequestBodyError('Incomplete JSON body')
+        return self.fields, self.spool.path if self.spool is not None else None
+
+
+def error_status(error):
+    """HTTP status for an error while receiving a body: the RequestBodyError's own
+    (413 for RequestBodyTooLarge), 408 for a timeout, otherwise 400.
+
+    asyncio.TimeoutError and socket.timeout are only aliases of TimeoutError
+    from Python 3.11 and 3.10, so they are checked as well.
+    """
+    if isinstance(error, RequestBodyError):
+        return error.status
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, socket.timeout)):
+        return 408
+    return 400
+
+
+def receive_body(rfile, content_length, parser):
+    """Read content_length bytes from rfile in chunks into parser; returns parser.close().
+
+    Raises RequestBodyError (the temporary file is removed); the body may
+    then be only partly read, so the connection should not be reused.
+    """
+    if parser.max_bytes is not None and content_length > parser.max_bytes:
+        parser.discard()
+        raise RequestBodyTooLarge(parser.max_bytes)
+    try:
+        remaining = content_length
+        while remaining > 0:
+            chunk = rfile.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                raise RequestBodyError('Incomplete request body')
+            remaining -= len(chunk)
+            parser.feed(chunk)
+        return parser.close()
+    except BaseException:
+        parser.discard()
+        raise
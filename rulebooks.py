@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Local rulebook text cache for the AI agent's fetch_rulebook tool.
+
+Rulebook PDFs are placed in rulebooks/ named after their key
+(rules/base -> rulebooks/base.pdf, rules/faq -> rulebooks/faq.pdf, ...).
+Each PDF's text is extracted once per page and stored in
+rulebooks/.cache/<name>.json; the cache is reused until the PDF changes,
+so later requests only read the stored pages.
+
+Text extraction needs pypdf (pip install pypdf); already extracted caches
+are served without it.
+
+Usage: python3 rulebooks.py [--list] [key [pages]]
+"""
+import argparse
+import json
+import os
+import re
+import threading
+from pathlib import Path
+
+try:
+    import pypdf
+except ImportError:
+    pypdf = None
+
+RULEBOOKS_DIR = Path(__file__).parent / "rulebooks"
+CACHE_DIRNAME = ".cache"
+CACHE_FORMAT = 1
+
+_NAME_RE = re.compile(r'^[a-z0-9][a-z0-9_-]*$')
+
+
+class RulebookError(Exception):
+    """Unknown rulebook, bad page range or failed extraction."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def rulebook_name(key):
+    """File name stem for a rulebook key ('rules/base' -> 'base'), or None if invalid."""
+    name = (key or '').strip().lower()
+    if name.startswith('rules/'):
+        name = name[len('rules/'):]
+    return name if _NAME_RE.match(name) else None
+
+
+def parse_page_range(spec, page_count):
+    """Parse '3', '2-5', '4-' or '' into a 1-based inclusive (first, last) range."""
+    if not spec:
+        return 1, page_count
+    match = re.match(r'^\s*(\d+)\s*(?:-\s*(\d*)\s*)?$', spec)
+    if not match:
+        raise RulebookError(f"Invalid page range: {spec}")
+    first = int(match.group(1))
+    if match.group(2) is None and '-' not in spec:
+        last = first
+    else:
+        last = int(match.group(2)) if match.group(2) else page_count
+    if first < 1 or first > last or first > page_count:
+        raise RulebookError(f"Page range {spec} is outside 1-{page_count}")
+    return first, min(last, page_count)
+
+
+def format_pages(pages, first=1):
+    """Join page texts with [Page N] markers so answers can cite page numbers."""
+    return '\n\n'.join(f"[Page {number}]\n{text.strip()}"
+                       for number, text in enumerate(pages, start=first))
+
+
+class RulebookLibrary:
+    """Rulebook PDFs in a directory with their extracted text cached on disk and in memory."""
+
+    def __init__(self, directory=RULEBOOKS_DIR):
+        self.directory = Path(directory)
+        self.cache_dir = self.directory / CACHE_DIRNAME
+        self._pages = {}    # name -> (source signature, [page text])
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def keys(self):
+        """Keys of the available rulebooks (PDFs or extracted caches)."""
+        names = set()
+        if self.directory.is_dir():
+            names.update(p.stem for p in self.directory.glob('*.pdf'))
+        if self.cache_dir.is_dir():
+            names.update(p.stem for p in self.cache_dir.glob('*.json'))
+        return sorted(f"rules/{name}" for name in names if _NAME_RE.match(name))
+
+    def pages(self, key):
+        """Text of every page of a rulebook (extracted on first use)."""
+        name = rulebook_name(key)
+        if name is None:
+            raise RulebookError(f"Invalid rulebook key: {key}")
+
+        pdf_path = self.directory / f"{name}.pdf"
+        signature = self._signature(pdf_path)
+        with self._lock:
+            cached = self._pages.get(name)
+            if cached and cached[0] == signature:
+                return cached[1]
+            lock = self._locks.setdefault(name, threading.Lock())
+
+        # One extraction per rulebook at a time; other callers wait for it
+        with lock:
+            with self._lock:
+                cached = self._pages.get(name)
+            if cached and cached[0] == signature:
+                return cached[1]
+
+            pages = self._load_cache(name, signature)
+            if pages is None:
+                if signature is None:
+                    raise RulebookError(f"Rulebook not found: {key}", status=404)
+                pages = self._extract(pdf_path)
+                self._save_cache(name, signature, pages)
+
+            with self._lock:
+                self._pages[name] = (signature, pages)
+            return pages
+
+    def text(self, key, page_spec=None):
+        """Formatted text of a rulebook page range (all pages by default)."""
+        pages = self.pages(key)
+        if not pages:
+            return ''
+        first, last = parse_page_range(page_spec, len(pages))
+        return format_pages(pages[first - 1:last], first)
+
+    @staticmethod
+    def _signature(pdf_path):
+        try:
+            stat = os.stat(pdf_path)
+        except OSError:
+            return None
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def _cache_path(self, name):
+        return self.cache_dir / f"{name}.json"
+
+    def _load_cache(self, name, signature):
+        """Cached pages if they were extracted from the current PDF (or the PDF is gone)."""
+        try:
+            with open(self._cache_path(name), 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if cache.get('format') != CACHE_FORMAT:
+            return None
+        if signature is not None and cache.get('source') != signature:
+            return None
+        return cache.get('pages') or []
+
+    def _save_cache(self, name, signature, pages):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._cache_path(name)
+        tmp_path = path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'format': CACHE_FORMAT, 'source': signature, 'pages': pages},
+                      f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _extract(pdf_path):
+        if pypdf is None:
+            raise RulebookError("PDF text extraction needs pypdf (pip install pypdf)", status=501)
+        print(f"📖 Extracting text from {pdf_path.name}...")
+        try:
+            reader = pypdf.PdfReader(str(pdf_path))
+            pages = [page.extract_text() or '' for page in reader.pages]
+        except Exception as e:
+            raise RulebookError(f"Could not read {pdf_path.name}: {e}", status=500)
+        print(f"✅ Extracted {len(pages)} pages from {pdf_path.name}")
+        return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Extract and print cached rulebook text')
+    parser.add_argument('key', nargs='?', help='rulebook key, e.g. rules/base')
+    parser.add_argument('pages', nargs='?', help="page range, e.g. '3' or '2-5'")
+    parser.add_argument('--list', action='store_true', help='list available rulebooks')
+    args = parser.parse_args()
+
+    library = RulebookLibrary()
+    if args.list or not args.key:
+        for key in library.keys():
+            print(key)
+        return
+    print(library.text(args.key, args.pages))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Search/fetch proxy used by the AI agent (/api/search in server_dual.py).
+
+- Keep-alive connections to SearXNG and fetched sites are pooled per host
+- Results are kept in a TTL + LRU cache keyed by query or URL
+- Concurrent identical requests are coalesced into one upstream request
+- Pages are converted to text incrementally while they are read, and reading
+  stops once the text budget (MAX_TEXT_CHARS) is filled
+"""
+import codecs
+import http.client
+import json
+import ssl
+import threading
+import time
+from collections import OrderedDict
+from html.parser import HTMLParser
+from urllib.parse import quote, urljoin, urlsplit
+
+DEFAULT_SEARXNG_INSTANCE = 'https://searx.be'
+DEFAULT_TIMEOUT = 10
+# Cached results: how long and how many
+DEFAULT_CACHE_TTL = 15 * 60
+DEFAULT_CACHE_ENTRIES = 256
+# Idle keep-alive connections kept per host
+MAX_IDLE_PER_HOST = 4
+MAX_REDIRECTS = 5
+READ_CHUNK_SIZE = 16 * 1024
+# Most bytes of a fetched page read, even if the text budget is not filled
+MAX_PAGE_BYTES = 2 * 1024 * 1024
+MAX_TEXT_CHARS = 8000
+SEARCH_RESULTS = 6
+
+SEARCH_USER_AGENT = 'DuneBlend/1.0'
+FETCH_USER_AGENT = 'Mozilla/5.0 (compatible; DuneBlend/1.0)'
+
+
+class ProxyError(Exception):
+    """Upstream request failed (connection error or HTTP error status)."""
+
+
+class ConnectionPool:
+    """Thread-safe pool of idle keep-alive HTTP(S) connections, per host."""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, max_idle_per_host=MAX_IDLE_PER_HOST,
+                 ssl_context=None):
+        self.timeout = timeout
+        self.max_idle_per_host = max_idle_per_host
+        self.ssl_context = ssl_context or ssl.create_default_context()
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, scheme, host, port):
+        """An idle connection to (scheme, host, port), or a new one."""
+        key = (scheme, host, port)
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+        return self.connect(scheme, host, port), False
+
+    def connect(self, scheme, host, port):
+        """A new (not yet connected) connection to (scheme, host, port)."""
+        if scheme == 'https':
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout,
+                                               context=self.ssl_context)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def release(self, scheme, host, port, conn):
+        """Return a connection whose response was fully read."""
+        key = (scheme, host, port)
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after ttl seconds."""
+
+    def __init__(self, max_entries=DEFAULT_CACHE_ENTRIES, ttl=DEFAULT_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class _Call:
+    """One in-flight upstream request that concurrent callers wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class RequestCoalescer:
+    """Run a function once per key at a time; concurrent callers share the result."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class TextExtractor(HTMLParser):
+    """Incremental HTML-to-text: visible text with whitespace collapsed, up to a budget.
+
+    Feed decoded chunks with feed(); script/style content is skipped, tags
+    separate words, and character references are decoded. Once `limit`
+    characters have been produced `full` is set and further input is ignored,
+    so the caller can stop reading.
+    """
+
+    SKIP_TAGS = ('script', 'style')
+
+    def __init__(self, limit=MAX_TEXT_CHARS):
+        super().__init__(convert_charrefs=True)
+        self.limit = limit
+        self.parts = []
+        self.length = 0
+        self.full = False
+        self._skip = None
+        self._space = False
+
+    def feed(self, data):
+        if not self.full:
+            super().feed(data)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip = tag
+        self._space = True
+
+    def handle_endtag(self, tag):
+        if tag == self._skip:
+            self._skip = None
+        self._space = True
+
+    def handle_data(self, data):
+        if self._skip or self.full:
+            return
+        words = data.split()
+        if not words:
+            self._space = self._space or bool(data)
+            return
+        if data[0].isspace():
+            self._space = True
+        for index, word in enumerate(words):
+            if (index or self._space) and self.length:
+                self._emit(' ')
+            self._emit(word)
+            if self.full:
+                return
+        self._space = data[-1].isspace()
+
+    def _emit(self, text):
+        room = self.limit - self.length
+        if len(text) >= room:
+            text = text[:room]
+            self.full = True
+        self.parts.append(text)
+        self.length += len(text)
+
+    def text(self):
+        return ''.join(self.parts).rstrip()
+
+
+def html_to_text(html, limit=MAX_TEXT_CHARS):
+    """Visible text of an HTML string (scripts, styles and tags removed), whitespace collapsed."""
+    extractor = TextExtractor(limit)
+    extractor.feed(html)
+    extractor.close()
+    return extractor.text()
+
+
+def response_charset(response, default='utf-8'):
+    """Charset from a response's Content-Type (falls back to UTF-8)."""
+    charset = response.msg.get_content_charset() or default
+    try:
+        codecs.lookup(charset)
+    except LookupError:
+        charset = default
+    return charset
+
+
+class SearchProxy:
+    """Pooled, cached and coalesced web search (SearXNG) and page fetching."""
+
+    def __init__(self, searxng_instance=DEFAULT_SEARXNG_INSTANCE, timeout=DEFAULT_TIMEOUT,
+                 cache_ttl=DEFAULT_CACHE_TTL, cache_entries=DEFAULT_CACHE_ENTRIES,
+                 max_page_bytes=MAX_PAGE_BYTES, ssl_context=None):
+        self.searxng_instance = searxng_instance.rstrip('/')
+        self.max_page_bytes = max_page_bytes
+        self.pool = ConnectionPool(timeout=timeout, ssl_context=ssl_context)
+        self.cache = TTLCache(max_entries=cache_entries, ttl=cache_ttl)
+        self.coalescer = RequestCoalescer()
+
+    # Public API
+
+    def search(self, query):
+        """Search the web via SearXNG; returns {'results': [...]}."""
+        return self._cached(('search', query), lambda: self._search(query))
+
+    def fetch_text(self, url):
+        """Fetch a page and return its visible text (first MAX_TEXT_CHARS characters)."""
+        return self._cached(('fetch', url), lambda: self._fetch_text(url))
+
+    def close(self):
+        self.pool.close()
+
+    def _cached(self, key, func):
+        value = self.cache.get(key)
+        if value is not None:
+            return value
+
+        def load():
+            # Another caller may have filled the cache while we waited
+            value = self.cache.get(key)
+            if value is None:
+                value = func()
+                self.cache.set(key, value)
+            return value
+
+        return self.coalescer.do(key, load)
+
+    # Upstream requests
+
+    def _search(self, query):
+        url = f"{self.searxng_instance}/search?q={quote(query)}&format=json&language=en"
+        status, response, release = self._open(url, SEARCH_USER_AGENT)
+        try:
+            data = json.loads(self._read(response).decode(response_charset(response)))
+            release()
+        finally:
+            release(reuse=False)
+        results = [
+            {'title': x.get('title', ''), 'url': x.get('url', ''), 'snippet': x.get('content', '')}
+            for x in (data.get('results') or [])[:SEARCH_RESULTS]
+        ]
+        return {'results': results}
+
+    def _fetch_text(self, url):
+        """Stream a page through TextExtractor, reading only until its budget is filled."""
+        status, response, release = self._open(url, FETCH_USER_AGENT)
+        extractor = TextExtractor(MAX_TEXT_CHARS)
+        try:
+            decoder = codecs.getincrementaldecoder(response_charset(response))(errors='replace')
+            received = 0
+            while received < self.max_page_bytes and not extractor.full:
+                chunk = response.read(min(READ_CHUNK_SIZE, self.max_page_bytes - received))
+                if not chunk:
+                    # Read to the end: the connection can be reused
+                    release()
+                    extractor.feed(decoder.decode(b'', final=True))
+                    break
+                received += len(chunk)
+                extractor.feed(decoder.decode(chunk))
+        finally:
+            # Stopped early (budget filled or page too large): drop the connection
+            release(reuse=False)
+        extractor.close()
+        return extractor.text()
+
+    def _read(self, response):
+        """Whole body of a (small) response."""
+        chunks = []
+        while True:
+            chunk = response.read(READ_CHUNK_SIZE)
+            if not chunk:
+                return b''.join(chunks)
+            chunks.append(chunk)
+
+    def _releaser(self, conn, response, key):
+        released = []
+
+        def release(reuse=True):
+            if released:
+                return
+            released.append(True)
+            if reuse and response.isclosed() and not response.will_close:
+                self.pool.release(*key, conn)
+            else:
+                response.close()
+                conn.close()
+
+        return release
+
+    def _open(self, url, user_agent):
+        """GET url (following redirects) on a pooled connection.
+
+        Returns (status, response, release). Call release() after reading the
+        body to the end to return the connection to the pool, or
+        release(reuse=False) to close it; only the first call has an effect.
+        """
+        for _ in range(MAX_REDIRECTS + 1):
+            parts = urlsplit(url)
+            if parts.scheme not in ('http', 'https') or not parts.hostname:
+                raise ProxyError(f"Unsupported URL: {url}")
+            scheme, host = parts.scheme, parts.hostname
+            port = parts.port or (443 if scheme == 'https' else 80)
+            target = parts.path or '/'
+            if parts.query:
+                target += '?' + parts.query
+            headers = {'User-Agent': user_agent, 'Host': parts.netloc.rpartition('@')[2],
+                       'Connection': 'keep-alive'}
+
+            conn, reused = self.pool.acquire(scheme, host, port)
+            try:
+                conn.request('GET', target, headers=headers)
+                response = conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionError, http.client.BadStatusLine):
+                conn.close()
+                if not reused:
+                    raise
+                # Stale pooled connection: retry once on a fresh one
+                conn = self.pool.connect(scheme, host, port)
+                try:
+                    conn.request('GET', target, headers=headers)
+                    response = conn.getresponse()
+                except Exception:
+                    conn.close()
+                    raise
+            except Exception:
+                conn.close()
+                raise
+
+            release = self._releaser(conn, response, (scheme, host, port))
+
+            if response.status in (301, 302, 303, 307, 308) and response.getheader('Location'):
+                release(reuse=False)
+                url = urljoin(url, response.getheader('Location'))
+                continue
+            if response.status >= 400:
+                release(reuse=False)
+                raise ProxyError(f"HTTP Error {response.status}: {response.reason}")
+            return response.status, response, release
+
+        raise ProxyError(f"Too many redirects: {url}")
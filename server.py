@@ -5,37 +5,29 @@ Provides endpoints to save/load blend files to/from server.
 
 For GitHub Pages deployment, these features are disabled client-side.
 """
+import argparse
 import http.server
-import socketserver
 import json
 import os
 from pathlib import Path
 from urllib.parse import parse_qs, urlparse
-from email import message_from_bytes
-from io import BytesIO
+
+from blend_store import BlendStore
+from request_body import DEFAULT_MAX_BODY_BYTES, JSONFieldParser, error_status, receive_body
+from server_common import (DEFAULT_REQUEST_TIMEOUT, DEFAULT_WORKERS, REVALIDATE_CACHE_CONTROL,
+                           KeepAliveMixin, PooledHTTPServer, PrecompressedFileMixin,
+                           add_server_arguments, bytes_etag, is_not_modified)
 
 PORT = 5000
 BLENDS_DIR = Path(__file__).parent / "blends"
 
-
-class ReuseAddrTCPServer(socketserver.TCPServer):
-    """TCP Server with SO_REUSEADDR enabled."""
-    allow_reuse_address = True
+# Cached blend listing and contents
+BLEND_STORE = BlendStore(BLENDS_DIR)
 
 
-class BlendServerHandler(http.server.SimpleHTTPRequestHandler):
+class BlendServerHandler(KeepAliveMixin, PrecompressedFileMixin, http.server.SimpleHTTPRequestHandler):
     """HTTP handler with blend file upload/download support."""
 
-    def end_headers(self):
-        """Override to add cache control headers to all responses."""
-        # Add cache control headers for blend files and static content
-        parsed = urlparse(self.path)
-        if parsed.path.startswith('/blends/') or parsed.path.endswith('.md') or parsed.path.endswith('.json'):
-            self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
-            self.send_header('Pragma', 'no-cache')
-            self.send_header('Expires', '0')
-        super().end_headers()
-
     def do_GET(self):
         """Handle GET requests - serve files and list blends."""
         try:
@@ -88,20 +80,14 @@ class BlendServerHandler(http.server.SimpleHTTPRequestHandler):
             self.delete_blend()
             return
 
+        # Request body was not read; don't reuse the connection
+        self.close_connection = True
         self.send_error(404, "Endpoint not found")
 
     def list_blends(self):
         """List all blend files."""
         try:
-            blends = []
-            for filepath in sorted(BLENDS_DIR.glob('*.md')):
-                stat = filepath.stat()
-                blends.append({
-                    'filename': filepath.name,
-                    'size': stat.st_size,
-                    'modified': stat.st_mtime
-                })
-            return {'success': True, 'blends': blends}
+            return {'success': True, 'blends': BLEND_STORE.listing('filename')}
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
@@ -112,24 +98,29 @@ class BlendServerHandler(http.server.SimpleHTTPRequestHandler):
             self.send_error(403, "Invalid filename")
             return
 
-        filepath = BLENDS_DIR / filename
-
-        if not filepath.exists():
-            self.send_error(404, "Blend not found")
-            return
-
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
+            content = BLEND_STORE.read(filename)
+            if content is None:
+                self.send_error(404, "Blend not found")
+                return
+            body = content.encode('utf-8')
+            etag = bytes_etag(body)
+
+            if is_not_modified(self.headers, etag):
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Cache-Control', REVALIDATE_CACHE_CONTROL)
+                self.end_headers()
+                return
 
             self.send_response(200)
             self.send_header('Content-Type', 'text/markdown')
+            self.send_header('Content-Length', str(len(body)))
             self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
-            self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
-            self.send_header('Pragma', 'no-cache')
-            self.send_header('Expires', '0')
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', REVALIDATE_CACHE_CONTROL)
             self.end_headers()
-            self.wfile.write(content.encode('utf-8'))
+            self.wfile.write(body)
         except Exception as e:
             self.send_error(500, f"Error reading file: {str(e)}")
 
@@ -145,13 +136,19 @@ class BlendServerHandler(http.server.SimpleHTTPRequestHandler):
                 content_length = int(self.headers.get('Content-Length', 0))
                 print(f"   Content-Length: {content_length} bytes")
 
-                body = self.rfile.read(content_length).decode('utf-8')
-                data = json.loads(body)
+                # Stream the body; the content goes straight to a temp file
+                try:
+                    parser = JSONFieldParser(BLENDS_DIR, stream_field='content',
+                                             max_bytes=self.server.max_body_bytes)
+                    data, content_path = receive_body(self.rfile, content_length, parser)
+                except Exception as e:
+                    # The body may be partly unread; don't reuse the connection
+                    self.close_connection = True
+                    self.send_json_response({'success': False, 'error': str(e)}, error_status(e))
+                    return
 
-                filename = data.get('filename', 'blend.md')
-                content = data.get('content', '')
+                filename = str(data.get('filename', 'blend.md'))
                 print(f"   Filename: {filename}")
-                print(f"   Content preview: {content[:100]}...")
 
                 # Security: sanitize filename
                 filename = os.path.basename(filename)
@@ -160,17 +157,19 @@ class BlendServerHandler(http.server.SimpleHTTPRequestHandler):
 
                 # Security: prevent directory traversal
                 if '..' in filename or '/' in filename:
+                    if content_path:
+                        os.unlink(content_path)
                     self.send_json_response({'success': False, 'error': 'Invalid filename'})
                     return
 
                 # Save file
                 filepath = BLENDS_DIR / filename
                 print(f"📝 Saving blend to: {filepath}")
-                print(f"   Content length: {len(content)} bytes")
 
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                    f.flush()  # Ensure data is written
+                if content_path is None:
+                    BLEND_STORE.write(filename, '')
+                else:
+                    BLEND_STORE.commit(filename, content_path)
 
                 # Verify file was written
                 if filepath.exists():
@@ -186,6 +185,8 @@ class BlendServerHandler(http.server.SimpleHTTPRequestHandler):
                     'message': f'Blend saved to server: {filename}'
                 })
             else:
+                # Request body was not read; don't reuse the connection
+                self.close_connection = True
                 self.send_json_response({
                     'success': False,
                     'error': 'Only application/json content type is supported'
@@ -208,9 +209,7 @@ class BlendServerHandler(http.server.SimpleHTTPRequestHandler):
                 self.send_json_response({'success': False, 'error': 'Invalid filename'})
                 return
 
-            filepath = BLENDS_DIR / filename
-
-            if not filepath.exists():
+            if not BLEND_STORE.exists(filename):
                 self.send_json_response({'success': False, 'error': 'File not found'})
                 return
 
@@ -219,7 +218,7 @@ class BlendServerHandler(http.server.SimpleHTTPRequestHandler):
                 self.send_json_response({'success': False, 'error': 'Cannot delete base blends'})
                 return
 
-            filepath.unlink()
+            BLEND_STORE.delete(filename)
 
 
             self.send_json_response({
@@ -231,18 +230,19 @@ class BlendServerHandler(http.server.SimpleHTTPRequestHandler):
             self.send_json_response({'success': False, 'error': str(e)})
 
 
-    def send_json_response(self, data):
+    def send_json_response(self, data, status=200):
         """Send JSON response."""
         try:
-            self.send_response(200)
+            json_data = json.dumps(data).encode('utf-8')
+            self.send_response(status)
             self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(json_data)))
             self.send_header('Access-Control-Allow-Origin', '*')
             self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
             self.send_header('Pragma', 'no-cache')
             self.send_header('Expires', '0')
             self.end_headers()
-            json_data = json.dumps(data)
-            self.wfile.write(json_data.encode('utf-8'))
+            self.wfile.write(json_data)
         except Exception as e:
             print(f"Error in send_json_response: {e}")
             import traceback
@@ -254,21 +254,25 @@ class BlendServerHandler(http.server.SimpleHTTPRequestHandler):
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Content-Length', '0')
         self.end_headers()
 
 
-def run_server():
+def run_server(port=PORT, workers=DEFAULT_WORKERS, timeout=DEFAULT_REQUEST_TIMEOUT,
+               max_body_bytes=DEFAULT_MAX_BODY_BYTES):
     """Start the development server."""
     # Ensure blends directory exists
     BLENDS_DIR.mkdir(exist_ok=True)
 
-    with ReuseAddrTCPServer(("", PORT), BlendServerHandler) as httpd:
+    with PooledHTTPServer(("", port), BlendServerHandler, workers=workers,
+                          request_timeout=timeout, max_body_bytes=max_body_bytes) as httpd:
         print(f"""
 ╔══════════════════════════════════════════════════════════╗
 ║  Dune Imperium Blend Builder - Development Server       ║
 ╚══════════════════════════════════════════════════════════╝
 
-🌐 Server running at: http://localhost:{PORT}
+🌐 Server running at: http://localhost:{port}
+   ({httpd.workers} worker threads, {httpd.request_timeout:g}s request timeout)
 
 ✅ Features enabled:
    • Static file serving
@@ -291,5 +295,9 @@ Press Ctrl+C to stop the server
 
 
 if __name__ == '__main__':
-    run_server()
+    parser = argparse.ArgumentParser(description='Blend Builder development server')
+    parser.add_argument('--port', type=int, default=PORT)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+    run_server(args.port, args.workers, args.timeout, args.max_body)
 
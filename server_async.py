@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+"""
+asyncio serving engine for the dual HTTP/HTTPS server.
+
+Every connection is a coroutine on a single event loop, so hundreds of idle
+keep-alive connections cost a few KB each instead of a worker thread. Blocking
+work (file reads, blend writes, outbound search requests) runs on a small
+thread pool via run_in_executor. Routes and responses match server_dual.py's
+BlendServerHandler.
+
+Usage: python3 server_dual.py --engine asyncio
+"""
+import asyncio
+import email.utils
+import json
+import mimetypes
+import os
+import posixpath
+import ssl
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlparse
+
+import server_dual
+from blend_similarity import BlendSimilarityError
+from blend_stats import BlendStatsError
+from card_search import CardSearchError, search_cards
+from request_body import (CHUNK_SIZE, DEFAULT_MAX_BODY_BYTES, RequestBodyError,
+                          RequestBodyTooLarge, error_status)
+from rulebooks import RulebookError
+from server_common import (CLIENT_DISCONNECT_ERRORS, DEFAULT_REQUEST_TIMEOUT, DEFAULT_WORKERS,
+                           NO_STORE_HEADERS, REVALIDATE_CACHE_CONTROL, bytes_etag,
+                           cache_control_for, file_etag, find_precompressed, is_not_modified)
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Largest request line plus headers accepted before answering 431
+MAX_HEADER_BYTES = 64 * 1024
+# Static files are streamed in chunks of this size
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class HTTPError(Exception):
+    """Abort the current request with an error response."""
+
+    def __init__(self, status, message=None, close=False):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.close = close
+
+
+class Request:
+    """A parsed HTTP/1.x request line and headers.
+
+    The body is left in the stream; handlers that need it read it with
+    AsyncBlendServer.receive_body, and a connection whose body was not fully
+    read is closed after the response.
+    """
+
+    def __init__(self, method, target, version, headers, reader, content_length=0):
+        self.method = method
+        self.target = target
+        self.version = version
+        self.headers = headers
+        self.reader = reader
+        self.body_remaining = content_length
+        self.url = urlparse(target)
+
+    @property
+    def validators(self):
+        """Conditional request headers, keyed as server_common.is_not_modified expects."""
+        return {'If-None-Match': self.headers.get('if-none-match'),
+                'If-Modified-Since': self.headers.get('if-modified-since')}
+
+    @property
+    def keep_alive(self):
+        connection = self.headers.get('connection', '').lower()
+        if self.version == 'HTTP/1.1':
+            return 'close' not in connection
+        return 'keep-alive' in connection
+
+
+class Response:
+    """Status, headers and a bytes body or an open file to stream."""
+
+    def __init__(self, status=200, headers=None, body=b'', file=None, length=None):
+        self.status = HTTPStatus(status)
+        self.headers = list(headers or [])
+        self.body = body
+        self.file = file
+        self.length = len(body) if file is None else length
+
+
+def json_response(data, status=200):
+    body = json.dumps(data).encode()
+    return Response(status, [('Content-type', 'application/json'),
+                             ('Access-Control-Allow-Origin', '*')], body)
+
+
+def text_response(text, status=200):
+    return Response(status, [('Content-Type', 'text/plain; charset=utf-8'),
+                             ('Access-Control-Allow-Origin', '*')], text.encode('utf-8'))
+
+
+def conditional_response(request, response):
+    """Add an ETag to an in-memory response; 304 if the client already has it."""
+    etag = bytes_etag(response.body)
+    validators = [('ETag', etag), ('Cache-Control', REVALIDATE_CACHE_CONTROL)]
+    if is_not_modified(request.validators, etag):
+        return Response(304, validators)
+    response.headers += validators
+    return response
+
+
+def error_response(status, message=None):
+    status = HTTPStatus(status)
+    body = (f"<html><head><title>Error {status.value}</title></head>"
+            f"<body><h1>Error {status.value}</h1><p>{message or status.phrase}</p></body></html>"
+            ).encode('utf-8')
+    return Response(status, [('Content-Type', 'text/html;charset=utf-8')], body)
+
+
+class AsyncBlendServer:
+    """Serves the blend builder on one asyncio event loop."""
+
+    def __init__(self, directory=ROOT_DIR, workers=DEFAULT_WORKERS,
+                 request_timeout=DEFAULT_REQUEST_TIMEOUT, max_body_bytes=DEFAULT_MAX_BODY_BYTES):
+        self.directory = directory
+        self.request_timeout = request_timeout
+        self.max_body_bytes = max_body_bytes
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='blend-io')
+        self.servers = []
+
+    async def run_blocking(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    # Connections
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self.read_request(reader),
+                                                     self.request_timeout)
+                except HTTPError as e:
+                    await self.write_response(writer, error_response(e.status, e.message),
+                                              keep_alive=False)
+                    break
+                if request is None:
+                    break
+
+                keep_alive = request.keep_alive
+                try:
+                    response = await self.dispatch(request)
+                except HTTPError as e:
+                    response = error_response(e.status, e.message)
+                    keep_alive = keep_alive and not e.close
+                except Exception as e:
+                    print(f"Error in {request.method}: {e}")
+                    response = error_response(500, f"Internal server error: {str(e)}")
+
+                # An unread request body would be parsed as the next request
+                keep_alive = keep_alive and request.body_remaining == 0
+                await self.write_response(writer, response, keep_alive,
+                                          head_only=request.method == 'HEAD')
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+            pass
+        except CLIENT_DISCONNECT_ERRORS:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (OSError, ssl.SSLError):
+                pass
+
+    async def read_request(self, reader):
+        """Read one request; None when the client closed an idle connection."""
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except asyncio.IncompleteReadError as e:
+            if not e.partial.strip():
+                return None
+            raise
+        except asyncio.LimitOverrunError:
+            raise HTTPError(431, "Request header fields too large")
+
+        lines = head.decode('iso-8859-1').split('\r\n')
+        request_line = lines[0]
+        while not request_line and len(lines) > 1:
+            # Tolerate stray CRLFs between pipelined requests
+            lines.pop(0)
+            request_line = lines[0]
+        parts = request_line.split()
+        if len(parts) != 3 or not parts[2].startswith('HTTP/'):
+            raise HTTPError(400, f"Bad request syntax ({request_line!r})")
+        method, target, version = parts
+
+        headers = {}
+        for line in lines[1:]:
+            if not line:
+                continue
+            name, sep, value = line.partition(':')
+            if not sep:
+                raise HTTPError(400, "Bad header line")
+            headers[name.strip().lower()] = value.strip()
+
+        if 'transfer-encoding' in headers:
+            raise HTTPError(501, "Chunked request bodies are not supported")
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HTTPError(400, "Bad Content-Length")
+        if length < 0:
+            raise HTTPError(400, "Bad Content-Length")
+        return Request(method, target, version, headers, reader, length)
+
+    async def receive_body(self, request, parser):
+        """Stream the request body into a request_body parser; returns parser.close()."""
+        if parser.max_bytes is not None and request.body_remaining > parser.max_bytes:
+            parser.discard()
+            raise RequestBodyTooLarge(parser.max_bytes)
+        try:
+            while request.body_remaining > 0:
+                chunk = await asyncio.wait_for(
+                    request.reader.read(min(CHUNK_SIZE, request.body_remaining)),
+                    self.request_timeout)
+                if not chunk:
+                    raise RequestBodyError('Incomplete request body')
+                request.body_remaining -= len(chunk)
+                await self.run_blocking(parser.feed, chunk)
+            return await self.run_blocking(parser.close)
+        except BaseException:
+            parser.discard()
+            raise
+
+    async def write_response(self, writer, response, keep_alive, head_only=False):
+        lines = [f"HTTP/1.1 {response.status.value} {response.status.phrase}",
+                 f"Server: DuneBlend-asyncio Python/{sys.version.split()[0]}",
+                 f"Date: {email.utils.formatdate(usegmt=True)}"]
+        lines += [f"{name}: {value}" for name, value in response.headers]
+        if response.status != HTTPStatus.NOT_MODIFIED:
+            lines.append(f"Content-Length: {response.length}")
+        if not any(name == 'Cache-Control' for name, _ in response.headers):
+            # Static files and cacheable API responses set their own
+            lines += [f"{name}: {value}" for name, value in NO_STORE_HEADERS]
+        if not keep_alive:
+            lines.append("Connection: close")
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1', 'strict'))
+
+        try:
+            if head_only:
+                pass
+            elif response.file is None:
+                writer.write(response.body)
+            else:
+                while True:
+                    chunk = await self.run_blocking(response.file.read, READ_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    writer.write(chunk)
+                    await writer.drain()
+            await writer.drain()
+        finally:
+            if response.file is not None:
+                await self.run_blocking(response.file.close)
+
+    # Routing
+
+    async def dispatch(self, request):
+        if request.method in ('GET', 'HEAD'):
+            return await self.do_GET(request)
+        if request.method == 'POST':
+            return await self.do_POST(request)
+        if request.method == 'OPTIONS':
+            return Response(204, [('Access-Control-Allow-Origin', '*'),
+                                  ('Access-Control-Allow-Methods', 'GET, POST, OPTIONS'),
+                                  ('Access-Control-Allow-Headers', 'Content-Type, Authorization')])
+        raise HTTPError(501, f"Unsupported method ({request.method!r})")
+
+    async def do_GET(self, request):
+        path = request.url.path
+
+        if path == '/api/cards/search':
+            try:
+                return json_response(await self.run_blocking(search_cards, server_dual.CARD_CATALOG,
+                                                             parse_qs(request.url.query)))
+            except CardSearchError as e:
+                return json_response({'error': str(e)}, e.status)
+
+        if path == '/api/search/pdf':
+            return await self.handle_rulebook(request)
+
+        if path == '/api/blend/stats':
+            names = parse_qs(request.url.query).get('name', [])
+            try:
+                return json_response(await self.run_blocking(server_dual.stats_for_blend_files,
+                                                             names))
+            except BlendStatsError as e:
+                return json_response({'error': str(e)}, e.status)
+
+        if path == '/api/search':
+            return await self.handle_search(request)
+
+        if path == '/api/blends/similar':
+            query = parse_qs(request.url.query)
+            try:
+                return json_response(await self.run_blocking(server_dual.find_similar_blends,
+                                                             query.get('name', [''])[0],
+                                                             query.get('limit', [None])[0]))
+            except BlendSimilarityError as e:
+                return json_response({'error': str(e)}, e.status)
+
+        if path == '/api/blends':
+            result = await self.run_blocking(server_dual.list_blend_files)
+            return json_response(result['blends'] if result['success'] else [])
+
+        if path == '/api/server-features':
+            return json_response({
+                'canSaveToServer': True,
+                'canLoadFromServer': True,
+                'serverType': 'local-dual',
+                'canServeRulebooks': True,
+                'canSearchCards': True,
+                'canComputeBlendStats': server_dual.blend_stats_available(),
+                'canFindSimilarBlends': True
+            })
+
+        if path.startswith('/api/blend/load/'):
+            filename = path.split('/api/blend/load/')[1]
+            result = await self.run_blocking(server_dual.read_blend_file, filename)
+            response = json_response(result)
+            if result['success']:
+                return conditional_response(request, response)
+            return response
+
+        return await self.run_blocking(self.static_file, request.target, request)
+
+    async def do_POST(self, request):
+        path = request.url.path
+
+        if path == '/api/blend/save':
+            try:
+                fields, content_path = await self.receive_body(
+                    request, server_dual.save_blend_parser(self.max_body_bytes))
+            except (RequestBodyError, asyncio.TimeoutError) as e:
+                return json_response({'success': False, 'error': str(e)}, error_status(e))
+            return json_response(await self.run_blocking(server_dual.save_blend_json,
+                                                         fields, content_path))
+
+        if path == '/api/blend/upload':
+            content_type = request.headers.get('content-type', '')
+            try:
+                parser = server_dual.upload_blend_parser(content_type, self.max_body_bytes)
+                filename, file_path = await self.receive_body(request, parser)
+            except (RequestBodyError, asyncio.TimeoutError) as e:
+                return json_response({'success': False, 'error': str(e)}, error_status(e))
+            return json_response(await self.run_blocking(server_dual.save_blend_upload,
+                                                         filename, file_path))
+
+        if path == '/api/blend/stats':
+            try:
+                fields, content_path = await self.receive_body(
+                    request, server_dual.save_blend_parser(self.max_body_bytes))
+            except (RequestBodyError, asyncio.TimeoutError) as e:
+                return json_response({'error': str(e)}, error_status(e))
+            try:
+                return json_response(await self.run_blocking(server_dual.stats_for_posted_blend,
+                                                             fields, content_path))
+            except BlendStatsError as e:
+                return json_response({'error': str(e)}, e.status)
+
+        raise HTTPError(404, "Not Found")
+
+    async def handle_search(self, request):
+        """Proxy web search via SearXNG or fetch a URL."""
+        params = parse_qs(request.url.query)
+        query = params.get('q', [None])[0]
+        fetch_url = params.get('url', [None])[0]
+        try:
+            if query:
+                return json_response(await self.run_blocking(server_dual.search_web, query))
+            if fetch_url:
+                return text_response(await self.run_blocking(server_dual.fetch_page_text, fetch_url))
+            return json_response({'error': 'Provide ?q= for search or ?url= to fetch a page.'}, 400)
+        except Exception as e:
+            return json_response({'error': str(e)}, 502)
+
+    async def handle_rulebook(self, request):
+        """Serve cached rulebook text: ?key=rules/base[&pages=3-5], or the key list."""
+        params = parse_qs(request.url.query)
+        key = params.get('key', [None])[0]
+        pages = params.get('pages', [None])[0]
+        rulebooks = server_dual.RULEBOOKS
+        if not key:
+            return json_response({'rulebooks': await self.run_blocking(rulebooks.keys)})
+        try:
+            return text_response(await self.run_blocking(rulebooks.text, key, pages))
+        except RulebookError as e:
+            return json_response({'error': str(e)}, e.status)
+
+    # Static files (runs in the executor)
+
+    def translate_path(self, url_path):
+        """Map a URL path to a file under the served directory (no '..' escapes)."""
+        url_path = unquote(url_path.split('?', 1)[0].split('#', 1)[0], errors='surrogatepass')
+        trailing_slash = url_path.rstrip().endswith('/')
+        path = self.directory
+        for word in filter(None, posixpath.normpath(url_path).split('/')):
+            if os.path.dirname(word) or word in (os.curdir, os.pardir):
+                continue
+            path = os.path.join(path, word)
+        if trailing_slash:
+            path += '/'
+        return path
+
+    def static_file(self, url, request):
+        path = self.translate_path(url)
+        if os.path.isdir(path):
+            path = os.path.join(path, 'index.html')
+        if not os.path.isfile(path):
+            raise HTTPError(404, "File not found")
+
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        response_headers = [('Content-Type', content_type)]
+        encoding, sibling = find_precompressed(path, request.headers.get('accept-encoding'))
+        if sibling is not None:
+            response_headers += [('Content-Encoding', encoding), ('Vary', 'Accept-Encoding')]
+            path = sibling
+
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            raise HTTPError(404, "File not found")
+        try:
+            fs = os.fstat(f.fileno())
+            etag = file_etag(path, fs)
+            response_headers += [
+                ('ETag', etag),
+                ('Last-Modified', email.utils.formatdate(fs.st_mtime, usegmt=True)),
+                ('Cache-Control', cache_control_for(url)),
+            ]
+            if is_not_modified(request.validators, etag, fs.st_mtime):
+                f.close()
+                return Response(304, [h for h in response_headers if h[0] != 'Content-Type'])
+        except Exception:
+            f.close()
+            raise
+        return Response(200, response_headers, file=f, length=fs.st_size)
+
+    # Listeners
+
+    async def listen(self, port, ssl_context=None):
+        server = await asyncio.start_server(
+            self.handle_connection, host=None, port=port, ssl=ssl_context,
+            ssl_handshake_timeout=self.request_timeout if ssl_context else None,
+            limit=MAX_HEADER_BYTES, reuse_address=True)
+        self.servers.append(server)
+        return server
+
+    async def serve_forever(self):
+        try:
+            await asyncio.gather(*(server.serve_forever() for server in self.servers))
+        finally:
+            for server in self.servers:
+                server.close()
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def serve(listeners, workers=DEFAULT_WORKERS, timeout=DEFAULT_REQUEST_TIMEOUT,
+                max_body_bytes=DEFAULT_MAX_BODY_BYTES):
+    """Serve each (port, ssl_context) listener on the running event loop."""
+    app = AsyncBlendServer(workers=workers, request_timeout=timeout,
+                           max_body_bytes=max_body_bytes)
+    # Build the card search indexes, stats matrix and similarity index before accepting requests
+    server_dual.CARD_CATALOG.index()
+    server_dual.BLEND_SIMILARITY.sync()
+    server_dual.blend_stats_available()
+    for port, ssl_context in listeners:
+        await app.listen(port, ssl_context)
+    await app.serve_forever()
+
+
+def run(listeners, workers=DEFAULT_WORKERS, timeout=DEFAULT_REQUEST_TIMEOUT,
+        max_body_bytes=DEFAULT_MAX_BODY_BYTES):
+    """Run the asyncio engine until interrupted."""
+    asyncio.run(serve(listeners, workers, timeout, max_body_bytes))
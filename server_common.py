@@ -0,0 +1,481 @@
+#!/usr/bin/env python3
+"""
+Shared building blocks for the local servers (server.py, server_https.py,
+server_dual.py).
+"""
+import datetime
+import email.utils
+import hashlib
+import os
+import selectors
+import socket
+import socketserver
+import ssl
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from request_body import DEFAULT_MAX_BODY_BYTES
+
+# Worker threads per server and how many accepted connections may wait for one
+DEFAULT_WORKERS = 32
+DEFAULT_BACKLOG = 64
+# Seconds a request may stall mid-way
+DEFAULT_REQUEST_TIMEOUT = 15
+# Seconds an idle keep-alive connection may hold a worker waiting for its next request
+DEFAULT_KEEPALIVE_TIMEOUT = 2
+
+# Errors from clients that went away; not worth a traceback
+CLIENT_DISCONNECT_ERRORS = (ConnectionResetError, BrokenPipeError, ConnectionAbortedError,
+                            TimeoutError, socket.timeout, ssl.SSLError)
+
+# Precompressed siblings in order of preference: (Content-Encoding, suffix)
+PRECOMPRESSED_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# Static file caching: versioned URLs never change, everything else revalidates
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+# API responses are never cached
+NO_STORE_HEADERS = (
+    ('Cache-Control', 'no-cache, no-store, must-revalidate'),
+    ('Pragma', 'no-cache'),
+    ('Expires', '0'),
+)
+
+# file path -> ((mtime_ns, size), etag)
+_etag_cache = {}
+_etag_lock = threading.Lock()
+
+
+def accepted_encodings(header):
+    """Parse an Accept-Encoding header into the set of acceptable codings."""
+    accepted = set()
+    for item in (header or '').split(','):
+        parts = item.strip().split(';')
+        coding = parts[0].strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in parts[1:]:
+            name, _, value = param.strip().partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(coding)
+    return accepted
+
+
+def find_precompressed(path, accept_encoding):
+    """Return (encoding, sibling_path) for the best sibling the client accepts, or (None, None)."""
+    if not os.path.isfile(path):
+        return None, None
+    accepted = accepted_encodings(accept_encoding)
+    if not accepted:
+        return None, None
+    source_mtime = os.stat(path).st_mtime
+    for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+        if encoding not in accepted:
+            continue
+        sibling = path + suffix
+        try:
+            # Ignore siblings older than the file they were made from
+            if os.stat(sibling).st_mtime >= source_mtime:
+                return encoding, sibling
+        except OSError:
+            continue
+    return None, None
+
+
+def file_etag(path, stat=None):
+    """Strong ETag (content hash) of a file, cached until its mtime or size changes."""
+    stat = stat or os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    with _etag_lock:
+        cached = _etag_cache.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+    etag = f'"{digest.hexdigest()[:32]}"'
+    with _etag_lock:
+        _etag_cache[path] = (key, etag)
+    return etag
+
+
+def bytes_etag(data):
+    """Strong ETag for an in-memory response body."""
+    return f'"{hashlib.sha256(data).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match, etag):
+    """True if an If-None-Match header matches etag (weak comparison, as RFC 9110 requires)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def not_modified_since(if_modified_since, mtime):
+    """True if an If-Modified-Since date is at or after mtime (whole seconds)."""
+    if not if_modified_since:
+        return False
+    try:
+        since = email.utils.parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return False
+    if since is None:
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=datetime.timezone.utc)
+    return int(mtime) <= since.timestamp()
+
+
+def is_not_modified(headers, etag, mtime=None):
+    """Conditional GET check; If-None-Match takes precedence over If-Modified-Since."""
+    if_none_match = headers.get('If-None-Match')
+    if if_none_match:
+        return etag_matches(if_none_match, etag)
+    return mtime is not None and not_modified_since(headers.get('If-Modified-Since'), mtime)
+
+
+def cache_control_for(url):
+    """Cache-Control for a static file URL.
+
+    URLs carrying a version/hash query (app.js?v=4, shard.json?v=<hash>) change
+    whenever their content does, so they may be cached forever. Everything
+    else is revalidated on each use, which costs a 304 when unchanged.
+    """
+    query = parse_qs(urlsplit(url).query)
+    if query.get('v', [''])[0]:
+        return IMMUTABLE_CACHE_CONTROL
+    return REVALIDATE_CACHE_CONTROL
+
+
+class PrecompressedFileMixin:
+    """Serve static files with precompressed siblings and conditional GETs.
+
+    Mixed into SimpleHTTPRequestHandler subclasses. When a requested file has
+    an up-to-date sibling (e.g. resources.compact.json.br) in an encoding the
+    client accepts, the sibling is sent with the matching Content-Encoding.
+    Every file carries a strong ETag and Last-Modified; matching
+    If-None-Match/If-Modified-Since requests get a bodiless 304.
+    """
+
+    def find_precompressed(self, path):
+        """Return (encoding, sibling_path) for the best acceptable sibling, or (None, None)."""
+        return find_precompressed(path, self.headers.get('Accept-Encoding'))
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            parts = urlsplit(self.path)
+            if not parts.path.endswith('/'):
+                # Let the base class redirect to the trailing-slash URL
+                return super().send_head()
+            for index in ('index.html', 'index.htm'):
+                index_path = os.path.join(path, index)
+                if os.path.isfile(index_path):
+                    path = index_path
+                    break
+            else:
+                # Directory listing
+                return super().send_head()
+        elif path.endswith('/') or not os.path.isfile(path):
+            return super().send_head()
+
+        encoding, sibling = self.find_precompressed(path)
+        try:
+            f = open(sibling or path, 'rb')
+        except OSError:
+            self.send_error(404, "File not found")
+            return None
+
+        try:
+            fs = os.fstat(f.fileno())
+            etag = file_etag(sibling or path, fs)
+            if is_not_modified(self.headers, etag, fs.st_mtime):
+                f.close()
+                self.send_response(304)
+                self.send_validators(etag, fs.st_mtime, encoding is not None)
+                self.end_headers()
+                return None
+
+            self.send_response(200)
+            self.send_header('Content-Type', self.guess_type(path))
+            if encoding is not None:
+                self.send_header('Content-Encoding', encoding)
+            self.send_header('Content-Length', str(fs.st_size))
+            self.send_validators(etag, fs.st_mtime, encoding is not None)
+            self.end_headers()
+            return f
+        except Exception:
+            f.close()
+            raise
+
+    def send_validators(self, etag, mtime, vary_encoding=False):
+        """ETag, Last-Modified and Cache-Control for a static file response."""
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', self.date_time_string(mtime))
+        self.send_header('Cache-Control', cache_control_for(self.path))
+        if vary_encoding:
+            self.send_header('Vary', 'Accept-Encoding')
+
+
+class KeepAliveMixin:
+    """HTTP/1.1 persistent connections that do not hog the worker pool.
+
+    An idle connection holds a worker thread, so after a response the next
+    request line must arrive within the server's (short) keep-alive timeout;
+    the rest of the request gets the full request timeout. While every
+    worker is taken, responses carry "Connection: close" so the worker goes
+    to a waiting connection instead.
+
+    Every response must carry a Content-Length (or close the connection) for
+    keep-alive to work; the JSON helpers in the handlers set it.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        # StreamRequestHandler applies self.timeout to the socket
+        self.timeout = getattr(self.server, 'request_timeout', None)
+        self.requests_handled = 0
+        self.idle = False
+        super().setup()
+
+    def handle_one_request(self):
+        self.idle = self.requests_handled > 0
+        if self.idle:
+            self.connection.settimeout(getattr(self.server, 'keepalive_timeout', self.timeout))
+        self.requests_handled += 1
+        super().handle_one_request()
+
+    def parse_request(self):
+        # The request line has arrived: the rest gets the full request timeout
+        self.idle = False
+        self.connection.settimeout(self.timeout)
+        return super().parse_request()
+
+    def log_error(self, format, *args):
+        # An idle keep-alive connection timing out is routine
+        if self.idle and format.startswith('Request timed out'):
+            return
+        super().log_error(format, *args)
+
+    def send_response(self, code, message=None):
+        self.close_announced = False
+        super().send_response(code, message)
+        # Also when the request body was left unread (see stream_body())
+        pool = getattr(self.server, 'pool', None)
+        if self.close_connection or (pool is not None and pool.saturated()):
+            self.send_header('Connection', 'close')
+
+    def send_header(self, keyword, value):
+        # send_error() adds its own "Connection: close"; send it once
+        if keyword.lower() == 'connection' and value.lower() == 'close':
+            if getattr(self, 'close_announced', False):
+                return
+            self.close_announced = True
+        super().send_header(keyword, value)
+
+
+class WorkerPool:
+    """Bounded pool of worker threads, shareable by several listeners.
+
+    At most `workers` connections are served at once and at most `backlog`
+    more wait for a worker; beyond that submit() blocks, which pauses the
+    accept loop and lets the kernel listen queue absorb the rest.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, backlog=DEFAULT_BACKLOG):
+        self.workers = workers
+        self.backlog = backlog
+        self._slots = threading.BoundedSemaphore(workers + backlog)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='blend-http')
+        self._lock = threading.Lock()
+        self._pending = 0    # submitted and not finished (running or waiting)
+
+    def saturated(self):
+        """True when every worker is taken."""
+        return self._pending >= self.workers
+
+    def submit(self, func, *args):
+        """Run func(*args) on a worker; False if the pool is shut down."""
+        self._slots.acquire()
+        with self._lock:
+            self._pending += 1
+        try:
+            self._executor.submit(self._run, func, args)
+        except RuntimeError:
+            # Pool already shut down
+            self._done()
+            return False
+        return True
+
+    def _run(self, func, args):
+        try:
+            func(*args)
+        finally:
+            self._done()
+
+    def _done(self):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class PooledHTTPServer(socketserver.TCPServer):
+    """TCP server that handles connections on a bounded WorkerPool.
+
+    Pass a shared `pool` to serve several listeners (e.g. HTTP and HTTPS)
+    from the same workers; otherwise the server creates and owns one. With
+    an ssl_context the TLS handshake runs in the worker thread, so a slow
+    client cannot stall the accept loop.
+    """
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, server_address, handler_class, workers=DEFAULT_WORKERS,
+                 request_timeout=DEFAULT_REQUEST_TIMEOUT, ssl_context=None,
+                 backlog=DEFAULT_BACKLOG, bind_and_activate=True, pool=None,
+                 max_body_bytes=DEFAULT_MAX_BODY_BYTES,
+                 keepalive_timeout=DEFAULT_KEEPALIVE_TIMEOUT):
+        self.owns_pool = pool is None
+        self.pool = pool if pool is not None else WorkerPool(workers, backlog)
+        self.workers = self.pool.workers
+        self.request_timeout = request_timeout
+        self.keepalive_timeout = (min(keepalive_timeout, request_timeout)
+                                  if request_timeout else keepalive_timeout)
+        self.ssl_context = ssl_context
+        # Upload/save request bodies larger than this are refused
+        self.max_body_bytes = max_body_bytes
+        self.request_queue_size = max(socketserver.TCPServer.request_queue_size,
+                                      self.pool.backlog)
+        super().__init__(server_address, handler_class, bind_and_activate)
+
+    def get_request(self):
+        sock, addr = super().get_request()
+        sock.settimeout(self.request_timeout)
+        if self.ssl_context is not None:
+            sock = self.ssl_context.wrap_socket(sock, server_side=True,
+                                                do_handshake_on_connect=False)
+        return sock, addr
+
+    def process_request(self, request, client_address):
+        if not self.pool.submit(self._process_request_worker, request, client_address):
+            self.shutdown_request(request)
+
+    def _process_request_worker(self, request, client_address):
+        try:
+            if self.ssl_context is not None:
+                request.do_handshake()
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def handle_error(self, request, client_address):
+        if isinstance(sys.exc_info()[1], CLIENT_DISCONNECT_ERRORS):
+            return
+        super().handle_error(request, client_address)
+
+    def server_close(self):
+        super().server_close()
+        if self.owns_pool:
+            self.pool.shutdown()
+
+
+class ListenerGroup:
+    """Serve several listening servers from one accept loop in one thread.
+
+    The servers are multiplexed with a selector; accepted connections go to
+    each server's (typically shared) WorkerPool. shutdown() may be called from
+    another thread; server_close() closes every listener and the pools.
+    """
+
+    def __init__(self, servers=()):
+        self.servers = list(servers)
+        self._shutdown_request = False
+        self._is_shut_down = threading.Event()
+
+    def add(self, server):
+        self.servers.append(server)
+        return server
+
+    def serve_forever(self, poll_interval=0.5):
+        self._is_shut_down.clear()
+        try:
+            with selectors.DefaultSelector() as selector:
+                for server in self.servers:
+                    selector.register(server, selectors.EVENT_READ)
+                while not self._shutdown_request:
+                    for key, _ in selector.select(poll_interval):
+                        if self._shutdown_request:
+                            break
+                        key.fileobj._handle_request_noblock()
+                    for server in self.servers:
+                        server.service_actions()
+        finally:
+            self._shutdown_request = False
+            self._is_shut_down.set()
+
+    def shutdown(self):
+        """Stop serve_forever() and wait for it to return."""
+        self._shutdown_request = True
+        self._is_shut_down.wait()
+
+    def server_close(self):
+        pools = []
+        for server in self.servers:
+            server.server_close()
+            pool = getattr(server, 'pool', None)
+            if pool is not None and pool not in pools:
+                pools.append(pool)
+        for pool in pools:
+            pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.server_close()
+
+
+def create_ssl_context(cert_file, key_file):
+    """Server-side TLS context (TLS 1.2+) for the self-signed certificates."""
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    context.load_cert_chain(cert_file, key_file)
+    return context
+
+
+def add_server_arguments(parser):
+    """Add the shared --workers/--timeout/--max-body options to an argparse parser."""
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'worker threads serving connections (default {DEFAULT_WORKERS})')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_REQUEST_TIMEOUT,
+                        help=f'seconds before a stalled request is closed '
+                             f'(default {DEFAULT_REQUEST_TIMEOUT}; idle keep-alive '
+                             f'connections close after {DEFAULT_KEEPALIVE_TIMEOUT})')
+    parser.add_argument('--max-body', type=int, default=DEFAULT_MAX_BODY_BYTES,
+                        help=f'largest blend upload/save request body in bytes '
+                             f'(default {DEFAULT_MAX_BODY_BYTES})')
+    return parser
@@ -4,19 +4,28 @@ Dual HTTP/HTTPS server for Dune Imperium Blend Builder.
 - HTTP on port 5000 (for regular access)
 - HTTPS on port 5443 (for camera access on mobile)
 """
+import argparse
 import http.server
-import socketserver
 import json
 import os
 import ssl
 import socket
-import threading
-import urllib.request
-import urllib.parse as urlparse_module
 from pathlib import Path
 from urllib.parse import parse_qs, urlparse
-from email import message_from_bytes
-from io import BytesIO
+
+from blend_similarity import BlendSimilarity, BlendSimilarityError, similar_blends
+from blend_stats import BlendStatsError, StatsCatalog, blend_stats
+from blend_store import BlendStore
+from request_body import (DEFAULT_MAX_BODY_BYTES, JSONFieldParser, MultipartFileParser,
+                          error_status, receive_body)
+from card_search import CardCatalog, CardSearchError, search_cards
+from rulebooks import RulebookError, RulebookLibrary
+from search_proxy import SearchProxy
+from server_common import (DEFAULT_REQUEST_TIMEOUT, DEFAULT_WORKERS, NO_STORE_HEADERS,
+                           REVALIDATE_CACHE_CONTROL, KeepAliveMixin, ListenerGroup,
+                           PooledHTTPServer, PrecompressedFileMixin, WorkerPool,
+                           add_server_arguments, bytes_etag, create_ssl_context,
+                           is_not_modified)
 
 SEARXNG_INSTANCE = 'https://searx.be'
 
@@ -26,19 +35,33 @@ BLENDS_DIR = Path(__file__).parent / "blends"
 CERT_FILE = "cert.pem"
 KEY_FILE = "key.pem"
 
-
-class ReuseAddrTCPServer(socketserver.TCPServer):
-    """TCP Server with SO_REUSEADDR enabled."""
-    allow_reuse_address = True
-
-
-class BlendServerHandler(http.server.SimpleHTTPRequestHandler):
+# Cached blend listing and contents, shared by all listeners and both engines
+BLEND_STORE = BlendStore(BLENDS_DIR)
+# Pooled, cached web search/page fetch for the agent (/api/search)
+SEARCH_PROXY = SearchProxy(SEARXNG_INSTANCE)
+# Rulebook PDFs in rulebooks/, text extracted once (/api/search/pdf)
+RULEBOOKS = RulebookLibrary()
+# Card search indexes over resources.json (/api/cards/search)
+CARD_CATALOG = CardCatalog()
+# Blend stats feature matrix over resources.json (/api/blend/stats)
+BLEND_STATS = StatsCatalog()
+# MinHash/LSH index of the stored blends (/api/blends/similar)
+BLEND_SIMILARITY = BlendSimilarity(BLEND_STORE)
+
+
+class BlendServerHandler(KeepAliveMixin, PrecompressedFileMixin, http.server.SimpleHTTPRequestHandler):
     """HTTP handler with blend file upload/download support."""
 
+    # Set for API responses that carry their own ETag/Cache-Control
+    cacheable_response = False
+
     def end_headers(self):
-        self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
-        self.send_header('Pragma', 'no-cache')
-        self.send_header('Expires', '0')
+        # Static files carry ETag/Cache-Control (PrecompressedFileMixin);
+        # other API responses are never cached
+        if urlparse(self.path).path.startswith('/api/') and not self.cacheable_response:
+            for header, value in NO_STORE_HEADERS:
+                self.send_header(header, value)
+        self.cacheable_response = False
         super().end_headers()
 
     def do_OPTIONS(self):
@@ -54,10 +77,26 @@ class BlendServerHandler(http.server.SimpleHTTPRequestHandler):
         try:
             parsed = urlparse(self.path)
 
+            if parsed.path == '/api/cards/search':
+                self.handle_card_search(parsed)
+                return
+
+            if parsed.path == '/api/search/pdf':
+                self.handle_rulebook(parsed)
+                return
+
+            if parsed.path == '/api/blend/stats':
+                self.handle_blend_stats(parsed)
+                return
+
             if parsed.path == '/api/search':
                 self.handle_search(parsed)
                 return
 
+            if parsed.path == '/api/blends/similar':
+                self.handle_similar_blends(parsed)
+                return
+
             if parsed.path == '/api/blends':
                 result = self.list_blends()
                 if result['success']:
@@ -70,14 +109,18 @@ class BlendServerHandler(http.server.SimpleHTTPRequestHandler):
                 self.send_json_response({
                     'canSaveToServer': True,
                     'canLoadFromServer': True,
-                    'serverType': 'local-dual'
+                    'serverType': 'local-dual',
+                    'canServeRulebooks': True,
+                    'canSearchCards': True,
+                    'canComputeBlendStats': blend_stats_available(),
+                    'canFindSimilarBlends': True
                 })
                 return
 
             if parsed.path.startswith('/api/blend/load/'):
                 filename = parsed.path.split('/api/blend/load/')[1]
                 result = self.load_blend(filename)
-                self.send_json_response(result)
+                self.send_json_response(result, cacheable=result['success'])
                 return
 
             return super().do_GET()
@@ -99,15 +142,19 @@ class BlendServerHandler(http.server.SimpleHTTPRequestHandler):
             parsed = urlparse(self.path)
 
             if parsed.path == '/api/blend/save':
-                result = self.save_blend()
-                self.send_json_response(result)
+                self.send_json_response(*self.save_blend())
                 return
 
             if parsed.path == '/api/blend/upload':
-                result = self.upload_blend()
-                self.send_json_response(result)
+                self.send_json_response(*self.upload_blend())
+                return
+
+            if parsed.path == '/api/blend/stats':
+                self.handle_posted_blend_stats()
                 return
 
+            # Request body was not read; don't reuse the connection
+            self.close_connection = True
             self.send_error(404, "Not Found")
 
         except (ConnectionResetError, BrokenPipeError) as e:
@@ -126,132 +173,267 @@ class BlendServerHandler(http.server.SimpleHTTPRequestHandler):
         fetch_url = params.get('url', [None])[0]
         try:
             if query:
-                search_url = (f"{SEARXNG_INSTANCE}/search"
-                              f"?q={urlparse_module.quote(query)}&format=json&language=en")
-                req = urllib.request.Request(search_url,
-                    headers={'User-Agent': 'DuneBlend/1.0'})
-                with urllib.request.urlopen(req, timeout=10) as r:
-                    data = json.loads(r.read().decode())
-                results = [
-                    {'title': x.get('title',''), 'url': x.get('url',''), 'snippet': x.get('content','')}
-                    for x in (data.get('results') or [])[:6]
-                ]
-                self.send_json_response({'results': results})
+                self.send_json_response(search_web(query))
                 return
             if fetch_url:
-                req = urllib.request.Request(fetch_url,
-                    headers={'User-Agent': 'Mozilla/5.0 (compatible; DuneBlend/1.0)'})
-                with urllib.request.urlopen(req, timeout=10) as r:
-                    html = r.read().decode('utf-8', errors='replace')
-                import re
-                text = re.sub(r'<script[\s\S]*?</script>', '', html, flags=re.IGNORECASE)
-                text = re.sub(r'<style[\s\S]*?</style>', '', text, flags=re.IGNORECASE)
-                text = re.sub(r'<[^>]+>', ' ', text)
-                text = re.sub(r'\s{2,}', ' ', text).strip()[:8000]
-                self.send_response(200)
-                self.send_header('Content-Type', 'text/plain')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                self.wfile.write(text.encode('utf-8'))
+                self.send_text_response(fetch_page_text(fetch_url))
                 return
             self.send_json_response({'error': 'Provide ?q= for search or ?url= to fetch a page.'}, 400)
         except Exception as e:
             self.send_json_response({'error': str(e)}, 502)
 
-    def send_json_response(self, data, status=200):
-        """Send JSON response."""
+    def handle_rulebook(self, parsed):
+        """Serve cached rulebook text: ?key=rules/base[&pages=3-5], or the key list."""
+        params = parse_qs(parsed.query)
+        key = params.get('key', [None])[0]
+        pages = params.get('pages', [None])[0]
+        if not key:
+            self.send_json_response({'rulebooks': RULEBOOKS.keys()})
+            return
+        try:
+            self.send_text_response(RULEBOOKS.text(key, pages))
+        except RulebookError as e:
+            self.send_json_response({'error': str(e)}, e.status)
+
+    def handle_card_search(self, parsed):
+        """Indexed card search: /api/cards/search?q=&ability=&type=&set=&access=&cost=..."""
+        try:
+            self.send_json_response(search_cards(CARD_CATALOG, parse_qs(parsed.query)))
+        except CardSearchError as e:
+            self.send_json_response({'error': str(e)}, e.status)
+
+    def handle_blend_stats(self, parsed):
+        """Stats of server blends: /api/blend/stats?name=a.md&name=b.md (all blends without name)."""
+        try:
+            self.send_json_response(stats_for_blend_files(parse_qs(parsed.query).get('name', [])))
+        except BlendStatsError as e:
+            self.send_json_response({'error': str(e)}, e.status)
+
+    def handle_similar_blends(self, parsed):
+        """Most similar server blends: /api/blends/similar?name=a.md[&limit=5]."""
+        query = parse_qs(parsed.query)
+        try:
+            self.send_json_response(find_similar_blends(query.get('name', [''])[0],
+                                                        query.get('limit', [None])[0]))
+        except BlendSimilarityError as e:
+            self.send_json_response({'error': str(e)}, e.status)
+
+    def handle_posted_blend_stats(self):
+        """Stats of a blend posted as {"filename": ..., "content": ...}."""
+        try:
+            fields, content_path = self.stream_body(
+                lambda: save_blend_parser(self.server.max_body_bytes))
+        except Exception as e:
+            self.send_json_response({'error': str(e)}, error_status(e))
+            return
+        try:
+            self.send_json_response(stats_for_posted_blend(fields, content_path))
+        except BlendStatsError as e:
+            self.send_json_response({'error': str(e)}, e.status)
+
+    def send_text_response(self, text, status=200):
+        """Send plain text response."""
+        body = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json_response(self, data, status=200, cacheable=False):
+        """Send JSON response.
+
+        A cacheable response carries an ETag and is answered with 304 when
+        the client already has it.
+        """
+        body = json.dumps(data).encode()
+        etag = bytes_etag(body) if cacheable else None
+        if etag and is_not_modified(self.headers, etag):
+            self.send_response(304)
+            self.send_etag(etag)
+            self.end_headers()
+            return
         self.send_response(status)
         self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
         self.send_header('Access-Control-Allow-Origin', '*')
+        if etag:
+            self.send_etag(etag)
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
+        self.wfile.write(body)
+
+    def send_etag(self, etag):
+        """Validator headers for a cacheable API response."""
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', REVALIDATE_CACHE_CONTROL)
+        self.cacheable_response = True
+
+    def stream_body(self, make_parser):
+        """Stream the request body through a request_body parser; returns its result."""
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+            return receive_body(self.rfile, content_length, make_parser())
+        except Exception:
+            # The body may be partly unread; don't reuse the connection
+            self.close_connection = True
+            raise
 
     def list_blends(self):
         """List all blend files."""
-        try:
-            blends = []
-            if BLENDS_DIR.exists():
-                for f in sorted(BLENDS_DIR.glob("*.md")):
-                    stat = f.stat()
-                    blends.append({
-                        'name': f.name,
-                        'size': stat.st_size,
-                        'modified': stat.st_mtime
-                    })
-            return {'success': True, 'blends': blends}
-        except Exception as e:
-            return {'success': False, 'error': str(e)}
+        return list_blend_files()
 
     def load_blend(self, filename):
         """Load a blend file."""
+        return read_blend_file(filename)
+
+    def save_blend(self):
+        """Save a blend file; returns (result, HTTP status)."""
         try:
-            filepath = BLENDS_DIR / filename
-            if not filepath.exists():
-                return {'success': False, 'error': 'File not found'}
-            content = filepath.read_text(encoding='utf-8')
-            return {'success': True, 'content': content, 'filename': filename}
+            fields, content_path = self.stream_body(
+                lambda: save_blend_parser(self.server.max_body_bytes))
         except Exception as e:
-            return {'success': False, 'error': str(e)}
+            return {'success': False, 'error': str(e)}, error_status(e)
+        return save_blend_json(fields, content_path), 200
 
-    def save_blend(self):
-        """Save a blend file."""
+    def upload_blend(self):
+        """Handle file upload; returns (result, HTTP status)."""
         try:
-            content_length = int(self.headers.get('Content-Length', 0))
-            body = self.rfile.read(content_length).decode('utf-8')
-            data = json.loads(body)
+            filename, file_path = self.stream_body(
+                lambda: upload_blend_parser(self.headers.get('Content-Type', ''),
+                                            self.server.max_body_bytes))
+        except Exception as e:
+            return {'success': False, 'error': str(e)}, error_status(e)
+        return save_blend_upload(filename, file_path), 200
 
-            filename = data.get('filename', 'untitled.md')
-            content = data.get('content', '')
 
-            if not filename.endswith('.md'):
-                filename += '.md'
+# Blend and search operations shared by the threaded handler above and the
+# asyncio engine (server_async.py)
 
-            filename = ''.join(c for c in filename if c.isalnum() or c in '._- ')
+def search_web(query):
+    """Search the web via SearXNG; returns {'results': [...]}."""
+    return SEARCH_PROXY.search(query)
 
-            BLENDS_DIR.mkdir(exist_ok=True)
-            filepath = BLENDS_DIR / filename
-            filepath.write_text(content, encoding='utf-8')
 
-            return {'success': True, 'filename': filename}
-        except Exception as e:
-            return {'success': False, 'error': str(e)}
+def fetch_page_text(fetch_url):
+    """Fetch a page and return its visible text (first 8000 characters)."""
+    return SEARCH_PROXY.fetch_text(fetch_url)
+
+
+def list_blend_files():
+    """List all blend files."""
+    try:
+        return {'success': True, 'blends': BLEND_STORE.listing('name')}
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+
+
+def read_blend_file(filename):
+    """Load a blend file."""
+    try:
+        content = BLEND_STORE.read(filename)
+        if content is None:
+            return {'success': False, 'error': 'File not found'}
+        return {'success': True, 'content': content, 'filename': filename}
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
 
-    def upload_blend(self):
-        """Handle file upload."""
-        try:
-            content_type = self.headers.get('Content-Type', '')
-            content_length = int(self.headers.get('Content-Length', 0))
-            body = self.rfile.read(content_length)
 
-            if 'multipart/form-data' in content_type:
-                boundary = content_type.split('boundary=')[1].encode()
-                parts = body.split(b'--' + boundary)
+def blend_stats_available():
+    """True when /api/blend/stats can run (numpy is installed)."""
+    try:
+        BLEND_STATS.engine()
+    except BlendStatsError:
+        return False
+    return True
+
+
+def stats_for_blend_files(names):
+    """Stats of blends in the blends directory (every blend when names is empty)."""
+    if not names:
+        names = [entry['name'] for entry in BLEND_STORE.listing('name')]
+    blends = {}
+    for name in names:
+        content = BLEND_STORE.read(name)
+        if content is None:
+            raise BlendStatsError(f"Blend not found: {name}", status=404)
+        blends[name] = content
+    return blend_stats(BLEND_STATS, blends)
+
+
+def stats_for_posted_blend(fields, content_path):
+    """Stats of a posted blend; its content was streamed to content_path (removed here)."""
+    try:
+        content = ''
+        if content_path is not None:
+            with open(content_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        return blend_stats(BLEND_STATS, {str(fields.get('filename', 'untitled.md')): content})
+    finally:
+        discard_upload(content_path)
 
-                for part in parts:
-                    if b'filename=' in part:
-                        header_end = part.find(b'\r\n\r\n')
-                        if header_end > 0:
-                            headers = part[:header_end].decode('utf-8', errors='ignore')
-                            file_content = part[header_end + 4:]
-                            if file_content.endswith(b'\r\n'):
-                                file_content = file_content[:-2]
 
-                            filename_match = headers.split('filename="')
-                            if len(filename_match) > 1:
-                                filename = filename_match[1].split('"')[0]
+def find_similar_blends(name, limit=None):
+    """Blends most similar to a stored blend, from the MinHash index."""
+    return similar_blends(BLEND_SIMILARITY, name, limit)
 
-                                if not filename.endswith('.md'):
-                                    filename += '.md'
 
-                                BLENDS_DIR.mkdir(exist_ok=True)
-                                filepath = BLENDS_DIR / filename
-                                filepath.write_bytes(file_content)
+def save_blend_parser(max_body_bytes=DEFAULT_MAX_BODY_BYTES):
+    """Parser for a JSON save body {"filename": ..., "content": ...}; content goes to a temp file."""
+    return JSONFieldParser(BLEND_STORE.directory, stream_field='content', max_bytes=max_body_bytes)
 
-                                return {'success': True, 'filename': filename}
 
-            return {'success': False, 'error': 'No file found in request'}
-        except Exception as e:
-            return {'success': False, 'error': str(e)}
+def upload_blend_parser(content_type, max_body_bytes=DEFAULT_MAX_BODY_BYTES):
+    """Parser for a multipart/form-data upload body; the file goes to a temp file."""
+    return MultipartFileParser(content_type, BLEND_STORE.directory, max_bytes=max_body_bytes)
+
+
+def save_blend_json(fields, content_path):
+    """Save a blend from parsed JSON fields; its content was streamed to content_path."""
+    try:
+        filename = str(fields.get('filename', 'untitled.md'))
+
+        if not filename.endswith('.md'):
+            filename += '.md'
+
+        filename = ''.join(c for c in filename if c.isalnum() or c in '._- ')
+
+        if content_path is None:
+            BLEND_STORE.write(filename, '')
+        else:
+            BLEND_STORE.commit(filename, content_path)
+        BLEND_SIMILARITY.sync()
+
+        return {'success': True, 'filename': filename}
+    except Exception as e:
+        discard_upload(content_path)
+        return {'success': False, 'error': str(e)}
+
+
+def save_blend_upload(filename, file_path):
+    """Save a blend uploaded as multipart/form-data; its content was streamed to file_path."""
+    try:
+        filename = os.path.basename(filename)
+
+        if not filename.endswith('.md'):
+            filename += '.md'
+
+        BLEND_STORE.commit(filename, file_path)
+        BLEND_SIMILARITY.sync()
+
+        return {'success': True, 'filename': filename}
+    except Exception as e:
+        discard_upload(file_path)
+        return {'success': False, 'error': str(e)}
+
+
+def discard_upload(path):
+    """Remove a streamed upload that was not saved."""
+    if path is not None:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
 
 
 def get_local_ip():
@@ -266,43 +448,45 @@ def get_local_ip():
         return "localhost"
 
 
-def run_http_server():
-    """Run HTTP server."""
-    with ReuseAddrTCPServer(("", HTTP_PORT), BlendServerHandler) as httpd:
-        httpd.serve_forever()
+def create_listeners(has_certs, workers=DEFAULT_WORKERS, timeout=DEFAULT_REQUEST_TIMEOUT,
+                     max_body_bytes=DEFAULT_MAX_BODY_BYTES):
+    """HTTP and (with certificates) HTTPS servers sharing one worker pool."""
+    pool = WorkerPool(workers)
+    listeners = ListenerGroup()
+    listeners.add(PooledHTTPServer(("", HTTP_PORT), BlendServerHandler,
+                                   request_timeout=timeout, pool=pool,
+                                   max_body_bytes=max_body_bytes))
+    if has_certs:
+        try:
+            context = create_ssl_context(CERT_FILE, KEY_FILE)
+            # TLS handshakes run in the worker threads, not in the accept loop
+            listeners.add(PooledHTTPServer(("", HTTPS_PORT), BlendServerHandler,
+                                           request_timeout=timeout, ssl_context=context,
+                                           pool=pool, max_body_bytes=max_body_bytes))
+        except Exception as e:
+            print(f"⚠️  HTTPS server failed: {e}")
+    return listeners
 
 
-def run_https_server():
-    """Run HTTPS server."""
-    print("  [HTTPS] Thread starting...")
-    if not os.path.exists(CERT_FILE) or not os.path.exists(KEY_FILE):
-        print(f"⚠️  HTTPS disabled - no certificates found")
-        print(f"   Run ./run_server_https.sh to generate certificates")
-        return
+def run_async_server(has_certs, workers=DEFAULT_WORKERS, timeout=DEFAULT_REQUEST_TIMEOUT,
+                     max_body_bytes=DEFAULT_MAX_BODY_BYTES):
+    """Run HTTP and HTTPS listeners on one asyncio event loop."""
+    import server_async
 
-    try:
-        print(f"  [HTTPS] Creating server on port {HTTPS_PORT}...")
-        with ReuseAddrTCPServer(("", HTTPS_PORT), BlendServerHandler) as httpd:
-            print("  [HTTPS] Setting up SSL context...")
-            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
-            context.minimum_version = ssl.TLSVersion.TLSv1_2
-            context.load_cert_chain(CERT_FILE, KEY_FILE)
-            httpd.socket = context.wrap_socket(
-                httpd.socket,
-                server_side=True,
-                do_handshake_on_connect=True
-            )
-            print(f"  [HTTPS] ✅ Server running on port {HTTPS_PORT}")
-            httpd.serve_forever()
-    except Exception as e:
-        print(f"⚠️  HTTPS server failed: {e}")
-        import traceback
-        traceback.print_exc()
+    listeners = [(HTTP_PORT, None)]
+    if has_certs:
+        listeners.append((HTTPS_PORT, create_ssl_context(CERT_FILE, KEY_FILE)))
+    server_async.run(listeners, workers, timeout, max_body_bytes)
 
 
-def run_server():
+def run_server(workers=DEFAULT_WORKERS, timeout=DEFAULT_REQUEST_TIMEOUT, engine='threaded',
+               max_body_bytes=DEFAULT_MAX_BODY_BYTES):
     """Run both HTTP and HTTPS servers."""
     BLENDS_DIR.mkdir(exist_ok=True)
+    CARD_CATALOG.index()
+    BLEND_SIMILARITY.sync()
+    if not blend_stats_available():
+        print("⚠️  Blend stats disabled (pip install numpy)")
 
     local_ip = get_local_ip()
     has_certs = os.path.exists(CERT_FILE) and os.path.exists(KEY_FILE)
@@ -329,29 +513,35 @@ def run_server():
    Run: ./run_server_https.sh to generate certificates
 """)
 
+    if engine == 'asyncio':
+        print(f"⚙️  asyncio engine, {workers} I/O threads, {timeout:g}s request timeout")
+    else:
+        print(f"⚙️  {workers} worker threads shared by all listeners, {timeout:g}s request timeout")
     print(f"""📁 Blend files stored in: {BLENDS_DIR}
 
 Press Ctrl+C to stop
 """)
 
-    # Start HTTP server in main thread
-    http_thread = threading.Thread(target=run_http_server, daemon=True)
-    http_thread.start()
-
-    # Start HTTPS server if certificates exist
-    if has_certs:
-        https_thread = threading.Thread(target=run_https_server, daemon=True)
-        https_thread.start()
+    if engine == 'asyncio':
+        try:
+            run_async_server(has_certs, workers, timeout, max_body_bytes)
+        except KeyboardInterrupt:
+            print("\n\n✅ Server stopped")
+        return
 
-    try:
-        # Keep main thread alive
-        while True:
-            import time
-            time.sleep(1)
-    except KeyboardInterrupt:
-        print("\n\n✅ Server stopped")
+    # One accept loop for both listeners; requests share the worker pool
+    with create_listeners(has_certs, workers, timeout, max_body_bytes) as listeners:
+        try:
+            listeners.serve_forever()
+        except KeyboardInterrupt:
+            print("\n\n✅ Server stopped")
 
 
 if __name__ == '__main__':
-    run_server()
+    parser = argparse.ArgumentParser(description='Blend Builder dual HTTP/HTTPS server')
+    add_server_arguments(parser)
+    parser.add_argument('--engine', choices=['threaded', 'asyncio'], default='threaded',
+                        help='threaded worker pool or a single asyncio event loop (default threaded)')
+    args = parser.parse_args()
+    run_server(args.workers, args.timeout, args.engine, args.max_body)
 
@@ -3,29 +3,32 @@
 HTTPS server with SSL support for camera access on mobile devices.
 Generates self-signed certificates if not present.
 """
+import argparse
 import http.server
-import socketserver
 import json
 import os
 import ssl
 import socket
 from pathlib import Path
 from urllib.parse import parse_qs, urlparse
-from email import message_from_bytes
-from io import BytesIO
+
+from blend_store import BlendStore
+from request_body import (DEFAULT_MAX_BODY_BYTES, JSONFieldParser, MultipartFileParser,
+                          error_status, receive_body)
+from server_common import (DEFAULT_REQUEST_TIMEOUT, DEFAULT_WORKERS, KeepAliveMixin,
+                           PooledHTTPServer, PrecompressedFileMixin, add_server_arguments,
+                           create_ssl_context)
 
 PORT = 5000
 BLENDS_DIR = Path(__file__).parent / "blends"
 CERT_FILE = "cert.pem"
 KEY_FILE = "key.pem"
 
-
-class ReuseAddrTCPServer(socketserver.TCPServer):
-    """TCP Server with SO_REUSEADDR enabled."""
-    allow_reuse_address = True
+# Cached blend listing and contents
+BLEND_STORE = BlendStore(BLENDS_DIR)
 
 
-class BlendServerHandler(http.server.SimpleHTTPRequestHandler):
+class BlendServerHandler(KeepAliveMixin, PrecompressedFileMixin, http.server.SimpleHTTPRequestHandler):
     """HTTP handler with blend file upload/download support."""
 
     def do_GET(self):
@@ -79,16 +82,16 @@ class BlendServerHandler(http.server.SimpleHTTPRequestHandler):
 
             # API: Save blend file
             if parsed.path == '/api/blend/save':
-                result = self.save_blend()
-                self.send_json_response(result)
+                self.send_json_response(*self.save_blend())
                 return
 
             # API: Upload blend file
             if parsed.path == '/api/blend/upload':
-                result = self.upload_blend()
-                self.send_json_response(result)
+                self.send_json_response(*self.upload_blend())
                 return
 
+            # Request body was not read; don't reuse the connection
+            self.close_connection = True
             self.send_error(404, "Not Found")
 
         except (ConnectionResetError, BrokenPipeError, ssl.SSLError) as e:
@@ -103,95 +106,89 @@ class BlendServerHandler(http.server.SimpleHTTPRequestHandler):
 
     def send_json_response(self, data, status=200):
         """Send JSON response."""
+        body = json.dumps(data).encode()
         self.send_response(status)
         self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
         self.send_header('Access-Control-Allow-Origin', '*')
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
+        self.wfile.write(body)
 
     def list_blends(self):
         """List all blend files."""
         try:
             BLENDS_DIR.mkdir(exist_ok=True)
-            files = []
-            for f in BLENDS_DIR.glob("*.md"):
-                stat = f.stat()
-                files.append({
-                    'filename': f.name,  # Changed from 'name' to 'filename' to match client expectations
-                    'size': stat.st_size,
-                    'modified': stat.st_mtime
-                })
-            return {'success': True, 'blends': files}
+            # 'filename' (not 'name') to match client expectations
+            return {'success': True, 'blends': BLEND_STORE.listing('filename')}
         except Exception as e:
             return {'success': False, 'error': str(e), 'blends': []}
 
     def load_blend(self, filename):
         """Load a blend file."""
         try:
-            filepath = BLENDS_DIR / filename
-            if not filepath.exists():
+            content = BLEND_STORE.read(filename)
+            if content is None:
                 return {'success': False, 'error': 'File not found'}
-
-            content = filepath.read_text(encoding='utf-8')
             return {'success': True, 'content': content, 'filename': filename}
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
+    def stream_body(self, parser):
+        """Stream the request body through a request_body parser; returns its result."""
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+            return receive_body(self.rfile, content_length, parser)
+        except Exception:
+            # The body may be partly unread; don't reuse the connection
+            self.close_connection = True
+            raise
+
     def save_blend(self):
-        """Save blend content to file."""
+        """Save blend content to file; returns (result, HTTP status)."""
         try:
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            data = json.loads(post_data.decode('utf-8'))
+            parser = JSONFieldParser(BLENDS_DIR, stream_field='content',
+                                     max_bytes=self.server.max_body_bytes)
+            data, content_path = self.stream_body(parser)
+        except Exception as e:
+            return {'success': False, 'error': str(e)}, error_status(e)
 
-            filename = data.get('filename', 'blend.md')
-            content = data.get('content', '')
+        try:
+            filename = str(data.get('filename', 'blend.md'))
 
-            BLENDS_DIR.mkdir(exist_ok=True)
-            filepath = BLENDS_DIR / filename
-            filepath.write_text(content, encoding='utf-8')
+            if content_path is None:
+                BLEND_STORE.write(filename, '')
+            else:
+                BLEND_STORE.commit(filename, content_path)
 
-            return {'success': True, 'message': f'Saved {filename}'}
+            return {'success': True, 'message': f'Saved {filename}'}, 200
         except Exception as e:
-            return {'success': False, 'error': str(e)}
+            return {'success': False, 'error': str(e)}, 200
 
     def upload_blend(self):
-        """Handle file upload."""
+        """Handle file upload; returns (result, HTTP status)."""
+        content_type = self.headers.get('Content-Type', '')
+        if 'multipart/form-data' not in content_type:
+            # Request body was not read; don't reuse the connection
+            self.close_connection = True
+            return {'success': False, 'error': 'Invalid content type'}, 400
+
         try:
-            content_type = self.headers['Content-Type']
-            if 'multipart/form-data' not in content_type:
-                return {'success': False, 'error': 'Invalid content type'}
-
-            # Parse multipart form data
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-
-            # Simple boundary extraction
-            boundary = content_type.split('boundary=')[1].encode()
-            parts = post_data.split(b'--' + boundary)
-
-            for part in parts:
-                if b'filename=' in part:
-                    # Extract filename and content
-                    lines = part.split(b'\r\n')
-                    filename_line = [l for l in lines if b'filename=' in l][0]
-                    filename = filename_line.split(b'filename="')[1].split(b'"')[0].decode()
-
-                    # Find content (after empty line)
-                    content_start = part.find(b'\r\n\r\n') + 4
-                    content_end = len(part) - 2  # Remove trailing \r\n
-                    content = part[content_start:content_end].decode('utf-8')
-
-                    # Save file
-                    BLENDS_DIR.mkdir(exist_ok=True)
-                    filepath = BLENDS_DIR / filename
-                    filepath.write_text(content, encoding='utf-8')
-
-                    return {'success': True, 'message': f'Uploaded {filename}'}
-
-            return {'success': False, 'error': 'No file in upload'}
+            # Parse multipart form data; the file goes straight to a temp file
+            parser = MultipartFileParser(content_type, BLENDS_DIR,
+                                         max_bytes=self.server.max_body_bytes)
+            filename, file_path = self.stream_body(parser)
         except Exception as e:
-            return {'success': False, 'error': str(e)}
+            self.close_connection = True
+            return {'success': False, 'error': str(e)}, error_status(e)
+
+        try:
+            # Save file
+            filename = os.path.basename(filename)
+            BLEND_STORE.commit(filename, file_path)
+
+            return {'success': True, 'message': f'Uploaded {filename}'}, 200
+        except Exception as e:
+            return {'success': False, 'error': str(e)}, 200
 
 
 def get_local_ip():
@@ -207,7 +204,8 @@ def get_local_ip():
         return "localhost"
 
 
-def run_server():
+def run_server(port=PORT, workers=DEFAULT_WORKERS, timeout=DEFAULT_REQUEST_TIMEOUT,
+               max_body_bytes=DEFAULT_MAX_BODY_BYTES):
     """Run the HTTPS server."""
     # Ensure certificates exist
     if not os.path.exists(CERT_FILE) or not os.path.exists(KEY_FILE):
@@ -218,20 +216,11 @@ def run_server():
     # Ensure blends directory exists
     BLENDS_DIR.mkdir(exist_ok=True)
 
-    # Create server
-    with ReuseAddrTCPServer(("", PORT), BlendServerHandler) as httpd:
-        # Wrap with SSL
-        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
-        context.minimum_version = ssl.TLSVersion.TLSv1_2
-        context.load_cert_chain(CERT_FILE, KEY_FILE)
-
-        # Wrap the socket with SSL
-        httpd.socket = context.wrap_socket(
-            httpd.socket,
-            server_side=True,
-            do_handshake_on_connect=True
-        )
-
+    # Create server; TLS handshakes run in the worker threads
+    context = create_ssl_context(CERT_FILE, KEY_FILE)
+    with PooledHTTPServer(("", port), BlendServerHandler, ssl_context=context,
+                          workers=workers, request_timeout=timeout,
+                          max_body_bytes=max_body_bytes) as httpd:
         local_ip = get_local_ip()
 
         print(f"""
@@ -240,8 +229,9 @@ def run_server():
 ╚══════════════════════════════════════════════════════════╝
 
 🌐 Server running at:
-   • Local:  https://localhost:{PORT}
-   • Network: https://{local_ip}:{PORT}
+   • Local:  https://localhost:{port}
+   • Network: https://{local_ip}:{port}
+   ({httpd.workers} worker threads, {httpd.request_timeout:g}s request timeout)
 
 ✅ Features enabled:
    • Static file serving
@@ -257,7 +247,7 @@ def run_server():
    Your browser will show a security warning.
    
    On your Android phone:
-   1. Visit https://{local_ip}:{PORT}
+   1. Visit https://{local_ip}:{port}
    2. Click "Advanced" or "Details"
    3. Click "Proceed" or "Accept risk"
    4. Camera will work! ✅
@@ -271,5 +261,9 @@ Press Ctrl+C to stop the server
 
 
 if __name__ == '__main__':
-    run_server()
+    parser = argparse.ArgumentParser(description='Blend Builder HTTPS server')
+    parser.add_argument('--port', type=int, default=PORT)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+    run_server(args.port, args.workers, args.timeout, args.max_body)
 
@@ -253,6 +253,25 @@ const RULEBOOK_PARAMETERS = {
     required: ['key']
 };
 
+const SEARCH_CARDS_DESCRIPTION =
+    'Search all cards by name, ability text, type, set, faction access and persuasion cost. ' +
+    'Words match by prefix ("atre" finds "Atreides"); every given filter must match. ' +
+    'Use this to find specific cards instead of listing whole resource types.';
+const SEARCH_CARDS_PARAMETERS = {
+    type: 'object',
+    properties: {
+        q:        { type: 'string', description: 'Words from the card name.' },
+        ability:  { type: 'string', description: 'Words from the agent/reveal ability or effect text, e.g. "trash".' },
+        type:     { type: 'string', description: 'Resource types, comma-separated (imperium, intrigue, tleilax, reserve, tech, contracts, leader, sardaukar, starter, conflict).' },
+        set:      { type: 'string', description: 'Card sets, comma-separated (base, ix, immortality, uprising, bloodlines, ...).' },
+        access:   { type: 'string', description: 'Required faction board access, comma-separated (green, purple, yellow, emperor, spacing_guild, bene_gesserit, fremen, spy).' },
+        min_cost: { type: 'integer', description: 'Minimum persuasion cost.' },
+        max_cost: { type: 'integer', description: 'Maximum persuasion cost.' },
+        limit:    { type: 'integer', description: 'Maximum results (default 25).' }
+    },
+    required: []
+};
+
 const WIKIPEDIA_DESCRIPTION =
     'Search Wikipedia and return the plain-text summary of the best matching article. ' +
     'Use this for lore, rules clarifications, card names, or any factual question.';
@@ -339,6 +358,27 @@ const MISTRAL_TOOLS = [
     ...SEARCH_TOOLS_MISTRAL
 ];
 
+// Indexed card search is served by the local server (/api/cards/search)
+function canSearchCards() {
+    return typeof serverFeatures !== 'undefined' && !!serverFeatures?.canSearchCards;
+}
+
+function geminiTools() {
+    if (!canSearchCards()) return GEMINI_TOOLS;
+    return [{ functionDeclarations: [
+        ...GEMINI_TOOLS[0].functionDeclarations,
+        { name: 'search_cards', description: SEARCH_CARDS_DESCRIPTION, parameters: SEARCH_CARDS_PARAMETERS }
+    ] }];
+}
+
+function mistralTools() {
+    if (!canSearchCards()) return MISTRAL_TOOLS;
+    return [
+        ...MISTRAL_TOOLS,
+        { type: 'function', function: { name: 'search_cards', description: SEARCH_CARDS_DESCRIPTION, parameters: SEARCH_CARDS_PARAMETERS } }
+    ];
+}
+
 const VALID_RESOURCE_TYPES = new Set([
     'imperium', 'intrigue', 'tleilax', 'reserve', 'tech',
     'contracts', 'leader', 'sardaukar', 'starter', 'conflict'
@@ -362,6 +402,7 @@ function toolLabel(name, args) {
     if (name === 'web_search')              return `search:${a.query}`;
     if (name === 'fetch_url')               return `fetch:${a.url}`;
     if (name === 'fetch_rulebook')          return `rulebook:${a.key}`;
+    if (name === 'search_cards')            return `cards:${a.q || a.ability || a.type || 'search'}`;
     if (name === 'wikipedia_search')        return `wiki:${a.query}`;
     if (name === 'render_chart')            return `chart:${a.title || a.type}`;
     return typeof name === 'string' ? name : '?';
@@ -574,7 +615,7 @@ async function executeToolAsync(name, args) {
         if (!safe) return { error: 'Invalid filename.' };
         if (!window.loadParsedBlendData) return { error: 'loadParsedBlendData not available.' };
         try {
-            const resp = await fetch(`blends/${safe}?t=${Date.now()}`, { cache: 'no-store' });
+            const resp = await fetch(`blends/${safe}`, { cache: 'no-cache' });
             if (!resp.ok) return { error: `Blend not found: ${safe}` };
             const text = await resp.text();
             if (!window.parseBlendFile) return { error: 'parseBlendFile not available.' };
@@ -614,7 +655,33 @@ async function executeToolAsync(name, args) {
         }
     }
 
+    if (name === 'search_cards') {
+        const params = new URLSearchParams();
+        for (const k of ['q', 'ability', 'type', 'set', 'access', 'min_cost', 'max_cost', 'limit']) {
+            if (args[k] !== undefined && args[k] !== null && args[k] !== '') params.set(k, args[k]);
+        }
+        try {
+            const resp = await fetch(`/api/cards/search?${params}`, { signal: activeAbortController?.signal });
+            const data = await resp.json();
+            if (!resp.ok) return { error: data.error || `Card search returned HTTP ${resp.status}` };
+            return { total: data.total, results: data.results };
+        } catch (e) {
+            return { error: `search_cards failed: ${e.message}` };
+        }
+    }
+
     if (name === 'fetch_rulebook') {
+        // Local server keeps extracted rulebook text cached; fall back to the remote proxy
+        if (typeof serverFeatures !== 'undefined' && serverFeatures?.canServeRulebooks) {
+            try {
+                const resp = await fetch(`/api/search/pdf?key=${encodeURIComponent(args.key)}`, {
+                    signal: activeAbortController?.signal,
+                });
+                if (resp.ok) return { content: await resp.text() };
+            } catch (e) {
+                if (e.name === 'AbortError') return { error: `fetch_rulebook failed: ${e.message}` };
+            }
+        }
         if (!SEARCH_PROXY_URL) return { error: 'Search proxy not configured.' };
         try {
             const resp = await fetch(`${SEARCH_PROXY_URL}/pdf?key=${encodeURIComponent(args.key)}`, {
@@ -712,8 +779,17 @@ function parseSelectionItem(str) {
     return { count: m[1] ? parseInt(m[1], 10) : 1, name: m[2].trim(), source: m[3].trim() };
 }
 
+// Run fn with the page's stats panel redraws deferred to one per resource type
+function batchStats(fn) {
+    return window.batchStatsUpdates ? window.batchStatsUpdates(fn) : fn();
+}
+
 // Apply a selections array to a resource type. Returns count of items processed.
 function applySelections(type, selections) {
+    return batchStats(() => applySelectionsNow(type, selections));
+}
+
+function applySelectionsNow(type, selections) {
     const allRes    = window.getAllResources ? window.getAllResources() : {};
     const typeItems = allRes[type];
     if (!typeItems) return 0;
@@ -872,7 +948,8 @@ Always count **physical copies**, not unique entries. A selection string "2× Ca
    Use get_blend_statistics for percentages — never calculate them yourself.
 3. Use get_blend to read saved blends (list first, then open by exact filename).
    Each line in a blend file: \`[N×] Resource Name (Expansion)\` — N× means N copies.
-4. Use wikipedia_search to look up lore, rules, card details, or Dune universe information.${SEARCH_PROXY_URL ? `
+4. Use wikipedia_search to look up lore, rules, card details, or Dune universe information.${canSearchCards() ? `
+   Use search_cards to find specific cards by name, ability text, set, faction access or cost without listing a whole resource type.` : ''}${SEARCH_PROXY_URL ? `
 5. Use web_search to find current information about Dune: Imperium cards, rules, or strategy.
    Use fetch_url to read a specific URL directly — works well with open APIs like dunecardshub.com/api/decks and reddit.com/r/duneimperium/search.json?q=QUERY&sort=relevance&limit=10
    Use fetch_rulebook to read official rulebook text. Keys: rules/base, rules/faq, rules/rise-of-ix, rules/immortality, rules/uprising, rules/uprising-supplements, rules/bloodlines.` : ''}
@@ -1165,7 +1242,7 @@ async function callGemini(apiKey, onChunk, { withTools = true } = {}) {
         contents:           geminiHistory,
         generationConfig:   { temperature: 0.1 }
     };
-    if (withTools) body.tools = GEMINI_TOOLS;
+    if (withTools) body.tools = geminiTools();
     const resp = await fetch(url, {
         method:  'POST',
         headers: { 'Content-Type': 'application/json' },
@@ -1314,7 +1391,7 @@ async function callOpenAICompat(apiKey, onChunk, provider) {
     const body = {
         model:       getActualModelId(),
         messages:    [{ role: 'system', content: buildSystemPrompt() }, ...mistralHistory],
-        tools:       MISTRAL_TOOLS,
+        tools:       mistralTools(),
         tool_choice: 'auto',
         temperature: 0.1,
         max_tokens:  32768,
@@ -2046,28 +2123,31 @@ function applyBlendSnapshot({ selections = {}, board = {}, overview = {} } = {})
         // Clear all current selections, then re-render tables at 0
         const allRes = window.getAllResources ? window.getAllResources() : {};
         for (const items of Object.values(allRes)) for (const r of items) r.selected = 0;
+        window.invalidateSelectionStats?.();
         window.initializeAllTabs?.();
 
-        // Restore selections
-        for (const [type, saved] of Object.entries(selections)) {
-            const pool = allRes[type] || [];
-            for (const s of saved) {
-                const targets = pool.filter(r =>
-                    s.resource_id !== undefined
-                        ? r.resource_id === s.resource_id
-                        : (r.objective || r.name    || '') === s.name &&
-                          (r.source    || r.card_set || '') === s.source
-                );
-                for (const r of targets) {
-                    const name  = r.objective || r.name;
-                    const src   = r.source    || r.card_set || '';
-                    const max   = r.count     || r.count_per_player || 1;
-                    const props = r.resource_id !== undefined ? { resource_id: r.resource_id } : {};
-                    const toAdd = Math.min(s.count, max) - (r.selected || 0);
-                    for (let i = 0; i < toAdd; i++) window.incrementSelected(type, name, src, max, props);
+        // Restore selections (stats panels are redrawn once below)
+        batchStats(() => {
+            for (const [type, saved] of Object.entries(selections)) {
+                const pool = allRes[type] || [];
+                for (const s of saved) {
+                    const targets = pool.filter(r =>
+                        s.resource_id !== undefined
+                            ? r.resource_id === s.resource_id
+                            : (r.objective || r.name    || '') === s.name &&
+                              (r.source    || r.card_set || '') === s.source
+                    );
+                    for (const r of targets) {
+                        const name  = r.objective || r.name;
+                        const src   = r.source    || r.card_set || '';
+                        const max   = r.count     || r.count_per_player || 1;
+                        const props = r.resource_id !== undefined ? { resource_id: r.resource_id } : {};
+                        const toAdd = Math.min(s.count, max) - (r.selected || 0);
+                        for (let i = 0; i < toAdd; i++) window.incrementSelected(type, name, src, max, props);
+                    }
                 }
             }
-        }
+        });
         for (const type of Object.keys(allRes)) window.updateBadge?.(type);
         window.updateRequiredSets?.();
         window.refreshAllStats?.();
@@ -40,8 +40,43 @@ async function detectServerFeatures() {
     return serverFeatures;
 }
 
+// Rebuild resource objects from the columnar resources.compact.json payload
+// (see build_compact_payload() in generate_resources_json.py)
+function decodeCompactResources(payload) {
+    const resources = {};
+    for (const [type, table] of Object.entries(payload.types)) {
+        const rows = [];
+        for (let r = 0; r < table.n; r++) {
+            rows.push({});
+        }
+        table.k.forEach((key, k) => {
+            const column = table.c[k];
+            if (Array.isArray(column)) {
+                for (let r = 0; r < table.n; r++) rows[r][key] = column[r];
+            } else if ('c' in column) {
+                for (let r = 0; r < table.n; r++) rows[r][key] = column.c;
+            } else {
+                for (let r = 0; r < table.n; r++) rows[r][key] = '';
+                column.i.forEach((r, j) => { rows[r][key] = column.v[j]; });
+            }
+        });
+        resources[type] = rows;
+    }
+    return resources;
+}
+
 // Load resources from JSON file
 async function loadResources() {
+    // Prefer the compact columnar payload (served precompressed by the local servers)
+    try {
+        const response = await fetch('resources.compact.json');
+        if (response.ok) {
+            return decodeCompactResources(await response.json());
+        }
+    } catch (error) {
+        console.warn('Compact resources unavailable, falling back to resources.json:', error);
+    }
+
     try {
         const response = await fetch('resources.json');
         if (!response.ok) {
@@ -55,6 +90,80 @@ async function loadResources() {
     }
 }
 
+// Sharded resources (data/resources/, see write_resource_shards() in
+// generate_resources_json.py): the first tab's shard is loaded up front and
+// the other resource types are fetched on demand
+const RESOURCE_SHARDS_URL = 'data/resources';
+const PRIORITY_RESOURCE_TYPE = 'imperium';
+let resourceManifest = null;
+const resourceShardRequests = {};
+
+async function loadResourceManifest() {
+    if (!resourceManifest) {
+        const response = await fetch(`${RESOURCE_SHARDS_URL}/manifest.json`, { cache: 'no-cache' });
+        if (!response.ok) {
+            throw new Error('Failed to load resource manifest');
+        }
+        resourceManifest = await response.json();
+    }
+    return resourceManifest;
+}
+
+// Fetch one resource type (deduplicated; the content hash in the URL keeps it cacheable)
+function loadResourceType(type) {
+    if (!resourceShardRequests[type]) {
+        const entry = resourceManifest?.types?.[type];
+        if (!entry) {
+            return Promise.resolve(null);
+        }
+        resourceShardRequests[type] = fetch(`${RESOURCE_SHARDS_URL}/${entry.file}?v=${entry.hash}`)
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(`Failed to load ${entry.file}`);
+                }
+                return response.json();
+            })
+            .then(payload => decodeCompactResources(payload)[type])
+            .catch(error => {
+                delete resourceShardRequests[type];
+                throw error;
+            });
+    }
+    return resourceShardRequests[type];
+}
+
+// Load only the first tab's resources when sharded data is available,
+// otherwise everything at once
+async function loadInitialResources() {
+    try {
+        await loadResourceManifest();
+        const resources = await loadResourceType(PRIORITY_RESOURCE_TYPE);
+        if (resources) {
+            return { [PRIORITY_RESOURCE_TYPE]: resources };
+        }
+    } catch (error) {
+        console.warn('Sharded resources unavailable, loading full catalog:', error);
+    }
+    return loadResources();
+}
+
+// Load every resource type not in `loaded`, calling onType(type, resources) as each arrives
+async function loadRemainingResources(loaded, onType) {
+    if (!resourceManifest) return;
+    const types = Object.keys(resourceManifest.types).filter(type => !(type in loaded));
+    try {
+        await Promise.all(types.map(type =>
+            loadResourceType(type).then(resources => onType(type, resources || []))
+        ));
+    } catch (error) {
+        console.warn('Resource shard failed to load, loading full catalog:', error);
+        const resources = await loadResources();
+        Object.keys(resources)
+            .filter(type => !(type in loaded))
+            .forEach(type => onType(type, resources[type]));
+    }
+}
+
 // List available blend files
 async function listBlends() {
     try {
@@ -73,14 +182,8 @@ async function listBlends() {
             return await response.json();
         }
 
-        // Fallback to index.json for static hosting
-        const indexResponse = await fetch(`blends/index.json${cacheBuster}`, {
-            cache: 'no-store',
-            headers: {
-                'Cache-Control': 'no-cache, no-store, must-revalidate',
-                'Pragma': 'no-cache'
-            }
-        });
+        // Fallback to index.json for static hosting (revalidated via ETag)
+        const indexResponse = await fetch('blends/index.json', { cache: 'no-cache' });
         if (indexResponse.ok) {
             return await indexResponse.json();
         }
@@ -95,15 +198,8 @@ async function listBlends() {
 // Load a specific blend file
 async function loadBlend(filename) {
     try {
-        // Add cache-busting timestamp to force fresh load
-        const cacheBuster = `?t=${Date.now()}`;
-        const response = await fetch(`blends/${filename}${cacheBuster}`, {
-            cache: 'no-store',
-            headers: {
-                'Cache-Control': 'no-cache, no-store, must-revalidate',
-                'Pragma': 'no-cache'
-            }
-        });
+        // Always revalidate; an unchanged blend costs a 304 instead of a download
+        const response = await fetch(`blends/${filename}`, { cache: 'no-cache' });
         if (!response.ok) {
             throw new Error(`Failed to load blend: ${filename}`);
         }
@@ -115,6 +211,19 @@ async function loadBlend(filename) {
     }
 }
 
+// Precomputed stats of the official blends (blends/baselines.json, written by
+// build_data.py), fetched once; resolves to null when the file is missing
+let blendBaselinesRequest = null;
+
+function loadBlendBaselines() {
+    if (!blendBaselinesRequest) {
+        blendBaselinesRequest = fetch('blends/baselines.json', { cache: 'no-cache' })
+            .then(response => response.ok ? response.json() : null)
+            .catch(() => null);
+    }
+    return blendBaselinesRequest;
+}
+
 // Parse blend markdown file into structured data
 function parseBlendFile(content) {
     const resources_by_type = {};
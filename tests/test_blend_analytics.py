@@ -0,0 +1,60 @@
+import pytest
+
+import blend_analytics
+from blend_analytics import find_blends, location_error
+
+
+@pytest.fixture
+def blends_dir(tmp_path, monkeypatch):
+    directory = tmp_path / 'blends'
+    directory.mkdir()
+    for name in ('a.md', 'b.md'):
+        (directory / name).write_text('# Blend\n')
+    monkeypatch.setattr(blend_analytics, 'BLENDS_DIR', directory)
+    return directory
+
+
+def test_find_blends_skips_files_already_found(blends_dir, tmp_path):
+    extra = tmp_path / 'extra'
+    extra.mkdir()
+    (extra / 'c.md').write_text('# Blend\n')
+    paths = find_blends([str(blends_dir / 'a.md'), str(extra), str(extra / 'c.md'), str(blends_dir)])
+    assert [path.name for path in paths] == ['a.md', 'b.md', 'c.md']
+
+
+def test_find_blends_without_a_blends_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(blend_analytics, 'BLENDS_DIR', tmp_path / 'missing')
+    (tmp_path / 'x.md').write_text('# Blend\n')
+    assert find_blends([str(tmp_path / 'x.md')]) == [tmp_path / 'x.md']
+
+
+def test_missing_location_is_a_usage_error(tmp_path, monkeypatch, capsys):
+    missing = tmp_path / 'nope.md'
+    assert location_error(str(missing)) == f"{missing}: no such file or directory"
+    assert location_error(str(tmp_path)) is None
+
+    monkeypatch.setattr('sys.argv', ['blend_analytics.py', str(missing)])
+    with pytest.raises(SystemExit) as exit_info:
+        blend_analytics.main()
+    assert exit_info.value.code == 2
+    assert 'no such file or directory' in capsys.readouterr().err
+
+
+def test_overlap_matches_the_similarity_index():
+    pytest.importorskip('numpy')
+    from blend_codec import parse_blend
+    from blend_similarity import MinHashIndex, blend_shingles
+
+    shared = '- Spice Hunter (Uprising)\n- Arrakis Recruiter (Uprising)\n- Bribery (Imperium)\n'
+    texts = {
+        'a.md': '# A\n\n## Imperium Cards\n- 2× Spice Hunter (Uprising)\n' + shared,
+        'b.md': '# B\n\n## Imperium Cards\n' + shared + '- Sardaukar Soldier (Uprising)\n',
+    }
+    shingles = {name: blend_shingles(parse_blend(text)) for name, text in texts.items()}
+    index = MinHashIndex()
+    for name, items in shingles.items():
+        index.add(name, items)
+    (jaccard, _, other), = index.query('a.md')
+    assert other == 'b.md'
+    assert blend_analytics.jaccard_matrix([shingles['a.md'], shingles['b.md']])[0, 1] == \
+        pytest.approx(jaccard) == 0.75
@@ -0,0 +1,49 @@
+import pytest
+
+from card_names import NameResolver
+from enrich_ratings import build_lookup, build_name_resolvers, compute_sheet_ratings
+
+NAMES = ['Harvest 4+ Spice', 'Sardaukar Legion', 'Ruthless Leadership', 'Ornithopter',
+         'Conflict II', 'Spice Hunter', 'Spice Hunted']
+
+
+@pytest.fixture
+def resolver():
+    return NameResolver(NAMES)
+
+
+@pytest.mark.parametrize('name', ['Harvest 3+ Spice', 'Harvest Spice', 'Conflict III',
+                                  'Sardaukar Legions', 'Ornithopters'])
+def test_near_miss_names_of_other_cards_are_not_resolved(resolver, name):
+    assert resolver.resolve(name) is None
+
+
+@pytest.mark.parametrize('name, expected', [('Ruthless Leadeship', 'Ruthless Leadership'),
+                                            ('Ornitopter', 'Ornithopter'),
+                                            ('harvest 4+ spice', 'Harvest 4+ Spice')])
+def test_typos_are_resolved(resolver, name, expected):
+    assert resolver.resolve(name).name == expected
+
+
+def test_match_without_a_clear_margin_over_the_runner_up_is_rejected(resolver):
+    # One edit from both "Spice Hunter" and "Spice Hunted"
+    assert resolver.resolve('Spice Hunte') is None
+
+
+def test_resolve_all_matches_resolve(resolver):
+    names = ['Ornitopter', 'Harvest 3+ Spice', 'Ornitopter', 'spice hunter']
+    assert {name: match and match.name for name, match in resolver.resolve_all(names).items()} == \
+        {'Ornitopter': 'Ornithopter', 'Harvest 3+ Spice': None, 'spice hunter': 'Spice Hunter'}
+
+
+def test_missing_card_does_not_get_a_near_miss_rating(capsys):
+    cards = [{'card': {'name': name, 'type': 'imperium', 'expansion': 'Uprising'},
+              'rating': rating, 'votesCount': 10}
+             for name, rating in [('Harvest 4+ Spice', 4.0), ('Ornithopter', 3.0)]]
+    rows = [('Name', 'Source'), ('Harvest 3+ Spice', 'Uprising'), ('Ornitopter', 'Uprising')]
+    changes, _ = compute_sheet_ratings(rows, 'Imperium', build_lookup(cards), 'imperium',
+                                       build_name_resolvers(cards)['imperium'])
+    assert changes == {3: (3.0, 10, 'B')}
+    output = capsys.readouterr().out
+    assert "'Ornitopter' -> 'ornithopter'" in output
+    assert "'Harvest 3+ Spice' [Uprising]" in output
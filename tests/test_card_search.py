@@ -0,0 +1,24 @@
+from card_search import CardIndex
+
+RESOURCES = {
+    'imperium': [
+        {'resource_type': 'imperium', 'name': 'Spice Hunter', 'fremen_access': 'X'},
+        {'resource_type': 'imperium', 'name': 'Sardaukar Legion', 'emperor_access': ' x '},
+        {'resource_type': 'imperium', 'name': 'Guild Bankers', 'spacing_guild_access': 'no'},
+    ],
+}
+
+
+def test_access_counts_only_x_marked_cells():
+    index = CardIndex(RESOURCES)
+    assert [c['name'] for c in index.search(access=['fremen'])['results']] == ['Spice Hunter']
+    assert [c['name'] for c in index.search(access=['emperor'])['results']] == ['Sardaukar Legion']
+    assert index.search(access=['spacing_guild'])['total'] == 0
+    assert 'access' not in index.summary(2)
+
+
+def test_query_without_searchable_tokens_matches_nothing():
+    index = CardIndex(RESOURCES)
+    assert index.search(q='!!!')['total'] == 0
+    assert index.search(ability='...')['total'] == 0
+    assert index.search(q='spice')['total'] == 1
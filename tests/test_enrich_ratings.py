@@ -0,0 +1,159 @@
+import functools
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+import requests
+
+import enrich_ratings
+from enrich_ratings import RATINGS_PATH, PageCache, create_session, fetch_all_ratings, fetch_page
+
+LAST_MODIFIED = 'Wed, 01 Oct 2025 00:00:00 GMT'
+
+
+def rating_page(page, total_pages, names):
+    return {
+        'data': [{'card': {'name': name, 'type': 'imperium', 'expansion': 'Uprising'},
+                  'rating': 4, 'votesCount': 10} for name in names],
+        'pagination': {'page': page, 'totalPages': total_pages},
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Ratings API stand-in with ETag and Last-Modified revalidation."""
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        page = int(parse_qs(parts.query).get('page', ['1'])[0])
+        server = self.server
+        with server.lock:
+            server.requests.append((page, self.headers.get('If-None-Match'),
+                                    self.headers.get('If-Modified-Since')))
+            failing = server.failures.get(page, 0)
+            if failing:
+                server.failures[page] = failing - 1
+        if parts.path != RATINGS_PATH or page not in server.pages:
+            self.send_error(404)
+            return
+        if failing:
+            self.send_error(503)
+            return
+
+        etag = f'"page-{page}-v{server.version}"'
+        if server.validator == 'etag' and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        if server.validator == 'last-modified' and \
+                self.headers.get('If-Modified-Since') == LAST_MODIFIED:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        body = json.dumps(server.pages[page]).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if server.validator == 'etag':
+            self.send_header('ETag', etag)
+        else:
+            self.send_header('Last-Modified', LAST_MODIFIED)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def ratings_api():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.pages = {1: rating_page(1, 3, ['Arrakis Recruiter']),
+                    2: rating_page(2, 3, ['Spice Hunter']),
+                    3: rating_page(3, 3, ['Sardaukar Soldier'])}
+    server.requests = []
+    server.failures = {}
+    server.validator = 'etag'
+    server.version = 1
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05})
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(enrich_ratings, 'create_session', functools.partial(create_session, backoff=0))
+
+
+def card_names(cards):
+    return [c['card']['name'] for c in cards]
+
+
+@pytest.mark.parametrize('validator', ['etag', 'last-modified'])
+def test_not_modified_page_keeps_the_cached_body(ratings_api, tmp_path, validator):
+    ratings_api.validator = validator
+    cache = PageCache(tmp_path, ratings_api.url)
+    with create_session(backoff=0) as session:
+        first = fetch_page(session, ratings_api.url, 2, cache)
+        ratings_api.pages[2] = rating_page(2, 3, ['Changed Upstream'])
+        # The server answers 304, so the stored body is returned, not the new one
+        assert fetch_page(session, ratings_api.url, 2, cache) == first
+
+    (_, etag, since), (_, revalidate_etag, revalidate_since) = ratings_api.requests
+    assert etag is None and since is None
+    if validator == 'etag':
+        assert revalidate_etag == '"page-2-v1"' and revalidate_since is None
+    else:
+        assert revalidate_since == LAST_MODIFIED and revalidate_etag is None
+    assert cache.load(2)['data'] == first
+
+
+def test_modified_page_replaces_the_cached_body(ratings_api, tmp_path):
+    cache = PageCache(tmp_path, ratings_api.url)
+    with create_session(backoff=0) as session:
+        fetch_page(session, ratings_api.url, 2, cache)
+        ratings_api.pages[2] = rating_page(2, 3, ['Changed Upstream'])
+        ratings_api.version = 2
+        assert card_names(fetch_page(session, ratings_api.url, 2, cache)['data']) == ['Changed Upstream']
+    assert cache.load(2)['etag'] == '"page-2-v2"'
+
+
+def test_fetch_all_ratings_retries_server_errors(ratings_api, tmp_path):
+    ratings_api.failures = {2: 2, 3: 1}
+    cards = fetch_all_ratings(ratings_api.url, workers=2, cache_dir=tmp_path)
+    assert card_names(cards) == ['Arrakis Recruiter', 'Spice Hunter', 'Sardaukar Soldier']
+    pages = [page for page, _, _ in ratings_api.requests]
+    assert pages.count(1) == 1 and pages.count(2) == 3 and pages.count(3) == 2
+
+
+def test_fetch_all_ratings_falls_back_to_the_cache_when_retries_run_out(ratings_api, tmp_path):
+    fetch_all_ratings(ratings_api.url, workers=2, cache_dir=tmp_path)
+    # More failures than the session retries
+    ratings_api.failures = {3: 10}
+    cards = fetch_all_ratings(ratings_api.url, workers=2, cache_dir=tmp_path)
+    assert card_names(cards) == ['Arrakis Recruiter', 'Spice Hunter', 'Sardaukar Soldier']
+    assert ratings_api.failures[3] == 6
+
+
+def test_fetch_all_ratings_without_a_cached_copy_raises_when_retries_run_out(ratings_api, tmp_path):
+    ratings_api.failures = {2: 10}
+    with pytest.raises(requests.RequestException):
+        fetch_all_ratings(ratings_api.url, workers=2, cache_dir=tmp_path)
+
+
+def test_offline_run_replays_the_cache(ratings_api, tmp_path):
+    fetch_all_ratings(ratings_api.url, workers=2, cache_dir=tmp_path)
+    requests_made = len(ratings_api.requests)
+    cards = fetch_all_ratings(ratings_api.url, workers=2, cache_dir=tmp_path, offline=True)
+    assert card_names(cards) == ['Arrakis Recruiter', 'Spice Hunter', 'Sardaukar Soldier']
+    assert len(ratings_api.requests) == requests_made
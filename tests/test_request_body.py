@@ -0,0 +1,18 @@
+import asyncio
+import socket
+
+import pytest
+
+from request_body import RequestBodyError, RequestBodyTooLarge, error_status
+
+
+@pytest.mark.parametrize('error, status', [
+    (RequestBodyTooLarge(10), 413),
+    (RequestBodyError('bad body'), 400),
+    (TimeoutError(), 408),
+    (asyncio.TimeoutError(), 408),
+    (socket.timeout(), 408),
+    (ValueError('bad'), 400),
+])
+def test_error_status(error, status):
+    assert error_status(error) == status
@@ -0,0 +1,169 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from search_proxy import MAX_TEXT_CHARS, SearchProxy, html_to_text
+
+
+# /big is ~10 MB of text, far beyond the text budget
+BIG_PARAGRAPHS = 1000
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Upstream stand-in for SearXNG and fetched pages."""
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        with self.server.lock:
+            self.server.requests.append(parts.path)
+
+        if parts.path == '/search':
+            query = parse_qs(parts.query)['q'][0]
+            body = json.dumps({'results': [
+                {'title': query, 'url': f'https://example.com/{query}', 'content': 'snippet'}
+            ]}).encode()
+            self.send_body(body, 'application/json')
+        elif parts.path == '/slow':
+            time.sleep(0.3)
+            self.send_body(b'<p>slow page</p>')
+        elif parts.path == '/page':
+            self.send_body(b'<html><script>x()</script><p>Hello <b>world</b></p></html>')
+        elif parts.path == '/drop':
+            # Answer, then hang up without announcing it: the pooled connection goes stale
+            self.send_body(b'<p>dropped</p>')
+            self.close_connection = True
+        elif parts.path == '/big':
+            paragraph = b'<p>' + b'word ' * 2000 + b'</p>'
+            total = len(paragraph) * BIG_PARAGRAPHS
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', str(total))
+            self.end_headers()
+            try:
+                for _ in range(BIG_PARAGRAPHS):
+                    self.wfile.write(paragraph)
+                    with self.server.lock:
+                        self.server.big_bytes_sent += len(paragraph)
+            except OSError:
+                self.close_connection = True
+        else:
+            self.send_error(404)
+
+    def send_body(self, body, content_type='text/html; charset=utf-8'):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def upstream():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    # Clients hanging up mid-response are expected here
+    server.handle_error = lambda request, client_address: None
+    server.lock = threading.Lock()
+    server.connections = 0
+    server.requests = []
+    server.big_bytes_sent = 0
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05})
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+@pytest.fixture
+def proxy(upstream):
+    proxy = SearchProxy(upstream.url, timeout=5)
+    yield proxy
+    proxy.close()
+
+
+def test_search_reuses_a_pooled_connection(upstream, proxy):
+    assert proxy.search('spice')['results'][0]['title'] == 'spice'
+    assert proxy.search('melange')['results'][0]['title'] == 'melange'
+    assert upstream.requests == ['/search', '/search']
+    assert upstream.connections == 1
+
+
+def test_concurrent_identical_fetches_are_coalesced(upstream, proxy):
+    with ThreadPoolExecutor(8) as executor:
+        texts = list(executor.map(lambda _: proxy.fetch_text(f"{upstream.url}/slow"), range(8)))
+    assert texts == ['slow page'] * 8
+    assert upstream.requests == ['/slow']
+
+
+def test_cached_results_expire_after_the_ttl(upstream):
+    proxy = SearchProxy(upstream.url, timeout=5, cache_ttl=0.2)
+    try:
+        proxy.fetch_text(f"{upstream.url}/page")
+        assert proxy.fetch_text(f"{upstream.url}/page") == 'Hello world'
+        assert upstream.requests == ['/page']
+        time.sleep(0.3)
+        proxy.fetch_text(f"{upstream.url}/page")
+        assert upstream.requests == ['/page', '/page']
+    finally:
+        proxy.close()
+
+
+def test_fetch_stops_reading_once_the_text_budget_is_filled(upstream, proxy):
+    text = proxy.fetch_text(f"{upstream.url}/big")
+    # Cut at the budget (a trailing space is stripped)
+    assert MAX_TEXT_CHARS - 1 <= len(text) <= MAX_TEXT_CHARS
+    assert text.startswith('word word')
+    # The rest of the page was not read, so the connection is not pooled
+    assert not any(proxy.pool._idle.values())
+    time.sleep(0.2)
+    assert upstream.big_bytes_sent < len(b'<p>' + b'word ' * 2000 + b'</p>') * BIG_PARAGRAPHS
+
+
+def test_stale_pooled_connection_is_retried_on_a_fresh_one(upstream, proxy):
+    assert proxy.fetch_text(f"{upstream.url}/drop") == 'dropped'
+    time.sleep(0.1)
+    assert proxy.fetch_text(f"{upstream.url}/page") == 'Hello world'
+    assert upstream.requests == ['/drop', '/page']
+    assert upstream.connections == 2
+
+
+def test_failed_retry_closes_the_fresh_connection(upstream, proxy, monkeypatch):
+    assert proxy.fetch_text(f"{upstream.url}/drop") == 'dropped'
+    time.sleep(0.1)
+    opened = []
+    connect = proxy.pool.connect
+
+    def reset():
+        raise ConnectionResetError()
+
+    def failing_connect(*key):
+        conn = connect(*key)
+        opened.append(conn)
+        monkeypatch.setattr(conn, 'getresponse', reset)
+        return conn
+
+    monkeypatch.setattr(proxy.pool, 'connect', failing_connect)
+    with pytest.raises(ConnectionResetError):
+        proxy.fetch_text(f"{upstream.url}/page")
+    assert len(opened) == 1 and opened[0].sock is None
+
+
+def test_html_to_text_skips_scripts_and_collapses_whitespace():
+    assert html_to_text('<style>p{}</style><h1>Dune</h1>\n  <p>Imperium&amp;Uprising</p>') == \
+        'Dune Imperium&Uprising'
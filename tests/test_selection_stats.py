@@ -0,0 +1,108 @@
+import json
+import re
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+INDEX_HTML = Path(__file__).resolve().parent.parent / 'index.html'
+
+pytestmark = pytest.mark.skipif(shutil.which('node') is None, reason='node is not installed')
+
+
+def stats_script():
+    """The incremental selection stats block of index.html, with the helpers it uses."""
+    html = INDEX_HTML.read_text(encoding='utf-8')
+    has_x = re.search(r'^ *function hasX\(val\) \{.*?^ *\}$', html, re.M | re.S).group(0)
+    start = html.index('// Incremental selection statistics')
+    end = html.index('function updateStatsForType(type) {')
+    return has_x + '\n' + html[start:end]
+
+
+def run_node(script):
+    result = subprocess.run(['node', '-e', script], capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout)
+
+
+# Random resources of every type, then random +/- clicks; after each click the
+# running stats of the clicked type (counts and panel order) are compared with
+# a rebuild from scratch
+RANDOM_CLICKS = r"""
+let seed = 7;
+const random = () => (seed = (seed * 1103515245 + 12345) % 2147483648) / 2147483648;
+const pick = values => values[Math.floor(random() * values.length)];
+
+const CELLS = ['', ' ', 'X', 'x', '0', '0.0', '1', '2', true, undefined];
+const FIELDS = [...new Set([].concat(...Object.values(STAT_MECHANIC_FIELDS),
+                                     STAT_ACCESS_FIELDS, STAT_AFFILIATION_FIELDS))];
+const TYPES = ['imperium', 'intrigue', 'tleilax', 'reserve', 'tech', 'leader', 'conflict',
+               'contracts', 'starter'];
+const allResources = {};
+TYPES.forEach(type => {
+    allResources[type] = Array.from({length: 25}, (_, i) => {
+        const r = {name: `${type} ${i}`, selected: Math.floor(random() * 2),
+                   source: pick(['Base', 'Ix', 'Uprising', '']), house: pick(['Atreides', '']),
+                   cost: pick(['0', '2', '5', '']), persuasion_cost: pick(['3', '']),
+                   specimen_cost: pick(['1', '2']), spice_cost: pick(['4', '']),
+                   vps_available: pick(['0', '1', '']), conflict_level: pick(['I', 'II']),
+                   listed_complexity_level: pick(['1', '2', ' '])};
+        FIELDS.forEach(field => { r[field] = pick(CELLS); });
+        return r;
+    });
+});
+
+const snapshot = stats => JSON.stringify({
+    total: stats.total, unique: stats.unique, copies: stats.copies,
+    counts: [...stats.counts.entries()].map(([r, count]) => [r.name, count]).sort(),
+    // Entries in the order the stats panels list them
+    buckets: STAT_BUCKETS.map(bucket => Object.entries(stats[bucket]).sort(byCountThenKey))
+});
+
+TYPES.forEach(type => getSelectionStats(type));
+const mismatches = [];
+let clicks = 0;
+for (let step = 0; step < 3000; step++) {
+    const type = pick(TYPES);
+    const resource = pick(allResources[type]);
+    const current = resource.selected || 0;
+    const next = random() < 0.5 ? Math.min(current + 1, 3) : Math.max(current - 1, 0);
+    if (next === current) continue;
+    resource.selected = next;
+    noteSelectionChange(type, resource);
+    clicks++;
+
+    const running = selectionStats[type];
+    invalidateSelectionStats(type);
+    const rebuilt = getSelectionStats(type);
+    if (snapshot(running) !== snapshot(rebuilt)) mismatches.push({step, type, name: resource.name});
+    selectionStats[type] = running;
+}
+console.log(JSON.stringify({clicks, mismatches: mismatches.slice(0, 5)}));
+"""
+
+
+def test_running_stats_match_a_full_recompute_after_random_clicks():
+    result = run_node(stats_script() + RANDOM_CLICKS)
+    assert result['clicks'] > 1000
+    assert result['mismatches'] == []
+
+
+WHITESPACE_MECHANICS = r"""
+const allResources = {
+    imperium: [{name: 'a', selected: 1, shipping: ' ', spies: 'X'}],
+    tech: [{name: 'b', selected: 1, shipping: ' ', spies: 'X'}]
+};
+console.log(JSON.stringify({imperium: getSelectionStats('imperium').mechanics,
+                            tech: getSelectionStats('tech').mechanics}));
+"""
+
+
+def test_whitespace_mechanic_cells_only_skipped_for_tech():
+    mechanics = run_node(stats_script() + WHITESPACE_MECHANICS)
+    assert mechanics == {'imperium': {'shipping': 1, 'spies': 1}, 'tech': {'spies': 1}}
+
+
+def test_stats_panels_break_count_ties_by_key():
+    assert 'b[1] - a[1])' not in INDEX_HTML.read_text(encoding='utf-8')
@@ -0,0 +1,80 @@
+import functools
+import http.client
+import http.server
+import threading
+import time
+
+import pytest
+
+from server_common import KeepAliveMixin, PooledHTTPServer
+
+
+class Handler(KeepAliveMixin, http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server(tmp_path):
+    (tmp_path / 'hello.txt').write_text('hello')
+    handler = functools.partial(Handler, directory=str(tmp_path))
+    httpd = PooledHTTPServer(('127.0.0.1', 0), handler, workers=2, request_timeout=10,
+                             keepalive_timeout=0.5)
+    thread = threading.Thread(target=httpd.serve_forever, kwargs={'poll_interval': 0.05})
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+    thread.join()
+
+
+def get(connection):
+    connection.request('GET', '/hello.txt')
+    response = connection.getresponse()
+    return response, response.read()
+
+
+def test_idle_keepalive_connections_do_not_starve_new_requests(server):
+    port = server.server_address[1]
+    # More idle keep-alive connections than workers
+    idle = [http.client.HTTPConnection('127.0.0.1', port, timeout=10) for _ in range(6)]
+    for connection in idle:
+        assert get(connection)[1] == b'hello'
+
+    started = time.monotonic()
+    fresh = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    response, body = get(fresh)
+    assert response.status == 200 and body == b'hello'
+    # Served once an idle connection gave up its worker, long before the request timeout
+    assert time.monotonic() - started < 5
+
+    for connection in idle + [fresh]:
+        connection.close()
+
+
+def test_saturated_pool_closes_connections_after_the_response(server):
+    port = server.server_address[1]
+    first = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    second = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    assert get(first)[0].getheader('Connection') is None
+    # Both workers are now taken (the first connection idles on its worker)
+    assert get(second)[0].getheader('Connection') == 'close'
+    first.close()
+    second.close()
+
+
+def test_keepalive_connection_serves_several_requests(server):
+    connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=10)
+    for _ in range(3):
+        assert get(connection)[1] == b'hello'
+    connection.close()
+
+
+def test_idle_keepalive_connection_is_closed_after_the_keepalive_timeout(server):
+    connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=10)
+    assert get(connection)[1] == b'hello'
+    started = time.monotonic()
+    # The server hangs up on the idle connection: EOF instead of a request timeout
+    assert connection.sock.recv(1) == b''
+    assert time.monotonic() - started < 5
+    connection.close()
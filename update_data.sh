@@ -12,46 +12,14 @@ if [ ! -f "Dune_Imperium_Card_Inventory.xlsx" ]; then
     exit 1
 fi
 
-# 1. Generate resources.json
-echo "📊 Generating resources.json from Excel..."
-python3 generate_resources_json.py
-echo ""
-
-# 2. Regenerate blend files
-echo "📝 Regenerating blend files..."
-python3 extract_blends_from_excel_inventory.py
-echo ""
-
-# 3. Update blends index (only include official blends for GitHub Pages)
-echo "📋 Updating blends/index.json..."
-python3 << 'EOF'
-import json
-from pathlib import Path
-
-blends_dir = Path('blends')
-
-# Only include official/public blends for GitHub Pages
-# Personal blends (like house blends) should not be in this list
-# They will still be available locally via the /api/blends endpoint
-official_blends = [
-    'Anttis_Basic_House_Blend.md',
-    'Anttis_House_Blend.md',
-    'Base_Imperium.md',
-    'Base_Uprising.md',
-    'Merakons_House_Blend.md',
-    'TragicJonsons_House_Blend.md',
-    'Uprising_Bloodlines_Community.md',
-]
-
-# Filter to only existing files
-blend_files = [{'filename': f} for f in official_blends if (blends_dir / f).exists()]
-
-with open(blends_dir / 'index.json', 'w') as f:
-    json.dump(blend_files, f, indent=2)
-
-print(f"✅ Updated index with {len(blend_files)} official blends")
-print(f"   (Personal blends are only available via local server)")
-EOF
+# Build resources.json, blend files, blends/index.json and the blend stats
+# baselines (blends/baselines.json) in one pass.
+# The spreadsheet is read once; outputs whose input sheets did not change
+# since the last build (see build_manifest.json, a gitignored local cache;
+# CI should cache it between runs) are skipped.
+# Pass --force to rebuild everything.
+echo "📊 Building data files from Excel..."
+python3 build_data.py "$@"
 echo ""
 
 echo "✅ All data updated successfully!"
@@ -60,6 +28,7 @@ echo "📦 Files generated:"
 echo "   - resources.json"
 echo "   - blends/*.md"
 echo "   - blends/index.json"
+echo "   - blends/baselines.json"
 echo ""
 echo "🚀 Ready to deploy!"
 echo ""